@@ -8,18 +8,39 @@ import tempfile
 import asyncio
 from datetime import datetime
 import sys # <-- استيراد مكتبة sys للوصول إلى مسار بايثون
-import toml # <-- استيراد toml للقراءة المحلية
+from utils.log_view import LogView
+from utils.config_store import get_config_store
 
-# استيراد السكربتات المساعدة
-from bot_scripts.extractor import links_extractor
-from bot_scripts.creator import image_creator
+# السكربتات المساعدة (image_creator يسحب Pillow وtelegram وarabic_reshaper وbidi) تُستورد داخل صفحاتها فقط،
+# حتى لا تدفع صفحة الدخول وبقية الصفحات كلفة استيرادها في كل إعادة تشغيل
 
 # --- الإعدادات الأساسية ---
 LOG_DIR = 'logs'
+POST_INDEX_FILE = 'post_index.sqlite'
+# مهام النشر والتنظيف تُرسل إلى عامل دائم (bot_scripts/worker/job_worker.py) بمكتبات وعملاء دافئين؛
+# إذا لم يكن يعمل تُشغّل كعملية منفصلة كالسابق، ويُشغَّل العامل في الخلفية للمهام التالية
+USE_JOB_WORKER = True
+JOB_WORKER_AUTOSTART = True
+LOG_VIEW_MAX_LINES = 300 # أسطر السجل المعروضة في الواجهة (الأقدم منها في ملف السجل فقط)
+LOG_VIEW_REFRESH_SEC = 0.5 # أقصى معدل لإعادة رسم السجل في المتصفح
+# مهام النشر والتنظيف تُضاف إلى طابور SQLite ينفذها مجدول مستقل (bot_scripts/worker/job_queue.py):
+# JOB_SLOTS مهمة معًا كحد أقصى، ومهمة واحدة جارية لكل مستخدم ولكل مدونة/مجلد مصادقة
+USE_JOB_QUEUE = True
+JOB_SLOTS = 2
+JOB_PER_USER = 1
+JOB_PER_BLOG = 1
+JOB_POLL_SEC = 1.0
+POST_INDEX_MIN_SYNC_SEC = 300 # لا مزامنة مع Blogger أكثر من مرة كل 5 دقائق لنفس المدونة (زر التحديث يتجاوزها)
+POST_INDEX_FULL_SYNC_SEC = 24 * 3600 # زحف كامل تلقائي يوميًا لإزالة المقالات المحذوفة من الفهرس (زر إعادة البناء يفرضه فورًا)
 IS_CLOUD_ENVIRONMENT = hasattr(st, 'secrets')
 
 # --- دوال مساعدة لإدارة الإعدادات والسجلات ---
+# الإعدادات المحلية تُقرأ عبر ConfigStore: تحليل واحد لكل تعديل على الملف، وكتابة ذرّية تحت قفل
+SECRETS_PATH = os.path.join(".streamlit", "secrets.toml")
+config_store = get_config_store(SECRETS_PATH, fallback_json_path='app_config.json') # app_config.json كحل بديل مؤقت
+
 def load_config():
+    """الإعدادات كاملة (للقراءة فقط: التعديل عبر update_user_config وincrement_user_counter)."""
     if IS_CLOUD_ENVIRONMENT:
         try:
             return st.secrets["app_config"].to_dict()
@@ -27,40 +48,36 @@ def load_config():
             st.error("خطأ فادح: قسم [app_config] غير موجود في Streamlit Secrets.")
             return None
     else:
-        secrets_path = os.path.join(".streamlit", "secrets.toml")
         try:
-            if not os.path.exists(secrets_path):
-                if os.path.exists('app_config.json'): # كحل بديل مؤقت
-                    with open('app_config.json', 'r', encoding='utf-8') as f: return json.load(f)
-                st.error(f"ملف الإعدادات '{secrets_path}' غير موجود.")
-                return None
-            parsed_toml = toml.load(secrets_path)
-            return parsed_toml.get("app_config", {})
+            return config_store.load()
+        except FileNotFoundError:
+            st.error(f"ملف الإعدادات '{SECRETS_PATH}' غير موجود.")
+            return None
         except Exception as e:
             st.error(f"خطأ في قراءة ملف الإعدادات المحلي: {e}")
             return None
 
-def save_config(config_data):
+def _write_config(write, success_message="تم حفظ التغييرات بنجاح في secrets.toml!"):
     if IS_CLOUD_ENVIRONMENT:
         st.warning("لا يمكن حفظ التغييرات تلقائيًا في بيئة النشر السحابية."); return False
-    secrets_path = os.path.join(".streamlit", "secrets.toml")
     try:
-        full_config = toml.load(secrets_path)
-        if 'app_config' not in full_config: full_config['app_config'] = {}
-        full_config['app_config'].update(config_data)
-        with open(secrets_path, 'w', encoding='utf-8') as f:
-            toml.dump(full_config, f)
-        st.success("تم حفظ التغييرات بنجاح في secrets.toml!"); return True
+        write()
+        if success_message: st.success(success_message)
+        return True
     except Exception as e:
         st.error(f"فشل حفظ الإعدادات في secrets.toml: {e}"); return False
 
-# ✅ --- هذا هو الإصدار الكامل والصحيح لهذه الدالة ---
-def run_script_and_show_output(command_script_part, username, task_name, user_data):
+def update_user_config(username, **fields):
+    """يحدّث حقول مستخدم واحد فقط على أحدث نسخة من الملف (لا يستبدل بيانات المستخدمين الآخرين)."""
+    return _write_config(lambda: config_store.update_user(username, **fields))
+
+def increment_user_counter(username, field, amount=1):
+    return _write_config(lambda: config_store.increment_user_counter(username, field, amount), success_message=None)
+
+def prepare_credentials(credential_path):
     """
     يقوم بإنشاء ملفات المصادقة من Secrets قبل تشغيل السكربت.
     """
-    credential_path = user_data.get('credential_path')
-    
     # --- ✅ هذا هو الجزء الحاسم الذي يحل المشكلة ---
     if IS_CLOUD_ENVIRONMENT and credential_path:
         st.info("... تهيئة بيئة المصادقة الآمنة ...")
@@ -75,30 +92,115 @@ def run_script_and_show_output(command_script_part, username, task_name, user_da
                 f.write(secret_content)
             st.info("... المصادقة جاهزة ...")
         except KeyError as e:
-            st.error(f"خطأ فادح: المفتاح {e} غير موجود في قسم [google_creds] في Streamlit Secrets."); return 1
+            st.error(f"خطأ فادح: المفتاح {e} غير موجود في قسم [google_creds] في Streamlit Secrets."); return False
         except Exception as e:
-            st.error(f"خطأ غير متوقع أثناء تهيئة المصادقة: {e}"); return 1
-            
+            st.error(f"خطأ غير متوقع أثناء تهيئة المصادقة: {e}"); return False
+    return True
+
+# ✅ --- هذا هو الإصدار الكامل والصحيح لهذه الدالة ---
+def run_script_and_show_output(command_script_part, username, task_name, user_data):
+    """
+    تشغيل متزامن داخل الطلب (عند تعطيل طابور المهام).
+    """
+    if not prepare_credentials(user_data.get('credential_path')): return 1
     os.makedirs(LOG_DIR, exist_ok=True); timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     log_filename = os.path.join(LOG_DIR, f"{username}_{task_name}_{timestamp}.log")
-    log_placeholder = st.empty(); log_output = f"--- بدء السجل في {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ---\n"
-    log_placeholder.code(log_output, language='bash')
+    # الواجهة تعرض آخر LOG_VIEW_MAX_LINES سطرًا فقط وبمعدل تحديث محدود، والسجل الكامل في الملف
+    log_header = f"--- بدء السجل في {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ---\n"
+    log_view = LogView(st.empty(), max_lines=LOG_VIEW_MAX_LINES, refresh_interval=LOG_VIEW_REFRESH_SEC, full_log_path=log_filename)
+    log_view.write(log_header)
     try:
         with open(log_filename, 'w', encoding='utf-8') as log_file:
-            log_file.write(log_output)
+            log_file.write(log_header)
+            def append_output(line):
+                log_file.write(line); log_view.write(line)
+            script_args = shlex.split(command_script_part)
+            if USE_JOB_WORKER:
+                from bot_scripts.worker import job_worker
+                try: return job_worker.run_in_worker(script_args[0], script_args[1:], on_output=append_output, cwd=os.getcwd())
+                except job_worker.WorkerUnavailableError:
+                    if JOB_WORKER_AUTOSTART:
+                        try: job_worker.start_worker_process()
+                        except Exception as e: append_output(f"(تعذر تشغيل العامل الدائم: {e})\n")
             python_executable = sys.executable
-            full_command = f'"{python_executable}" {command_script_part}'
-            args = shlex.split(full_command)
+            args = [python_executable] + script_args
             my_env = os.environ.copy()
             my_env['PYTHONIOENCODING'] = 'utf-8'
             process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8', env=my_env)
-            for line in iter(process.stdout.readline, ''):
-                log_output += line; log_file.write(line); log_placeholder.code(log_output, language='bash')
+            for line in iter(process.stdout.readline, ''): append_output(line)
             process.wait(); return process.returncode
     except Exception as e:
         error_message = f"\n!!! خطأ فادح أثناء تشغيل السكربت: {e} !!!\n"; st.error(error_message)
         with open(log_filename, 'a', encoding='utf-8') as log_file: log_file.write(error_message)
         return 1
+    finally: log_view.flush()
+
+JOB_STATUS_LABELS = {'queued': "⏳ في الانتظار", 'running': "▶️ قيد التنفيذ", 'done': "✅ انتهت", 'failed': "❌ فشلت", 'cancelled': "🚫 أُلغيت"}
+
+def get_job_queue():
+    from bot_scripts.worker.job_queue import JobQueue
+    return JobQueue()
+
+def submit_job(kind, command_script_part, username, user_data, blog_key, cleanup_paths=None, on_success=None):
+    """يضيف المهمة إلى الطابور (ويشغّل المجدول إن لم يكن يعمل)، ويعيد رقمها أو None."""
+    if not prepare_credentials(user_data.get('credential_path')): return None
+    from bot_scripts.worker.job_queue import start_scheduler_process
+    os.makedirs(LOG_DIR, exist_ok=True); timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    script_args = shlex.split(command_script_part)
+    job_id = get_job_queue().submit(kind, script_args[0], script_args[1:], username=username, blog_key=blog_key, cwd=os.getcwd(),
+                                    log_path=os.path.abspath(os.path.join(LOG_DIR, f"{username}_{kind}_{timestamp}.log")),
+                                    cleanup_paths=cleanup_paths, on_success=on_success)
+    try: start_scheduler_process(slots=JOB_SLOTS, per_user=JOB_PER_USER, per_blog=JOB_PER_BLOG)
+    except Exception as e: st.warning(f"تعذر تشغيل مجدول المهام: {e}")
+    return job_id
+
+def read_log_tail(path, max_bytes=64 * 1024):
+    """آخر max_bytes من ملف السجل (بدءًا من أول سطر كامل)، ولا يُقرأ الملف كله مهما كبر."""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END); size = f.tell(); f.seek(max(0, size - max_bytes)); chunk = f.read()
+    except OSError: return ""
+    if size > max_bytes and b'\n' in chunk: chunk = chunk.split(b'\n', 1)[1]
+    return chunk.decode('utf-8', errors='replace')
+
+def show_job(job_queue, job):
+    """حالة مهمة واحدة وآخر سجلها كما هما الآن (دون انتظار): التحديث يأتي من إعادة التشغيل الدورية في show_user_jobs."""
+    waiting = f" (قبلها {job_queue.queue_position(job['id'])} مهمة في الطابور)" if job['status'] == 'queued' else ""
+    message = f"المهمة #{job['id']} ({job['kind']}): {JOB_STATUS_LABELS.get(job['status'], job['status'])}{waiting}"
+    if job['status'] == 'done': st.success(message)
+    elif job['status'] in ('failed', 'cancelled'): st.error(message)
+    else: st.info(message)
+    if job['log_path'] and os.path.exists(job['log_path']):
+        log_view = LogView(st.empty(), max_lines=LOG_VIEW_MAX_LINES, refresh_interval=LOG_VIEW_REFRESH_SEC, full_log_path=job['log_path'])
+        log_view.write(read_log_tail(job['log_path'])); log_view.flush()
+
+def _render_user_jobs(username, was_active):
+    job_queue = get_job_queue(); jobs = job_queue.list_jobs(username, limit=10)
+    if not jobs: return
+    active = any(job['status'] in ('queued', 'running') for job in jobs)
+    # آخر مهمة نشطة انتهت: إعادة تشغيل الصفحة كاملة لإيقاف التحديث الدوري
+    if was_active and not active: st.rerun()
+    followed_id = st.session_state.get('followed_job_id')
+    followed = next((job for job in jobs if job['id'] == followed_id), jobs[0])
+    show_job(job_queue, followed)
+    with st.expander("📋 مهامي الأخيرة"):
+        for job in jobs:
+            col_info, col_log, col_action = st.columns([5, 1, 1])
+            progress = f" — {job['progress']}" if job['progress'] else ""
+            col_info.write(f"#{job['id']} {job['kind']} | {JOB_STATUS_LABELS.get(job['status'], job['status'])}{progress}")
+            if job['id'] != followed['id'] and col_log.button("السجل", key=f"log_job_{job['id']}"):
+                st.session_state['followed_job_id'] = job['id']; st.rerun()
+            if job['status'] in ('queued', 'running') and col_action.button("إلغاء", key=f"cancel_job_{job['id']}"):
+                job_queue.cancel(job['id']); st.rerun()
+
+def show_user_jobs(username):
+    """
+    مهام المستخدم الأخيرة مع حالة وسجل المهمة المتابَعة. لا ينتظر انتهاء أي مهمة: عند وجود مهمة نشطة
+    يُعاد رسم هذا الجزء وحده كل JOB_POLL_SEC ثانية (st.fragment)، فتبقى الصفحة قابلة للاستخدام ومغادرتها لا توقف المهمة.
+    """
+    jobs = get_job_queue().list_jobs(username, limit=10)
+    active = any(job['status'] in ('queued', 'running') for job in jobs)
+    st.fragment(run_every=JOB_POLL_SEC if active else None)(_render_user_jobs)(username, active)
 
 # --- صفحات الواجهة ---
 def login_page():
@@ -130,14 +232,9 @@ def admin_dashboard():
             new_earnings = st.number_input("تحديد/تعديل الأرباح:", value=float(data.get('earnings', 0.0)), step=0.01, format="%.2f", key=f"earn_{username}")
             new_rating = st.text_input("تحديد/تعديل التقييم:", value=data.get('rating', ''), key=f"rate_{username}")
             if st.button("💾 حفظ التغييرات لهذا المستخدم", key=f"save_{username}"):
-                if not IS_CLOUD_ENVIRONMENT:
-                    config['users'][username]['earnings'] = new_earnings
-                    config['users'][username]['rating'] = new_rating
-                    if save_config(config):
-                        st.success(f"تم تحديث بيانات {username} بنجاح!")
-                        time.sleep(1); st.rerun()
-                else:
-                    save_config(config)
+                if update_user_config(username, earnings=new_earnings, rating=new_rating):
+                    st.success(f"تم تحديث بيانات {username} بنجاح!")
+                    time.sleep(1); st.rerun()
 
     st.markdown("---")
     st.subheader("🛠️ إدارة الحسابات")
@@ -148,7 +245,7 @@ def user_dashboard():
     username = st.session_state['username']
     config = load_config()
     if not config: return
-    user_data = config.get('users', {}).get(username, {})
+    user_data = config.get('users', {}).get(username, {}) if IS_CLOUD_ENVIRONMENT else config_store.user_view(username)
 
     st.sidebar.title(f"👋 أهلاً بك، {username}")
     st.sidebar.markdown("---"); st.sidebar.subheader("📊 نظرة عامة")
@@ -180,6 +277,7 @@ def user_dashboard():
     if page_error: st.error(f"{page_error} يرجى مراجعة المشرف."); return
 
     if page == "🖼️ صانع الصور الإخبارية":
+        from bot_scripts.creator import image_creator
         st.title("🖼️ صانع الصور الإخبارية")
         st.info("حوّل الأخبار إلى صور احترافية وانشرها مباشرة إلى تليجرام.")
         with st.form("image_creator_form"):
@@ -196,19 +294,20 @@ def user_dashboard():
             news_items = [line.strip() for line in news_items_text.splitlines() if line.strip()]
             if not news_items: st.warning("الرجاء إدخال رابط أو نص واحد على الأقل.")
             else:
-                st.subheader("سجل المعالجة"); log_placeholder = st.empty(); log_output = ""
+                st.subheader("سجل المعالجة"); log_view = LogView(st.empty(), max_lines=LOG_VIEW_MAX_LINES, refresh_interval=LOG_VIEW_REFRESH_SEC)
                 def status_callback(message, level="info"):
-                    nonlocal log_output
-                    timestamp = datetime.now().strftime("%H:%M:%S"); formatted_message = f"[{timestamp}] {message}"
-                    log_output += formatted_message + "\n"; log_placeholder.code(log_output, language='bash')
+                    timestamp = datetime.now().strftime("%H:%M:%S"); log_view.append_line(f"[{timestamp}] {message}")
                 with st.spinner(f"جاري معالجة {len(news_items)} عنصر..."):
-                    asyncio.run(image_creator.process_and_send_batch(
-                        bot_token=telegram_settings['bot_token'], channel_id=telegram_settings['channel_id'],
-                        design_choice=design_choice[1], template_key=template_key,
-                        news_items=news_items, content_type=content_type[1], status_callback=status_callback))
+                    try:
+                        asyncio.run(image_creator.process_and_send_batch(
+                            bot_token=telegram_settings['bot_token'], channel_id=telegram_settings['channel_id'],
+                            design_choice=design_choice[1], template_key=template_key,
+                            news_items=news_items, content_type=content_type[1], status_callback=status_callback))
+                    finally: log_view.flush()
 
     elif page == "📝 نشر مقالات":
         st.title("📝 نشر مقالات جديدة عبر الروابط")
+        if USE_JOB_QUEUE: show_user_jobs(username)
         urls_text = st.text_area("الروابط:", height=200)
         st.subheader("🏷️ التصنيفات (Labels)")
         st.info("أدخل التصنيفات مفصولة بفاصلة ( , ). اترك الحقل فارغًا للاستخراج التلقائي.")
@@ -224,47 +323,63 @@ def user_dashboard():
                 with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.json', encoding='utf-8') as tmp:
                     json.dump(user_pub_rules_dict, tmp, ensure_ascii=False); rules_file_path = tmp.name
                 command_script_part = (f"bot_scripts/scraper/main.py --creds-path {credential_path} --urls {' '.join(shlex.quote(u) for u in urls)} {labels_command_part} --rules-file \"{rules_file_path}\"")
-                return_code = run_script_and_show_output(command_script_part, username, "publish", user_data)
-                os.remove(rules_file_path)
-                if return_code == 0:
-                    st.success("🎉 انتهت عملية النشر بنجاح!")
-                    if not IS_CLOUD_ENVIRONMENT:
-                        current_config = load_config(); users_data = current_config.get('users', {})
-                        users_data[username]['post_count'] += len(urls)
-                        save_config({'users': users_data})
-                else: st.error("حدث خطأ أثناء النشر.")
+                if USE_JOB_QUEUE:
+                    job_id = submit_job("publish", command_script_part, username, user_data, blog_key=f"creds:{credential_path}",
+                                        cleanup_paths=[rules_file_path], on_success=None if IS_CLOUD_ENVIRONMENT else {'post_count': len(urls)})
+                    # لا انتظار هنا: الحالة والسجل يظهران في قائمة المهام أعلى الصفحة وتتحدث تلقائيًا
+                    if job_id: st.session_state['followed_job_id'] = job_id; st.rerun()
+                    os.remove(rules_file_path); st.error("تعذرت إضافة مهمة النشر إلى الطابور.") # لن يحذف المجدول الملف المؤقت
+                else:
+                    return_code = run_script_and_show_output(command_script_part, username, "publish", user_data)
+                    os.remove(rules_file_path)
+                    if return_code == 0 and not IS_CLOUD_ENVIRONMENT: increment_user_counter(username, 'post_count', len(urls))
+                    if return_code == 0: st.success("🎉 انتهت عملية النشر بنجاح!")
+                    else: st.error("حدث خطأ أثناء النشر.")
             else: st.warning("الرجاء إدخال رابط واحد على الأقل.")
             
     elif page == "🔗 استخراج الروابط":
+        from bot_scripts.extractor import links_extractor
         st.title("🔗 استخراج روابط المقالات")
         blog_id = blogger_settings['blog_id']; api_key = blogger_settings['api_key']
         st.info("استخدم الخيارات أدناه لسحب الروابط من مدونتك وحفظها في ملفات نصية.")
+        # كل الاستعلامات تُجاب من فهرس محلي للمقالات، ولا يُطلب من Blogger إلا ما تغير منذ آخر مزامنة
+        from core.post_index import PostIndexStore
+        post_index = PostIndexStore(POST_INDEX_FILE)
+        col_sync, col_rebuild = st.columns(2)
+        force_sync = col_sync.button("🔄 تحديث الفهرس"); rebuild_index = col_rebuild.button("🧱 إعادة بناء الفهرس بالكامل")
+        try:
+            with st.spinner("جاري مزامنة فهرس المقالات..."):
+                sync_result = links_extractor.sync_post_index(blog_id, api_key, post_index, min_interval_sec=0 if (force_sync or rebuild_index) else POST_INDEX_MIN_SYNC_SEC,
+                                                            full=rebuild_index, full_sync_interval_sec=POST_INDEX_FULL_SYNC_SEC)
+            if sync_result['mode'] != 'skipped': st.caption(f"تمت مزامنة {sync_result['fetched']} مقال. الفهرس يحتوي {sync_result['total']} مقال.")
+        except Exception as e: st.warning(f"تعذرت مزامنة الفهرس ({e})، سيتم استخدام آخر نسخة محلية.")
         extraction_type = st.selectbox("اختر نوع الاستخراج:", ["اختر...", "استخراج روابط قسم معين", "استخراج روابط جميع الأقسام", "استخراج أحدث الروابط"])
         if extraction_type == "استخراج روابط قسم معين":
-            with st.spinner("جاري جلب قائمة الأقسام..."): categories = links_extractor.get_all_categories(blog_id, api_key)
+            with st.spinner("جاري جلب قائمة الأقسام..."): categories = links_extractor.get_all_categories(blog_id, api_key, index=post_index)
             if categories:
                 selected_category = st.selectbox("اختر القسم:", categories)
                 max_links = st.number_input("أقصى عدد (0 للكل):", min_value=0, value=0)
                 if st.button("🚀 ابدأ الاستخراج"):
                     with st.spinner(f"جاري استخراج روابط قسم '{selected_category}'..."):
-                        result = links_extractor.extract_specific_category_links(blog_id, api_key, selected_category, max_links if max_links > 0 else None)
+                        result = links_extractor.extract_specific_category_links(blog_id, api_key, selected_category, max_links if max_links > 0 else None, index=post_index)
                         st.success("انتهت العملية!"); st.code(result, language='bash')
             else: st.warning("لم يتم العثور على أي أقسام في المدونة.")
         elif extraction_type == "استخراج روابط جميع الأقسام":
             max_links = st.number_input("أقصى عدد لكل قسم (0 للكل):", min_value=0, value=10)
             if st.button("🚀 ابدأ استخراج الكل"):
                 with st.spinner("جاري استخراج الروابط من جميع الأقسام..."):
-                    result = links_extractor.extract_all_categories_links(blog_id, api_key, max_links if max_links > 0 else None)
+                    result = links_extractor.extract_all_categories_links(blog_id, api_key, max_links if max_links > 0 else None, index=post_index)
                     st.success("انتهت العملية!"); st.markdown(result.replace("\n", "\n\n"))
         elif extraction_type == "استخراج أحدث الروابط":
             max_links = st.number_input("أدخل عدد أحدث الروابط:", min_value=1, value=20)
             if st.button("🚀 ابدأ الاستخراج"):
                 with st.spinner(f"جاري استخراج أحدث {max_links} رابط..."):
-                    result = links_extractor.extract_latest_links(blog_id, api_key, max_links)
+                    result = links_extractor.extract_latest_links(blog_id, api_key, max_links, index=post_index)
                     st.success("انتهت العملية!"); st.code(result, language='bash')
 
     elif page == "✨ تنظيف المقالات":
         st.title("✨ تنظيف وتنسيق المقالات الأخيرة")
+        if USE_JOB_QUEUE: show_user_jobs(username)
         user_blogs = user_data.get('blogs', [])
         if not user_blogs: st.warning("لا توجد مدونات مخصصة لك."); return
         blog_options = {f"{b.get('name', 'N/A')} ({b.get('id', 'N/A')})": b.get('id') for b in user_blogs}
@@ -276,10 +391,15 @@ def user_dashboard():
             with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.json', encoding='utf-8') as tmp:
                 json.dump(user_rules_dict, tmp, ensure_ascii=False); rules_file_path = tmp.name
             command_script_part = (f'bot_scripts/cleaner/clean_posts.py --blog-id "{selected_blog_id}" --creds-path "{credential_path}" --limit {post_limit} --rules-file "{rules_file_path}"')
-            return_code = run_script_and_show_output(command_script_part, username, "clean", user_data)
-            os.remove(rules_file_path)
-            if return_code == 0: st.success("🎉 انتهت عملية التنظيف بنجاح!")
-            else: st.error("حدث خطأ أثناء التنظيف.")
+            if USE_JOB_QUEUE:
+                job_id = submit_job("clean", command_script_part, username, user_data, blog_key=f"blog:{selected_blog_id}", cleanup_paths=[rules_file_path])
+                if job_id: st.session_state['followed_job_id'] = job_id; st.rerun()
+                os.remove(rules_file_path); st.error("تعذرت إضافة مهمة التنظيف إلى الطابور.") # لن يحذف المجدول الملف المؤقت
+            else:
+                return_code = run_script_and_show_output(command_script_part, username, "clean", user_data)
+                os.remove(rules_file_path)
+                if return_code == 0: st.success("🎉 انتهت عملية التنظيف بنجاح!")
+                else: st.error("حدث خطأ أثناء التنظيف.")
 
     elif page == "⚙️ إعدادات النشر":
         st.title("⚙️ إعدادات النشر المخصصة")
@@ -297,8 +417,7 @@ def user_dashboard():
                 if '>>' in line:
                     find_phrase, replace_phrase = line.split('>>', 1)
                     updated_replacements.append({"find": find_phrase.strip(), "replace_with": replace_phrase.strip()})
-            users_data[username]['publishing_rules'] = {"replacements": updated_replacements}
-            if save_config({'users': users_data}): st.rerun()
+            if update_user_config(username, publishing_rules={"replacements": updated_replacements}): st.rerun()
 
     elif page == "⚙️ إعدادات التنظيف":
         st.title("⚙️ إعدادات التنظيف المخصصة")
@@ -319,8 +438,7 @@ def user_dashboard():
                 if '>>' in line:
                     find_phrase, replace_phrase = line.split('>>', 1)
                     updated_replacements.append({"find": find_phrase.strip(), "replace_with": replace_phrase.strip()})
-            users_data[username]['cleaning_rules'] = {"remove_symbols": updated_remove_list, "replacements": updated_replacements}
-            if save_config({'users': users_data}): st.rerun()
+            if update_user_config(username, cleaning_rules={"remove_symbols": updated_remove_list, "replacements": updated_replacements}): st.rerun()
 
     elif page == "💰 الأرباح والتقييم":
         st.title("💰 الأرباح والتقييم")
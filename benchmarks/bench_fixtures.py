@@ -0,0 +1,122 @@
+# benchmarks/bench_fixtures.py
+"""
+بيانات قياس الأداء: ملفات ثابتة في benchmarks/fixtures (صفحات مقالات بنمط b2b-sy وعاجل وووردبريس، وعناوين عربية)
+ومولدات حتمية (نفس البذرة = نفس البيانات) لخرائط المواقع الكبيرة والصور، وخادم HTTP محلي يقدّمها.
+"""
+import os
+import io
+import random
+import threading
+from xml.sax.saxutils import escape
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# name -> (الموقع، ملف الصفحة، مسار المقال). اسم الموقع يُضاف لمسار الخادم المحلي لأن قواعد التنظيف
+# في ArticleScraper._remove_site_specific_junk تُختار بالبحث عن النطاق داخل الرابط.
+ARTICLE_FIXTURES = {
+    'b2b_sy': ('b2b-sy.com', 'articles/b2b_sy_article.html', '/b2b-sy.com/news/148213/'),
+    'ajel': ('ajel.sa', 'articles/ajel_article.html', '/ajel.sa/saudi/2056311/'),
+    'generic_wp': ('example-news.com', 'articles/generic_wp_article.html', '/example-news.com/2024/05/economy-report/'),
+}
+
+IMAGE_SIZES = ((640, 360), (1280, 720), (1920, 1080), (3000, 2000))
+
+def read_fixture(relative_path, mode='r'):
+    path = os.path.join(FIXTURES_DIR, relative_path)
+    if 'b' in mode:
+        with open(path, mode) as f: return f.read()
+    with open(path, mode, encoding='utf-8') as f: return f.read()
+
+def load_headlines():
+    return [line.strip() for line in read_fixture('headlines_ar.txt').splitlines() if line.strip()]
+
+def generate_site_urls(domain, count, seed=1):
+    """روابط موقع واقعية الخليط: مقالات، تصنيفات ووسوم، صور، وروابط تتبع (utm) يجب أن يستبعدها الفلتر."""
+    rnd = random.Random(seed)
+    sections = ('news', 'economy', 'saudi', 'world', 'sport', 'tech')
+    urls = []
+    for i in range(count):
+        kind = rnd.random()
+        if kind < 0.70: urls.append(f"https://{domain}/{rnd.choice(sections)}/{100000 + i}/")
+        elif kind < 0.78: urls.append(f"https://{domain}/category/{rnd.choice(sections)}/page/{rnd.randint(2, 90)}/")
+        elif kind < 0.84: urls.append(f"https://{domain}/tag/%D8%A7%D9%82%D8%AA%D8%B5%D8%A7%D8%AF-{i}/")
+        elif kind < 0.89: urls.append(f"https://{domain}/wp-content/uploads/2024/{rnd.randint(1, 12):02d}/photo-{i}.jpg")
+        elif kind < 0.94: urls.append(f"https://{domain}/{rnd.choice(sections)}/{100000 + i}/?utm_source=feed&utm_medium=rss")
+        elif kind < 0.97: urls.append(f"https://cdn.{domain}/{rnd.choice(sections)}/{100000 + i}/")
+        else: urls.append(f"https://{domain}/{rnd.choice(sections)}/%D8%AE%D8%A8%D8%B1-{i}")
+    return urls
+
+def generate_sitemap_index(domain='b2b-sy.com', total_urls=50000, urls_per_file=5000, seed=1, base_url=''):
+    """
+    يعيد {مسار: محتوى XML} لفهرس خرائط (/sitemap_index.xml) وملفات فرعية، بتواريخ lastmod بصيغ مختلفة.
+    base_url هو عنوان الخادم الذي سيقدّم الملفات (روابط <sitemap><loc> تشير إليه).
+    """
+    rnd = random.Random(seed)
+    urls = generate_site_urls(domain, total_urls, seed)
+    lastmod_formats = ('2024-{m:02d}-{d:02d}T{h:02d}:15:00+03:00', '2024-{m:02d}-{d:02d}T{h:02d}:15:00.000Z', '2024-{m:02d}-{d:02d}')
+    routes = {}; index_entries = []
+    for file_no, start in enumerate(range(0, len(urls), urls_per_file), 1):
+        path = f"/sitemap-posts-{file_no}.xml"
+        entries = []
+        for url in urls[start:start + urls_per_file]:
+            lastmod = rnd.choice(lastmod_formats).format(m=rnd.randint(1, 12), d=rnd.randint(1, 28), h=rnd.randint(0, 23))
+            entries.append(f"<url><loc>{escape(url)}</loc><lastmod>{lastmod}</lastmod></url>")
+        routes[path] = ('<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                        + "".join(entries) + "</urlset>").encode('utf-8')
+        index_entries.append(f"<sitemap><loc>{base_url}{path}</loc></sitemap>")
+    routes['/sitemap_index.xml'] = ('<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                                    + "".join(index_entries) + "</sitemapindex>").encode('utf-8')
+    return routes
+
+def generate_image(width, height, seed=1, image_format='JPEG'):
+    """صورة حتمية فيها تدرج وأشكال ملونة (تُضغط مثل الصور الحقيقية تقريبًا، لا كلون واحد)."""
+    from PIL import Image, ImageDraw
+    rnd = random.Random(seed)
+    image = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+    draw = ImageDraw.Draw(image)
+    for _ in range(60):
+        x0, y0 = rnd.randrange(width), rnd.randrange(height)
+        x1, y1 = min(width, x0 + rnd.randint(20, width // 3)), min(height, y0 + rnd.randint(20, height // 3))
+        draw.rectangle([x0, y0, x1, y1], fill=(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)))
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, quality=90)
+    return buffer.getvalue()
+
+class FixtureServer:
+    """خادم HTTP محلي يقدّم قاموس {مسار: بايتات}؛ يُستخدم كسياق: with FixtureServer(routes) as server: server.base_url"""
+    def __init__(self, routes=None, host='127.0.0.1'):
+        self.routes = dict(routes or {})
+        self.requests_served = 0
+        server = self
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = server.routes.get(self.path.split('?', 1)[0])
+                server.requests_served += 1
+                if body is None: self.send_error(404); return
+                self.send_response(200)
+                self.send_header('Content-Type', server.content_type(self.path))
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            def log_message(self, *args): pass
+        self._httpd = ThreadingHTTPServer((host, 0), Handler)
+        self._httpd.daemon_threads = True
+        self.base_url = f"http://{host}:{self._httpd.server_address[1]}"
+        self._thread = None
+
+    @staticmethod
+    def content_type(path):
+        path = path.split('?', 1)[0]
+        if path.endswith('.xml'): return 'application/xml; charset=utf-8'
+        if path.endswith(('.jpg', '.jpeg')): return 'image/jpeg'
+        if path.endswith('.png'): return 'image/png'
+        return 'text/html; charset=utf-8'
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown(); self._httpd.server_close()
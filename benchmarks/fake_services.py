@@ -0,0 +1,310 @@
+# benchmarks/fake_services.py
+"""
+خدمات محلية وهمية لتشغيل دورة النشر كاملة دون شبكة:
+- موقع أخبار: /sitemap_index.xml وخرائط فرعية، صفحات مقالات /news/<id>/ (بنمط b2b-sy) وصورها /images/<id>-<n>.jpg
+- ImgBB: POST /imgbb/1/upload  (نفس شكل استجابة api.imgbb.com) والصور المرفوعة /imgbb/i/<n>.jpg
+- Blogger v3 REST: /v3/blogs/<blogId>/posts (insert, list, get, patch/update, delete) مع تخزين في الذاكرة
+- Telegram Bot API: /bot<token>/<method> (sendPhoto, sendMessage, getMe)
+لكل خدمة ملف أعطال (FaultProfile): تأخير ثابت + عشوائي، ونسبة أخطاء بحالة HTTP محددة (0 = قطع الاتصال دون رد).
+
+    python benchmarks/fake_services.py --articles 500 --latency blogger=150 --errors imgbb=0.1:500
+يطبع إعدادات التوجيه (config.ini ومتغيرات البيئة) ويبقى يعمل حتى Ctrl+C.
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+if BENCH_DIR not in sys.path: sys.path.insert(0, BENCH_DIR)
+
+from bench_fixtures import read_fixture, load_headlines, generate_image
+
+SERVICES = ('site', 'imgbb', 'blogger', 'telegram')
+FAKE_BLOG_ID = '1000000000000000001'
+FAKE_TELEGRAM_TOKEN = '123456:FAKE-TOKEN'
+
+class FaultProfile:
+    """latency_ms + عشوائي حتى jitter_ms لكل طلب، وerror_rate من الطلبات تفشل بالحالة error_status."""
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, error_status=500):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+    def delay_sec(self, rnd):
+        return (self.latency_ms + (rnd.uniform(0, self.jitter_ms) if self.jitter_ms else 0)) / 1000.0
+
+    def should_fail(self, rnd):
+        return self.error_rate > 0 and rnd.random() < self.error_rate
+
+def _now_rfc3339():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+class FakeServices:
+    """
+    كل الخدمات على منفذ واحد. articles: عدد المقالات في خريطة الموقع، images_per_article: صور المحتوى لكل مقال.
+    الاستخدام كسياق: with FakeServices(articles=300) as fake: fake.config_overrides() ...
+    """
+    def __init__(self, articles=200, images_per_article=2, seed=1, faults=None, host='127.0.0.1', port=0):
+        self.articles = articles
+        self.images_per_article = images_per_article
+        self.faults = {name: FaultProfile() for name in SERVICES}
+        self.faults.update(faults or {})
+        self._rnd = random.Random(seed)
+        self._rnd_lock = threading.Lock()
+        self._data_lock = threading.Lock()
+        self.stats = {name: {'requests': 0, 'errors': 0, 'bytes_in': 0, 'bytes_out': 0} for name in SERVICES}
+        self.posts = {} # blog_id -> {post_id: post}
+        self.uploads = 0
+        self.telegram_messages = []
+        self._next_post_id = 7000000000000000000
+        self._headlines = load_headlines()
+        self._article_template = read_fixture('articles/b2b_sy_article.html')
+        self._template_title = self._headlines[0]
+        self._images = {} # تنوع محدود من الصور يكفي لاختبار الحمل دون توليد صورة لكل رابط
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self.base_url = f"http://{host}:{self._httpd.server_address[1]}"
+        self._thread = None
+
+    # --- التشغيل ---
+    def __enter__(self):
+        self.start(); return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._httpd.shutdown(); self._httpd.server_close()
+
+    # --- التوجيه ---
+    def config_overrides(self):
+        """{(القسم، المفتاح): القيمة} لنسخة من bot_scripts/scraper/config.ini تشير إلى هذه الخدمات."""
+        return {('Scraping', 'SitemapURL'): f"{self.base_url}/sitemap_index.xml",
+                ('ImageHosting_ImgBB', 'UploadUrl'): f"{self.base_url}/imgbb/1/upload",
+                ('ImageHosting_ImgBB', 'ApiKey'): 'fake-imgbb-key',
+                ('BloggerAPI', 'ApiEndpoint'): f"{self.base_url}/",
+                ('BloggerAPI', 'BlogID'): FAKE_BLOG_ID}
+
+    def env_overrides(self):
+        return {'TELEGRAM_API_BASE_URL': f"{self.base_url}/bot"}
+
+    @staticmethod
+    def write_fake_credentials(creds_dir):
+        """token.json صالح حتى 2099 حتى لا تحاول google-auth التحديث عبر الشبكة."""
+        os.makedirs(creds_dir, exist_ok=True)
+        token = {'token': 'fake-access-token', 'refresh_token': 'fake-refresh-token', 'client_id': 'fake.apps.googleusercontent.com',
+                 'client_secret': 'fake-secret', 'token_uri': 'http://127.0.0.1:9/token',
+                 'scopes': ['https://www.googleapis.com/auth/blogger'], 'expiry': '2099-01-01T00:00:00Z'}
+        with open(os.path.join(creds_dir, 'token.json'), 'w', encoding='utf-8') as f: json.dump(token, f)
+        return creds_dir
+
+    def article_urls(self):
+        return [f"{self.base_url}/news/{100000 + i}/" for i in range(self.articles)]
+
+    def published_count(self, blog_id=None):
+        with self._data_lock:
+            if blog_id is not None: return len(self.posts.get(str(blog_id), {}))
+            return sum(len(posts) for posts in self.posts.values())
+
+    # --- المحتوى ---
+    def _sitemaps(self, path, per_file=1000):
+        urls = self.article_urls()
+        if path == '/sitemap_index.xml':
+            entries = "".join(f"<sitemap><loc>{self.base_url}/sitemap-posts-{n + 1}.xml</loc></sitemap>" for n in range((len(urls) + per_file - 1) // per_file))
+            return ('<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                    + entries + "</sitemapindex>").encode('utf-8')
+        match = re.fullmatch(r'/sitemap-posts-(\d+)\.xml', path)
+        if not match: return None
+        start = (int(match.group(1)) - 1) * per_file
+        entries = "".join(f"<url><loc>{url}</loc><lastmod>2024-08-{1 + (start + i) % 28:02d}T10:00:00+03:00</lastmod></url>"
+                          for i, url in enumerate(urls[start:start + per_file]))
+        return ('<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                + entries + "</urlset>").encode('utf-8')
+
+    def _article(self, article_id):
+        if not 100000 <= article_id < 100000 + self.articles: return None
+        title = f"{self._headlines[article_id % len(self._headlines)]} ({article_id})"
+        page = self._article_template.replace(self._template_title, title)
+        # صور المحتوى في القالب (data-src كسول) تشير إلى صور هذا المقال على الخادم المحلي
+        counter = iter(range(1000))
+        page = re.sub(r'data-src="[^"]+"', lambda m: f'data-src="/images/{article_id}-{next(counter) % max(1, self.images_per_article)}.jpg"', page)
+        page = page.replace('https://b2b-sy.com/uploads/2024/08/main-feature.jpg', f"{self.base_url}/images/{article_id}-main.jpg")
+        page = page.replace('/uploads/2024/08/main-feature.jpg', f"/images/{article_id}-main.jpg")
+        return page.encode('utf-8')
+
+    def _image(self, name):
+        variant = sum(map(ord, name)) % 4
+        with self._data_lock:
+            if variant not in self._images: self._images[variant] = generate_image(*((1280, 720), (1024, 768), (800, 600), (1600, 900))[variant], seed=variant)
+            return self._images[variant]
+
+    # --- Blogger ---
+    def _blogger(self, method, path, query, body):
+        match = re.fullmatch(r'/v3/blogs/([^/]+)/posts(?:/([^/]+))?', path)
+        if not match: return 404, {'error': {'code': 404, 'message': 'Not Found'}}
+        blog_id, post_id = match.group(1), match.group(2)
+        with self._data_lock:
+            posts = self.posts.setdefault(blog_id, {})
+            if method == 'POST' and not post_id:
+                data = json.loads(body or b'{}')
+                self._next_post_id += 1; new_id = str(self._next_post_id); now = _now_rfc3339()
+                post = {'kind': 'blogger#post', 'id': new_id, 'blog': {'id': blog_id}, 'title': data.get('title', ''),
+                        'content': data.get('content', ''), 'labels': data.get('labels', []), 'published': now, 'updated': now,
+                        'url': f"{self.base_url}/blog/{blog_id}/{new_id}.html",
+                        'status': 'DRAFT' if query.get('isDraft', ['false'])[0] == 'true' else 'LIVE'}
+                posts[new_id] = post
+                return 200, post
+            if method == 'GET' and not post_id:
+                ordered = sorted(posts.values(), key=lambda p: p['updated'] if query.get('orderBy', [''])[0] == 'updated' else p['published'], reverse=True)
+                labels = query.get('labels', [''])[0]
+                if labels: ordered = [p for p in ordered if set(labels.split(',')) & set(p['labels'])]
+                start = int(query.get('pageToken', ['0'])[0] or 0); size = int(query.get('maxResults', ['20'])[0])
+                page = ordered[start:start + size]
+                if query.get('fetchBodies', ['true'])[0] == 'false': page = [{k: v for k, v in p.items() if k != 'content'} for p in page]
+                result = {'kind': 'blogger#postList', 'items': page}
+                if start + size < len(ordered): result['nextPageToken'] = str(start + size)
+                return 200, result
+            post = posts.get(post_id)
+            if post is None: return 404, {'error': {'code': 404, 'message': 'Post not found'}}
+            if method == 'GET': return 200, post
+            if method in ('PUT', 'PATCH'):
+                post.update({k: v for k, v in json.loads(body or b'{}').items() if k in ('title', 'content', 'labels')})
+                post['updated'] = _now_rfc3339()
+                return 200, post
+            if method == 'DELETE':
+                del posts[post_id]; return 204, None
+        return 405, {'error': {'code': 405, 'message': 'Method not allowed'}}
+
+    # --- Telegram ---
+    def _telegram(self, path):
+        match = re.fullmatch(r'/bot([^/]+)/(\w+)', path)
+        if not match: return 404, {'ok': False, 'error_code': 404, 'description': 'Not Found'}
+        method = match.group(2)
+        if method == 'getMe':
+            return 200, {'ok': True, 'result': {'id': 123456, 'is_bot': True, 'first_name': 'FakeBot', 'username': 'fake_bot'}}
+        with self._data_lock:
+            self.telegram_messages.append(method); message_id = len(self.telegram_messages)
+        return 200, {'ok': True, 'result': {'message_id': message_id, 'date': int(time.time()),
+                                            'chat': {'id': -1001234567890, 'type': 'channel', 'title': 'Fake Channel'}}}
+
+    def _route(self, method, path, query, body):
+        """يعيد (الخدمة، الحالة، نوع المحتوى، البايتات)."""
+        if path.startswith('/v3/blogs/'):
+            status, payload = self._blogger(method, path, query, body)
+            return 'blogger', status, 'application/json; charset=UTF-8', b'' if payload is None else json.dumps(payload).encode('utf-8')
+        if path.startswith('/imgbb/'):
+            if method == 'POST' and path == '/imgbb/1/upload':
+                with self._data_lock: self.uploads += 1; upload_no = self.uploads
+                hosted_url = f"{self.base_url}/imgbb/i/{upload_no}.jpg"
+                payload = {'data': {'id': f"fake{upload_no}", 'url': hosted_url, 'display_url': hosted_url},
+                           'success': True, 'status': 200}
+                return 'imgbb', 200, 'application/json', json.dumps(payload).encode('utf-8')
+            if method == 'GET' and path.startswith('/imgbb/i/'): return 'imgbb', 200, 'image/jpeg', self._image(path)
+            return 'imgbb', 404, 'application/json', b'{"success": false}'
+        if path.startswith('/bot'):
+            status, payload = self._telegram(path)
+            return 'telegram', status, 'application/json', json.dumps(payload).encode('utf-8')
+        if path.endswith('.xml'):
+            content = self._sitemaps(path)
+            return 'site', (200 if content else 404), 'application/xml; charset=utf-8', content or b''
+        match = re.fullmatch(r'/news/(\d+)/', path)
+        if match:
+            content = self._article(int(match.group(1)))
+            return 'site', (200 if content else 404), 'text/html; charset=utf-8', content or b''
+        if path.startswith('/images/'): return 'site', 200, 'image/jpeg', self._image(path)
+        return 'site', 404, 'text/plain', b'not found'
+
+    @staticmethod
+    def service_of(path):
+        if path.startswith('/v3/blogs/'): return 'blogger'
+        if path.startswith('/imgbb/'): return 'imgbb'
+        if path.startswith('/bot'): return 'telegram'
+        return 'site'
+
+    def _make_handler(self):
+        services = self
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _handle(self):
+                parts = urlsplit(self.path); path = parts.path; query = parse_qs(parts.query)
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                service = services.service_of(path); profile = services.faults[service]
+                with services._rnd_lock:
+                    delay = profile.delay_sec(services._rnd); fail = profile.should_fail(services._rnd)
+                if delay: time.sleep(delay)
+                stats = services.stats[service]
+                with services._data_lock: stats['requests'] += 1; stats['bytes_in'] += len(body)
+                if fail:
+                    with services._data_lock: stats['errors'] += 1
+                    if profile.error_status == 0: # انقطاع الاتصال دون رد (لاختبار المهلات وإعادة المحاولة)
+                        self.close_connection = True; self.connection.close(); return
+                    payload = json.dumps({'error': {'code': profile.error_status, 'message': 'Injected failure'}}).encode('utf-8')
+                    self._reply(profile.error_status, 'application/json', payload, retry_after=profile.error_status in (429, 503))
+                    return
+                _, status, content_type, payload = services._route(self.command, path, query, body)
+                with services._data_lock: stats['bytes_out'] += len(payload)
+                self._reply(status, content_type, payload)
+
+            def _reply(self, status, content_type, payload, retry_after=False):
+                self.send_response(status)
+                if retry_after: self.send_header('Retry-After', '1')
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                if payload and self.command != 'HEAD': self.wfile.write(payload)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = _handle
+
+            def log_message(self, *args): pass
+        return Handler
+
+def parse_fault_args(latency_args, error_args):
+    """--latency blogger=200[:100]  --errors imgbb=0.1[:429]  ->  {service: FaultProfile}"""
+    faults = {}
+    def profile(service):
+        if service not in SERVICES: raise ValueError(f"Unknown service '{service}'. Available: {', '.join(SERVICES)}")
+        return faults.setdefault(service, FaultProfile())
+    for item in latency_args or []:
+        service, _, value = item.partition('='); latency, _, jitter = value.partition(':')
+        target = profile(service); target.latency_ms = float(latency); target.jitter_ms = float(jitter or 0)
+    for item in error_args or []:
+        service, _, value = item.partition('='); rate, _, status = value.partition(':')
+        target = profile(service); target.error_rate = float(rate); target.error_status = int(status or 500)
+    return faults
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local fake news site, ImgBB, Blogger v3 and Telegram Bot API.")
+    parser.add_argument("--port", type=int, default=0, help="Port to listen on (0 = any free port).")
+    parser.add_argument("--articles", type=int, default=200, help="Articles listed in the fake sitemap.")
+    parser.add_argument("--latency", nargs='*', metavar='SERVICE=MS[:JITTER]', help="Per-service latency, e.g. blogger=200:100.")
+    parser.add_argument("--errors", nargs='*', metavar='SERVICE=RATE[:STATUS]', help="Per-service failure rate, e.g. imgbb=0.1:429 (status 0 drops the connection).")
+    args = parser.parse_args(argv)
+    try: faults = parse_fault_args(args.latency, args.errors)
+    except ValueError as e: print(e); return 2
+    with FakeServices(articles=args.articles, faults=faults, port=args.port) as fake:
+        print(f"Fake services listening on {fake.base_url}")
+        for (section, key), value in fake.config_overrides().items(): print(f"  [{section}] {key} = {value}")
+        for key, value in fake.env_overrides().items(): print(f"  env {key}={value}")
+        try:
+            while True: time.sleep(1)
+        except KeyboardInterrupt: pass
+        print(json.dumps(fake.stats, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
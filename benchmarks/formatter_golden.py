@@ -0,0 +1,88 @@
+# benchmarks/formatter_golden.py
+"""
+مقارنة مخرجات ContentFormatter.format_for_blogger مع مخرجات مرجعية محفوظة (golden corpus) في
+benchmarks/fixtures/formatter_golden: لكل حالة <name>.html (محتوى مقال خام كما يعيده الكاشط) يوجد
+<name>.expected.html (الإعدادات الافتراضية) و<name>.br.expected.html (ExtraBreakAfterParagraph = true).
+المخرجات المرجعية وُلّدت من المنسّق قبل استبدال تمريرات find_all بالمرورين (_normalize_tree و_prune_empty_blocks)،
+فأي اختلاف يعني تغيّرًا في السلوك. يخرج برمز 1 ويطبع الفرق عند أي اختلاف.
+صور التحميل الكسول في الحالات تحمل src حقيقيًا: حل data-src مع src مؤقت تغيّر عمدًا مع فهرس الصور (core/image_index.py).
+
+    python benchmarks/formatter_golden.py
+    python benchmarks/formatter_golden.py --update     # بعد تغيير مقصود في مخرجات المنسّق فقط
+"""
+import os
+import sys
+import glob
+import logging
+import argparse
+import difflib
+import configparser
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BENCH_DIR, '..'))
+if PROJECT_ROOT not in sys.path: sys.path.insert(0, PROJECT_ROOT)
+
+GOLDEN_DIR = os.path.join(BENCH_DIR, 'fixtures', 'formatter_golden')
+MAIN_IMAGE_URL = "https://i.ibb.co/golden/main.jpg"
+ARTICLE_TITLE = "عنوان المقال للاختبار"
+# الصور التي يحتوي رابطها على هذا النص تُترك خارج خريطة الصور (لاختبار حذف الصور غير المستضافة)
+UNMAPPED_MARKER = 'not-hosted'
+VARIANTS = (('expected', False), ('br.expected', True))
+
+def build_formatter(extra_br_after_p):
+    """إعدادات ثابتة (لا تُقرأ من config.ini حتى لا تتغير المخرجات المرجعية بتعديل البادئة واللاحقة)."""
+    from core.content_formatter import ContentFormatter
+    config = configparser.ConfigParser()
+    config.read_dict({'ContentFormatting': {'PrefixContentHTML': '', 'SuffixContentHTML': '',
+                                            'ExtraBreakAfterParagraph': str(extra_br_after_p).lower(), 'RemoveInternalLinks': 'true'}})
+    return ContentFormatter(config)
+
+def images_map_for(raw_html):
+    """خريطة حتمية {src الأصلي: رابط مستضاف} لكل صورة في الحالة بترتيب ظهورها."""
+    from bs4 import BeautifulSoup
+    images_map = {}
+    for img in BeautifulSoup(raw_html, 'html.parser').find_all('img'):
+        src = img.get('src')
+        if src and UNMAPPED_MARKER not in src and src not in images_map: images_map[src] = f"https://i.ibb.co/golden/{len(images_map)}.jpg"
+    return images_map
+
+def format_case(formatter, raw_html):
+    return formatter.format_for_blogger(raw_html_content=raw_html, processed_images_map=images_map_for(raw_html),
+                                        main_hosted_image_url_for_prepend=MAIN_IMAGE_URL, article_title_for_alt=ARTICLE_TITLE, dynamic_rules={})
+
+def iter_cases():
+    for path in sorted(glob.glob(os.path.join(GOLDEN_DIR, '*.html'))):
+        name = os.path.basename(path)
+        if '.expected.' in name: continue
+        with open(path, 'r', encoding='utf-8') as f: yield name[:-len('.html')], f.read()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diff ContentFormatter output against the checked-in golden corpus.")
+    parser.add_argument("--update", action='store_true', help="Rewrite the expected outputs from the current formatter.")
+    args = parser.parse_args(argv)
+    logging.disable(logging.WARNING) # تحذيرات الصور غير المستضافة متوقعة في بعض الحالات
+
+    formatters = {suffix: build_formatter(extra_br) for suffix, extra_br in VARIANTS}
+    checked = 0; mismatches = []
+    for name, raw_html in iter_cases():
+        for suffix, formatter in formatters.items():
+            actual = format_case(formatter, raw_html) + "\n"
+            expected_path = os.path.join(GOLDEN_DIR, f"{name}.{suffix}.html")
+            if args.update:
+                with open(expected_path, 'w', encoding='utf-8') as f: f.write(actual)
+                continue
+            try:
+                with open(expected_path, 'r', encoding='utf-8') as f: expected = f.read()
+            except FileNotFoundError: mismatches.append((expected_path, "missing expected output (run with --update)")); continue
+            checked += 1
+            if actual != expected:
+                diff = "".join(difflib.unified_diff(expected.splitlines(True), actual.splitlines(True), 'expected', 'actual', n=1))
+                mismatches.append((expected_path, diff))
+    if args.update: print(f"Updated expected outputs in {GOLDEN_DIR}"); return 0
+    for path, detail in mismatches: print(f"MISMATCH {os.path.relpath(path, PROJECT_ROOT)}\n{detail}")
+    if mismatches: print(f"FAIL: {len(mismatches)} of {checked} outputs differ from the golden corpus."); return 1
+    print(f"OK: {checked} outputs match the golden corpus.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
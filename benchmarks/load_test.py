@@ -0,0 +1,109 @@
+# benchmarks/load_test.py
+"""
+اختبار حمل لدورة النشر كاملة (run_bot_cycle أو المنسّق متعدد الأهداف) ضد الخدمات الوهمية في fake_services.py:
+نسخة مؤقتة من config.ini تشير إلى الخادم المحلي، token.json وهمي، مترجم stub، وكل ملفات الحالة في مجلد مؤقت.
+يطبع إنتاجية الدورة (مقالات/ثانية)، طلبات وأخطاء كل خدمة، وملخص أزمنة المراحل من core/instrumentation.py.
+
+    python benchmarks/load_test.py --articles 300
+    python benchmarks/load_test.py --articles 200 --targets 5 --latency blogger=150:50 --errors imgbb=0.05:500
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import configparser
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BENCH_DIR, '..'))
+for path in (PROJECT_ROOT, BENCH_DIR):
+    if path not in sys.path: sys.path.insert(0, path)
+
+from fake_services import FakeServices, FAKE_BLOG_ID, parse_fault_args
+
+SCRAPER_DIR = os.path.join(PROJECT_ROOT, 'bot_scripts', 'scraper')
+
+def write_load_config(fake, work_dir, articles):
+    """نسخة من config.ini بتوجيه الخدمات إلى fake وملفات الحالة داخل work_dir."""
+    config = configparser.ConfigParser(interpolation=configparser.ExtendedInterpolation())
+    config.read(os.path.join(SCRAPER_DIR, 'config.ini'), encoding='utf-8')
+    overrides = dict(fake.config_overrides())
+    overrides.update({
+        ('Paths', 'PublishedUrlsFile'): os.path.join(work_dir, 'published_source_urls.txt'),
+        ('Paths', 'LogFile'): os.path.join(work_dir, 'bot_activity.log'),
+        ('Paths', 'SelectorStatsFile'): os.path.join(work_dir, 'selector_stats.json'),
+        ('Paths', 'DocumentFrequencyFile'): os.path.join(work_dir, 'keyword_df_index.npz'),
+        ('Paths', 'MetricsFile'): os.path.join(work_dir, 'cycle_metrics.jsonl'),
+        ('Translation', 'Backend'): 'stub',
+        ('Translation', 'CacheFile'): os.path.join(work_dir, 'translation_cache.sqlite'),
+        ('BotSettings', 'MaxArticlesPerRun'): str(articles),
+        ('BotSettings', 'DelayBetweenPostsSec'): '0',
+    })
+    for (section, key), value in overrides.items():
+        if not config.has_section(section): config.add_section(section)
+        config.set(section, key, value)
+    config_path = os.path.join(work_dir, 'config.ini')
+    with open(config_path, 'w', encoding='utf-8') as f: config.write(f)
+    shutil.copy(os.path.join(SCRAPER_DIR, 'replacements.json'), work_dir)
+    return config_path
+
+def run_load_test(articles, targets=1, workers=4, faults=None, verbose=False):
+    from bot_scripts.scraper import main as bot
+    from core import instrumentation
+    with tempfile.TemporaryDirectory(prefix='load_test_') as work_dir, FakeServices(articles=articles, faults=faults) as fake:
+        saved_env = {key: os.environ.get(key) for key in fake.env_overrides()}
+        os.environ.update(fake.env_overrides())
+        saved_config_file = bot.CONFIG_FILE; saved_cwd = os.getcwd()
+        try:
+            os.chdir(PROJECT_ROOT) # مسارات الشعارات في config.ini نسبية للمشروع
+            bot.CONFIG_FILE = write_load_config(fake, work_dir, articles)
+            creds_path = fake.write_fake_credentials(os.path.join(work_dir, 'creds'))
+            if not verbose: logging.disable(logging.ERROR) # الأخطاء المحقونة متوقعة؛ تظهر في إحصاءات الخدمات
+            bot.load_app_config(); bot._cycle_tools.clear()
+            started = time.perf_counter()
+            if targets <= 1: bot.run_bot_cycle(creds_path)
+            else:
+                from bot_scripts.scraper.orchestrator import Orchestrator
+                specs = [{'name': f"load{i + 1}", 'creds_path': creds_path, 'blog_id': str(int(FAKE_BLOG_ID) + i),
+                          'published_urls_file': os.path.join(work_dir, f"published_load{i + 1}.txt")} for i in range(targets)]
+                Orchestrator(specs, workers=workers).run()
+            elapsed = time.perf_counter() - started
+            summary = instrumentation.get_metrics().summary()
+        finally:
+            logging.disable(logging.NOTSET)
+            bot.CONFIG_FILE = saved_config_file; bot._cycle_tools.clear(); os.chdir(saved_cwd)
+            for key, value in saved_env.items():
+                if value is None: os.environ.pop(key, None)
+                else: os.environ[key] = value
+        published = fake.published_count()
+        return {'articles': articles, 'targets': targets, 'published': published, 'elapsed_sec': round(elapsed, 3),
+                'posts_per_sec': round(published / elapsed, 2) if elapsed else 0.0, 'services': fake.stats, 'stages': summary}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end load test of the publish cycle against local fake services.")
+    parser.add_argument("--articles", type=int, default=100, help="Articles in the fake sitemap (and MaxArticlesPerRun).")
+    parser.add_argument("--targets", type=int, default=1, help="Blogs to publish to (more than 1 runs the orchestrator).")
+    parser.add_argument("--workers", type=int, default=4, help="Orchestrator threads.")
+    parser.add_argument("--latency", nargs='*', metavar='SERVICE=MS[:JITTER]', help="Per-service latency, e.g. blogger=200:100.")
+    parser.add_argument("--errors", nargs='*', metavar='SERVICE=RATE[:STATUS]', help="Per-service failure rate, e.g. imgbb=0.1:429.")
+    parser.add_argument("--verbose", action='store_true', help="Keep the bot's INFO logs.")
+    parser.add_argument("--json", action='store_true', help="Print the result as JSON.")
+    args = parser.parse_args(argv)
+    try: faults = parse_fault_args(args.latency, args.errors)
+    except ValueError as e: print(e); return 2
+
+    result = run_load_test(args.articles, targets=args.targets, workers=args.workers, faults=faults, verbose=args.verbose)
+    if args.json: print(json.dumps(result, ensure_ascii=False, indent=2)); return 0
+    print(f"Published {result['published']} posts ({result['articles']} source articles, {result['targets']} targets) "
+          f"in {result['elapsed_sec']:.2f}s -> {result['posts_per_sec']:.2f} posts/s")
+    for service, stats in result['services'].items():
+        print(f"  {service:<9} requests {stats['requests']:6}  errors {stats['errors']:5}  in {stats['bytes_in'] / 1024:9.1f}KB  out {stats['bytes_out'] / 1024:9.1f}KB")
+    for stage, stats in result['stages'].items():
+        print(f"  {stage:<16} count {stats['count']:6}  p50 {stats['p50_ms']:8.1f}ms  p95 {stats['p95_ms']:8.1f}ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
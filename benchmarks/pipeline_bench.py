@@ -0,0 +1,248 @@
+# benchmarks/pipeline_bench.py
+"""
+قياس أداء مكونات خط النشر دون اتصال بالإنترنت (كل الطلبات إلى خادم محلي يقدّم benchmarks/fixtures).
+لكل قياس: الإنتاجية (عمليات/ثانية، الوسيط عبر عدة تكرارات) وذروة ذاكرة Python (tracemalloc) لاستدعاء واحد،
+وتُقارن بـ benchmarks/baselines.json: يخرج السكربت برمز 1 إذا انخفضت الإنتاجية تحت min_ops_per_sec
+أو تجاوزت الذاكرة max_peak_kb لأي قياس.
+
+    python benchmarks/pipeline_bench.py
+    python benchmarks/pipeline_bench.py --only scrape_b2b_sy format_ajel --repeats 9
+    python benchmarks/pipeline_bench.py --update-baselines      # بعد تغيير مقصود في الأداء
+    python benchmarks/pipeline_bench.py --startup               # مع ميزانية بدء التشغيل (startup_budget.py)
+"""
+import os
+import io
+import sys
+import json
+import time
+import logging
+import argparse
+import statistics
+import tracemalloc
+import contextlib
+import configparser
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BENCH_DIR, '..'))
+for path in (PROJECT_ROOT, BENCH_DIR):
+    if path not in sys.path: sys.path.insert(0, path)
+
+from bench_fixtures import (ARTICLE_FIXTURES, IMAGE_SIZES, FixtureServer, read_fixture, load_headlines,
+                            generate_site_urls, generate_sitemap_index, generate_image)
+
+BASELINES_FILE = os.path.join(BENCH_DIR, 'baselines.json')
+SCRAPER_CONFIG_FILE = os.path.join(PROJECT_ROOT, 'bot_scripts', 'scraper', 'config.ini')
+# هامش التراجع المسموح عند كتابة خط أساس جديد (الأجهزة والتحميل يختلفان من تشغيل لآخر)
+DEFAULT_THROUGHPUT_TOLERANCE = 0.35
+DEFAULT_MEMORY_TOLERANCE = 0.25
+
+BENCHMARKS = {}
+
+def benchmark(name):
+    """يسجل دالة تهيئة: setup(ctx) تعيد (الدالة المقاسة، عدد العمليات في كل استدعاء)."""
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return decorator
+
+class BenchContext:
+    """إعدادات config.ini للبوت (بدون ملفات حالة) وخادم الملفات المحلي، مشتركة بين القياسات."""
+    def __init__(self, server, work_dir):
+        self.server = server
+        self.work_dir = work_dir
+        self.config = configparser.ConfigParser(interpolation=configparser.ExtendedInterpolation())
+        self.config.read(SCRAPER_CONFIG_FILE, encoding='utf-8')
+        self.config.set('Paths', 'SelectorStatsFile', os.path.join(work_dir, 'selector_stats.json'))
+        self.config.set('Paths', 'DocumentFrequencyFile', os.path.join(work_dir, 'keyword_df_index.npz'))
+        self.config.set('Paths', 'MetricsFile', '')
+        if not self.config.has_section('Keywords'): self.config.add_section('Keywords')
+        self.config.set('Keywords', 'NumKeywords', '8')
+        self._scraped = {}
+
+    def article_url(self, name):
+        return self.server.base_url + ARTICLE_FIXTURES[name][2]
+
+    def scraped_article(self, name):
+        if name not in self._scraped:
+            from core.article_scraper import ArticleScraper
+            self._scraped[name] = ArticleScraper(self.config).scrape_article_details(self.article_url(name))
+        return self._scraped[name]
+
+def _register_article_benchmarks():
+    for name in ARTICLE_FIXTURES:
+        @benchmark(f"scrape_{name}")
+        def setup_scrape(ctx, name=name):
+            from core.article_scraper import ArticleScraper
+            scraper = ArticleScraper(ctx.config); url = ctx.article_url(name)
+            return (lambda: scraper.scrape_article_details(url)), 1
+
+        @benchmark(f"format_{name}")
+        def setup_format(ctx, name=name):
+            from core.content_formatter import ContentFormatter
+            from core.image_index import ImageIndex
+            formatter = ContentFormatter(ctx.config, config_filepath=SCRAPER_CONFIG_FILE)
+            scraped = ctx.scraped_article(name); url = ctx.article_url(name)
+            def run():
+                # فهرس جديد لكل استدعاء كما في prepare_article
+                image_index = ImageIndex(base_url=url)
+                for i, image in enumerate(scraped['images_in_content_details']):
+                    image_index.add(image['original_tag_src'], f"https://i.ibb.co/bench/{i}.jpg", full_url=image['full_url'])
+                return formatter.format_for_blogger(raw_html_content=scraped['raw_html_content'], processed_images_map=image_index,
+                                                    main_hosted_image_url_for_prepend="https://i.ibb.co/bench/main.jpg",
+                                                    article_title_for_alt=scraped['title'], dynamic_rules={}, source_url=url)
+            return run, 1
+
+_register_article_benchmarks()
+
+@benchmark('url_filter_50k')
+def setup_url_filter(ctx):
+    from core.sitemap_fetcher import is_potential_article_url
+    urls = generate_site_urls('b2b-sy.com', 50000, seed=7)
+    return (lambda: sum(1 for url in urls if is_potential_article_url(url, 'b2b-sy.com'))), len(urls)
+
+@benchmark('sitemap_fetch_50k')
+def setup_sitemap_fetch(ctx):
+    from core.sitemap_fetcher import fetch_urls_from_sitemap
+    netloc = ctx.server.base_url.split('://', 1)[1]
+    routes = generate_sitemap_index(domain=netloc, total_urls=50000, urls_per_file=5000, seed=3, base_url=ctx.server.base_url)
+    ctx.server.routes.update(routes)
+    sitemap_url = ctx.server.base_url + '/sitemap_index.xml'
+    return (lambda: fetch_urls_from_sitemap(sitemap_url, 'BenchBot/1.0', sitemap_fetch_delay_sec=0)), 50000
+
+@benchmark('keywords_articles')
+def setup_keywords(ctx):
+    from bs4 import BeautifulSoup
+    from core.keyword_extractor import KeywordExtractor
+    extractor = KeywordExtractor(ctx.config)
+    texts = [BeautifulSoup(ctx.scraped_article(name)['raw_html_content'], 'html.parser').get_text(separator=' ', strip=True) for name in ARTICLE_FIXTURES]
+    texts += load_headlines()
+    return (lambda: [extractor.extract_keywords(text) for text in texts]), len(texts)
+
+def _register_image_benchmarks():
+    for width, height in IMAGE_SIZES:
+        @benchmark(f"image_logo_{width}x{height}")
+        def setup_image(ctx, width=width, height=height):
+            from core.image_processor import ImageProcessor
+            path = f"/images/photo_{width}x{height}.jpg"
+            ctx.server.routes[path] = generate_image(width, height, seed=width)
+            processor = ImageProcessor(ctx.config); url = ctx.server.base_url + path
+            return (lambda: processor.process_image_with_logo(url)), 1
+
+_register_image_benchmarks()
+
+def _image_creator_benchmark(design):
+    def setup(ctx):
+        from bot_scripts.creator import image_creator
+        background = os.path.join(ctx.work_dir, 'creator_background.jpg')
+        if not os.path.exists(background):
+            with open(background, 'wb') as f: f.write(generate_image(1600, 900, seed=11))
+        create = getattr(image_creator, f"create_{design}_design")
+        headlines = load_headlines(); template = image_creator.NEWS_TEMPLATES["2"]; state = {'i': 0}
+        def run():
+            # السكربت يقرأ الخط والشعار من مجلد المشروع ويكتب الصورة في المجلد الحالي
+            headline = headlines[state['i'] % len(headlines)]; state['i'] += 1
+            with contextlib.redirect_stdout(io.StringIO()): output = create(headline, template, background)
+            if output and os.path.exists(output): os.remove(output)
+            return output
+        return run, 1
+    return setup
+
+BENCHMARKS['creator_classic'] = _image_creator_benchmark('classic')
+BENCHMARKS['creator_cinematic'] = _image_creator_benchmark('cinematic')
+
+def measure(run, ops, repeats, warmup=1):
+    for _ in range(warmup): run()
+    durations = []
+    for _ in range(repeats):
+        started = time.perf_counter(); run(); durations.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try: run(); _, peak = tracemalloc.get_traced_memory()
+    finally: tracemalloc.stop()
+    median = statistics.median(durations)
+    return {'ops_per_call': ops, 'median_ms': round(median * 1000, 3), 'ops_per_sec': round(ops / median, 2) if median else 0.0,
+            'peak_kb': round(peak / 1024, 1)}
+
+def load_baselines(path=BASELINES_FILE):
+    try:
+        with open(path, 'r', encoding='utf-8') as f: return json.load(f)
+    except FileNotFoundError: return {'benchmarks': {}}
+
+def build_baselines(results, previous, throughput_tolerance, memory_tolerance):
+    benchmarks = dict(previous.get('benchmarks', {}))
+    for name, result in results.items():
+        benchmarks[name] = {'ops_per_sec': result['ops_per_sec'], 'peak_kb': result['peak_kb'],
+                            'min_ops_per_sec': round(result['ops_per_sec'] * (1 - throughput_tolerance), 2),
+                            'max_peak_kb': round(result['peak_kb'] * (1 + memory_tolerance) + 64, 1)}
+    return {'python': sys.version.split()[0], 'platform': sys.platform, 'updated_at': time.strftime('%Y-%m-%d'),
+            'benchmarks': dict(sorted(benchmarks.items()))}
+
+def check_regressions(results, baselines, scale):
+    """scale > 1 يرخي الحدود على الأجهزة البطيئة (مثل --scale في startup_budget.py)."""
+    failures = []
+    for name, result in results.items():
+        baseline = baselines.get('benchmarks', {}).get(name)
+        if not baseline: continue
+        min_ops = baseline['min_ops_per_sec'] / scale
+        if result['ops_per_sec'] < min_ops:
+            failures.append(f"{name}: {result['ops_per_sec']:.1f} ops/s is below the threshold {min_ops:.1f} (baseline {baseline['ops_per_sec']:.1f})")
+        if result['peak_kb'] > baseline['max_peak_kb'] * scale:
+            failures.append(f"{name}: peak memory {result['peak_kb']:.0f}KB exceeds {baseline['max_peak_kb'] * scale:.0f}KB (baseline {baseline['peak_kb']:.0f}KB)")
+    return failures
+
+def run_benchmarks(names, repeats):
+    import tempfile
+    results = {}; errors = []
+    with tempfile.TemporaryDirectory(prefix='bench_') as work_dir, FixtureServer() as server:
+        for name, (_, relative_path, path) in ARTICLE_FIXTURES.items(): server.routes[path] = read_fixture(relative_path, 'rb')
+        ctx = BenchContext(server, work_dir)
+        from core import instrumentation
+        for name in names:
+            try:
+                run, ops = BENCHMARKS[name](ctx)
+                instrumentation.get_metrics().start_cycle(f"bench:{name}") # لا تتراكم عينات المراحل بين القياسات
+                results[name] = measure(run, ops, repeats)
+            except Exception as e: errors.append(f"{name}: {type(e).__name__}: {e}")
+    return results, errors
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline throughput/memory benchmarks for the publishing pipeline.")
+    parser.add_argument("--only", nargs='*', choices=sorted(BENCHMARKS), help="Run only these benchmarks.")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed calls per benchmark (the median is reported).")
+    parser.add_argument("--scale", type=float, default=1.0, help="Relax every threshold by this factor (e.g. 2.0 on slow CI machines).")
+    parser.add_argument("--update-baselines", action='store_true', help=f"Write the results to {os.path.relpath(BASELINES_FILE, PROJECT_ROOT)}.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_THROUGHPUT_TOLERANCE, help="Allowed throughput drop when writing baselines.")
+    parser.add_argument("--memory-tolerance", type=float, default=DEFAULT_MEMORY_TOLERANCE, help="Allowed memory growth when writing baselines.")
+    parser.add_argument("--startup", action='store_true', help="Also run the startup-time budget (startup_budget.py).")
+    parser.add_argument("--json", action='store_true', help="Print the results as JSON.")
+    args = parser.parse_args(argv)
+
+    # سجلات INFO من الوحدات تُكتب على stdout وتشوّه القياس؛ الأخطاء تبقى ظاهرة
+    logging.disable(logging.WARNING)
+    previous_cwd = os.getcwd(); os.chdir(PROJECT_ROOT) # مسارات الشعارات والخطوط في config.ini وimage_creator نسبية للمشروع
+    try: results, errors = run_benchmarks(args.only or sorted(BENCHMARKS), max(1, args.repeats))
+    finally: os.chdir(previous_cwd); logging.disable(logging.NOTSET)
+
+    baselines = load_baselines()
+    if args.update_baselines:
+        baselines = build_baselines(results, baselines, args.tolerance, args.memory_tolerance)
+        with open(BASELINES_FILE, 'w', encoding='utf-8') as f: json.dump(baselines, f, ensure_ascii=False, indent=2); f.write("\n")
+    failures = errors + ([] if args.update_baselines else check_regressions(results, baselines, args.scale))
+
+    if args.json: print(json.dumps({'results': results, 'failures': failures}, ensure_ascii=False, indent=2))
+    else:
+        for name, result in results.items():
+            baseline = baselines.get('benchmarks', {}).get(name, {})
+            vs = f"   baseline {baseline['ops_per_sec']:10.1f}" if baseline else ""
+            print(f"{name:<24} {result['ops_per_sec']:10.1f} ops/s  {result['median_ms']:9.2f}ms/call  peak {result['peak_kb']:9.1f}KB{vs}")
+        for failure in failures: print(f"FAIL: {failure}")
+        if args.update_baselines: print(f"Baselines written to {BASELINES_FILE}")
+        elif not failures: print("OK: no benchmark regressed past its baseline threshold.")
+
+    exit_code = 1 if failures else 0
+    if args.startup:
+        import startup_budget
+        exit_code = max(exit_code, startup_budget.main(['--scale', str(args.scale)] + (['--json'] if args.json else [])))
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+# benchmarks/startup_budget.py
+"""
+ميزانية زمن بدء التشغيل لنقاط الدخول.
+كل نقطة دخول تُشغَّل في عملية جديدة مع `python -X importtime` (كما تُشغَّل مهام النشر من app.py)،
+فنقيس مجموع زمن الاستيراد ونتحقق من أن المكتبات الثقيلة لا تُستورد قبل أول استخدام فعلي.
+يخرج السكربت برمز 1 إذا تجاوزت أي نقطة دخول ميزانيتها أو استوردت وحدة ممنوعة.
+
+    python benchmarks/startup_budget.py
+    python benchmarks/startup_budget.py --runs 7 --scale 1.5 --only scraper cleaner
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# المكتبات التي يجب ألا تُستورد عند مجرد تشغيل نقطة الدخول (تُستورد كسولاً عند أول استخدام)
+HEAVY_BOT_MODULES = ('googleapiclient', 'google_auth_oauthlib', 'cloudscraper', 'nltk', 'deep_translator', 'PIL', 'numpy')
+HEAVY_UI_MODULES = ('telegram', 'arabic_reshaper', 'bidi', 'PIL', 'tqdm')
+
+# budget_ms: الحد الأعلى لمجموع زمن الاستيراد (الوسيط عبر عدة تشغيلات)
+ENTRY_POINTS = {
+    'scraper': {'argv': ['bot_scripts/scraper/main.py', '--help'], 'budget_ms': 250, 'forbidden': HEAVY_BOT_MODULES},
+    'cleaner': {'argv': ['bot_scripts/cleaner/clean_posts.py', '--help'], 'budget_ms': 150, 'forbidden': HEAVY_BOT_MODULES},
+    'extractor': {'argv': ['-c', 'import bot_scripts.extractor.links_extractor'], 'budget_ms': 200, 'forbidden': HEAVY_BOT_MODULES},
+    # app.py يُشغَّل دون `streamlit run` (وضع bare) فيرسم صفحة الدخول فقط
+    'app': {'argv': ['app.py'], 'budget_ms': 600, 'forbidden': HEAVY_UI_MODULES},
+}
+
+_IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)\s*$')
+
+def parse_importtime(stderr_text):
+    """يعيد (مجموع زمن الاستيراد بالميكروثانية، مجموعة الوحدات المستوردة) من مخرجات -X importtime."""
+    total_us = 0; modules = set()
+    for line in stderr_text.splitlines():
+        m = _IMPORTTIME_RE.match(line)
+        if not m: continue
+        modules.add(m.group(4))
+        # الوحدات في المستوى الأعلى فقط (بدون إزاحة) حتى لا يُحسب الزمن التراكمي مرتين
+        if len(m.group(3)) == 1: total_us += int(m.group(2))
+    return total_us, modules
+
+def measure_entry_point(name, spec, runs):
+    import_ms, wall_ms, modules = [], [], set()
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    for _ in range(runs):
+        started = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-X', 'importtime'] + spec['argv'], cwd=PROJECT_ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace')
+        wall_ms.append((time.perf_counter() - started) * 1000)
+        total_us, run_modules = parse_importtime(proc.stderr)
+        if proc.returncode != 0:
+            tail = [line for line in proc.stderr.splitlines() if not line.startswith('import time:')][-5:]
+            raise RuntimeError(f"Entry point '{name}' exited with code {proc.returncode}: {' | '.join(tail)}")
+        import_ms.append(total_us / 1000); modules |= run_modules
+    heavy = sorted(mod for mod in modules if mod.split('.')[0] in spec['forbidden'])
+    return {'import_ms': statistics.median(import_ms), 'wall_ms': statistics.median(wall_ms), 'modules': len(modules),
+            'forbidden_imported': sorted({mod.split('.')[0] for mod in heavy})}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Startup-time budget check for the bot entry points.")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per entry point (the median is compared to the budget).")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every budget (e.g. 2.0 on slow CI machines).")
+    parser.add_argument("--only", nargs='*', choices=sorted(ENTRY_POINTS), help="Measure only these entry points.")
+    parser.add_argument("--json", action='store_true', help="Print the results as JSON.")
+    args = parser.parse_args(argv)
+
+    results = {}; failures = []
+    for name in (args.only or ENTRY_POINTS):
+        spec = ENTRY_POINTS[name]
+        try: result = measure_entry_point(name, spec, max(1, args.runs))
+        except RuntimeError as e: failures.append(str(e)); continue
+        result['budget_ms'] = spec['budget_ms'] * args.scale
+        results[name] = result
+        if result['import_ms'] > result['budget_ms']:
+            failures.append(f"{name}: import time {result['import_ms']:.0f}ms exceeds budget {result['budget_ms']:.0f}ms")
+        if result['forbidden_imported']:
+            failures.append(f"{name}: imports heavy modules at startup: {', '.join(result['forbidden_imported'])}")
+
+    if args.json: print(json.dumps({'results': results, 'failures': failures}, ensure_ascii=False, indent=2))
+    else:
+        for name, result in results.items():
+            print(f"{name:<10} import {result['import_ms']:7.1f}ms / budget {result['budget_ms']:7.1f}ms   wall {result['wall_ms']:7.1f}ms   modules {result['modules']}")
+        for failure in failures: print(f"FAIL: {failure}")
+        if not failures: print("OK: all entry points are within their startup budget.")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
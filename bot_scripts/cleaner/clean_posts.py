@@ -7,40 +7,51 @@ import logging
 import argparse
 import sys
 import json  # <-- ✅ استيراد مكتبة JSON
+
+# --- الحل الديناميكي لمسارات الاستيراد ---
+try:
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+except NameError:
+    pass
+# ---------------------------------------------
+
 from bs4 import BeautifulSoup, NavigableString
-from googleapiclient.discovery import build
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
+from core.rule_engine import compile_rules
+from core.google_auth import SCOPES, load_credentials, build_service_from_cache, credentials_fresh
+from core.clean_state import CleanStateStore, content_fingerprint, rules_fingerprint
 
 # --- الإعدادات العامة ---
-SCOPES = ['https://www.googleapis.com/auth/blogger']
 LOG_FILE = 'edited_posts.log'
-logging.basicConfig(filename=LOG_FILE, level=logging.INFO, format='%(asctime)s - %(message)s')
+DISCOVERY_CACHE_DIR = 'discovery_cache'
+DEFAULT_STATE_FILE = 'clean_state.sqlite'
+# غيّر هذا الرقم عند تعديل منطق clean_title/clean_content حتى يُعاد تنظيف كل المقالات
+CLEANER_VERSION = "1"
 
 # ✅ تم حذف CUSTOM_REMOVE_LIST من هنا. سيتم الآن قراءتها من ملف.
 
+# خدمة Blogger لكل مجلد مصادقة تبقى دافئة بين المهام داخل العامل الدائم ما دام رمزها صالحًا
+_services = {}
+
 def get_blogger_service(creds_path):
-    # (هذه الدالة تبقى كما هي)
-    creds = None; token_file = os.path.join(creds_path, 'token.json'); secret_file = os.path.join(creds_path, 'client_secret.json')
-    if os.path.exists(token_file): creds = Credentials.from_authorized_user_file(token_file, SCOPES)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token: creds.refresh(Request())
-        else:
-            if not os.path.exists(secret_file):
-                print(f"خطأ فادح: ملف client_secret.json غير موجود في: {secret_file}"); sys.exit(1)
-            flow = InstalledAppFlow.from_client_secrets_file(secret_file, SCOPES)
-            creds = flow.run_local_server(port=0)
-        with open(token_file, 'w') as token: token.write(creds.to_json())
-    return build('blogger', 'v3', credentials=creds)
+    # نفس مسار المصادقة المشترك مع البوت: تحديث الرمز قرب انتهائه فقط وتحت قفل، ووثيقة اكتشاف مخزنة
+    cached = _services.get(creds_path)
+    if cached and credentials_fresh(cached[0], 300): return cached[1]
+    try:
+        creds = load_credentials(creds_path, SCOPES)
+    except FileNotFoundError:
+        print(f"خطأ فادح: ملف client_secret.json غير موجود في: {os.path.join(creds_path, 'client_secret.json')}"); sys.exit(1)
+    if not creds:
+        print("خطأ فادح: تعذر الحصول على رمز مصادقة صالح."); sys.exit(1)
+    service = build_service_from_cache(creds, 'blogger', 'v3', cache_dir=DISCOVERY_CACHE_DIR)
+    _services[creds_path] = (creds, service)
+    return service
 
 # --- ✅ تم تعديل دوال التنظيف لتقبل القواعد كـ "وسيط" ---
 def clean_title(title, rules):
-    remove_symbols = rules.get('remove_symbols', [])
     title = re.sub(r'\s*\(.*?\)', '', title).strip()
-    for symbol in remove_symbols:
-        title = title.replace(symbol, '')
-    return title
+    return compile_rules(remove_symbols=rules.get('remove_symbols', [])).apply(title)
 
 def extract_keywords(title):
     STOPWORDS = {"عاجل", "تفاصيل", "خبر", "اليوم", "كامل", "فيديو", "شاهد", "بالصور", "بالفيديو", "خاص"}
@@ -65,61 +76,248 @@ def clean_content(content, post_title, rules):
     for comp in soup.find_all('component'):
         if 'googletag.cmd.push' in str(comp): comp.decompose()
 
-    # استخدام القواعد الديناميكية من الملف
-    remove_symbols = rules.get('remove_symbols', [])
-    replacements = rules.get('replacements', [])
+    # استخدام القواعد الديناميكية من الملف (نفس محرك القواعد المستخدم أثناء النشر)
+    rule_set = compile_rules(rules.get('replacements', []), rules.get('remove_symbols', []))
+    if not rule_set: return str(soup)
 
     for text_node in soup.find_all(string=True):
         if isinstance(text_node, NavigableString):
-            text_str = str(text_node)
-            for rep in replacements:
-                text_str = text_str.replace(rep.get('find', ''), rep.get('replace_with', ''))
-            for symbol in remove_symbols:
-                text_str = text_str.replace(symbol, '')
+            text_str = rule_set.apply(str(text_node))
             if text_str != text_node:
                 text_node.replace_with(text_str)
     return str(soup)
 
+# --- إرسال التعديلات على دفعات (Batch HTTP) مع تهدئة تتفاعل مع حدود الحصة ---
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded', 'backendError')
+QUOTA_EXHAUSTED_REASONS = ('dailyLimitExceeded', 'quotaExceeded')
+MAX_BACKOFF_SEC = 64
+
+def _error_status(exc):
+    resp = getattr(exc, 'resp', None)
+    return getattr(resp, 'status', None)
+
+def _is_retryable(exc):
+    """429 وأخطاء 5xx وأخطاء 403 الخاصة بتجاوز المعدل تستحق إعادة المحاولة؛ نفاد الحصة اليومية لا."""
+    status = _error_status(exc)
+    content = getattr(exc, 'content', b'') or b''
+    if isinstance(content, bytes): content = content.decode('utf-8', errors='replace')
+    if any(reason in content for reason in QUOTA_EXHAUSTED_REASONS): return False
+    if status == 429 or (status is not None and 500 <= status < 600): return True
+    return status == 403 and any(reason in content for reason in RATE_LIMIT_REASONS)
+
+def _retry_after_seconds(exc):
+    resp = getattr(exc, 'resp', None)
+    try: return float(resp.get('retry-after')) if resp is not None and resp.get('retry-after') else None
+    except (TypeError, ValueError, AttributeError): return None
+
+def patch_posts_in_batches(service, blog_id, updates, batch_size=20, max_retries=5, sleep=time.sleep):
+    """
+    updates: قائمة من (post_id, العنوان للعرض, جسم التعديل).
+    يرسل التعديلات في طلبات Batch بحجم batch_size. عند 429/403 (تجاوز المعدل) تُعاد الطلبات المرفوضة فقط
+    بعد انتظار متزايد (أو Retry-After)، ويتناقص الانتظار تدريجيًا بعد الدفعات الناجحة.
+    يعيد قاموس {post_id: {'title', 'status': 'updated'|'failed', 'error', 'attempts', 'updated'}}.
+    """
+    results = {post_id: {'title': title, 'status': 'pending', 'error': None, 'attempts': 0, 'updated': None} for post_id, title, body in updates}
+    bodies = {post_id: body for post_id, title, body in updates}
+    pending = [post_id for post_id, title, body in updates]
+    delay = 0.0
+    batch_size = max(1, batch_size)
+    while pending:
+        chunk, pending = pending[:batch_size], pending[batch_size:]
+        retry_ids = []; retry_after = None
+
+        def on_response(request_id, response, exception):
+            nonlocal retry_after
+            result = results[request_id]; result['attempts'] += 1
+            if exception is None:
+                result['status'] = 'updated'; result['error'] = None
+                result['updated'] = response.get('updated') if isinstance(response, dict) else None
+            elif _is_retryable(exception) and result['attempts'] < max_retries:
+                retry_ids.append(request_id); result['error'] = str(exception)
+                hinted = _retry_after_seconds(exception)
+                if hinted: retry_after = max(retry_after or 0, hinted)
+            else:
+                result['status'] = 'failed'; result['error'] = str(exception)
+
+        batch = service.new_batch_http_request(callback=on_response)
+        for post_id in chunk:
+            batch.add(service.posts().patch(blogId=blog_id, postId=post_id, body=bodies[post_id], fields='id,updated'), request_id=post_id)
+        try:
+            batch.execute()
+        except Exception as e:
+            # فشل الطلب المجمّع نفسه (شبكة أو حصة): تُعامل كل طلباته كمرفوضة
+            for post_id in chunk:
+                if results[post_id]['status'] == 'pending' and post_id not in retry_ids: on_response(post_id, None, e)
+
+        if retry_ids:
+            delay = min(MAX_BACKOFF_SEC, max(1.0, delay * 2))
+            wait = max(delay, retry_after or 0)
+            print(f"⏳ تم تجاوز حد المعدل لـ {len(retry_ids)} طلب. إعادة المحاولة بعد {wait:.1f} ثانية...")
+            sleep(wait)
+            pending = retry_ids + pending
+        else:
+            delay = delay / 2 if delay >= 1 else 0.0
+            if pending and delay: sleep(delay)
+    for result in results.values():
+        if result['status'] == 'pending': result['status'] = 'failed'
+    return results
+
+def fetch_posts_in_batches(service, blog_id, post_ids, batch_size=20):
+    """يجلب أجسام المقالات المحددة فقط (طلبات get مجمّعة، مع الحقول اللازمة فقط). يعيد {post_id: post}."""
+    posts = {}
+    def on_response(request_id, response, exception):
+        if exception is None: posts[request_id] = response
+        else: print(f"❌ فشل في جلب المقال {request_id}: {exception}")
+    for start in range(0, len(post_ids), max(1, batch_size)):
+        batch = service.new_batch_http_request(callback=on_response)
+        for post_id in post_ids[start:start + max(1, batch_size)]:
+            batch.add(service.posts().get(blogId=blog_id, postId=post_id, fields='id,title,content,updated'), request_id=post_id)
+        try: batch.execute()
+        except Exception as e: print(f"❌ فشل في جلب دفعة من المقالات: {e}")
+    return posts
+
+# --- التنظيف في عمليات منفصلة (BeautifulSoup يستهلك المعالج) ---
+_worker_rules = None
+
+def _init_clean_worker(rules):
+    global _worker_rules
+    _worker_rules = rules
+
+def _clean_post_in_worker(title_and_content):
+    title, content = title_and_content
+    return clean_title(title, _worker_rules), clean_content(content, title, _worker_rules)
+
+def clean_listed_posts(service, blog_id, items, rules, rules_hash, state_store, batch_size=20, full=False, executor=None, verbose=True):
+    """
+    ينظف مجموعة مقالات من قائمة خفيفة (id, title, updated): يجلب أجسام الجديد/المتغير فقط، ينظفها
+    (بالتوازي إذا مُرر executor)، يرسل التعديلات على دفعات ويسجل الحالة. يعيد (إحصائيات، نتائج التعديل).
+    """
+    stats = {'listed': len(items), 'fetched': 0, 'skipped': 0, 'unchanged': 0, 'updated': 0, 'failed': 0}
+    states = state_store.get_many(blog_id, [item['id'] for item in items])
+    to_fetch = [item['id'] for item in items if full or state_store.needs_cleaning(states.get(item['id']), item.get('updated'), rules_hash)]
+    stats['skipped'] = len(items) - len(to_fetch)
+    if verbose: print(f"📋 {len(items)} مقال: {len(to_fetch)} جديد أو متغير، {stats['skipped']} لم يتغير منذ آخر تنظيف.")
+    fetched = fetch_posts_in_batches(service, blog_id, to_fetch, batch_size=batch_size) if to_fetch else {}
+    stats['fetched'] = len(fetched)
+
+    candidates = []; seen_entries = []
+    for post_id in to_fetch:
+        post = fetched.get(post_id)
+        if not post: continue
+        original_title = post.get('title', '')
+        original_content = post.get('content', '')
+        if not original_title or not original_content: continue
+        # تغيّر updated دون تغيّر المحتوى (مثلاً تعديل التصنيفات فقط) لا يستدعي إعادة التنظيف
+        original_hash = content_fingerprint(original_title, original_content)
+        state = states.get(post_id)
+        if not full and state and state['rules_hash'] == rules_hash and state['content_hash'] == original_hash:
+            seen_entries.append((post_id, post.get('updated'), original_hash)); stats['skipped'] += 1; continue
+        candidates.append((post_id, post, original_hash))
+
+    pairs = [(post.get('title', ''), post.get('content', '')) for post_id, post, original_hash in candidates]
+    if executor is not None: cleaned_pairs = list(executor.map(_clean_post_in_worker, pairs, chunksize=max(1, len(pairs) // 32)))
+    else: cleaned_pairs = [(clean_title(title, rules), clean_content(content, title, rules)) for title, content in pairs]
+
+    updates = []; clean_hashes = {}
+    for (post_id, post, original_hash), (cleaned_title, cleaned_content) in zip(candidates, cleaned_pairs):
+        original_title = post.get('title', '')
+        has_changed = (original_title != cleaned_title) or (post.get('content', '') != cleaned_content)
+        if has_changed:
+            if verbose: print(f"\n✏️ تعديل مقال: {original_title}")
+            updates.append((post_id, original_title, {'title': cleaned_title, 'content': cleaned_content}))
+            clean_hashes[post_id] = content_fingerprint(cleaned_title, cleaned_content)
+        else:
+            if verbose: print(f"✅ بدون تعديل: {original_title}")
+            stats['unchanged'] += 1
+            seen_entries.append((post_id, post.get('updated'), original_hash))
+    state_store.record_many(blog_id, seen_entries, rules_hash)
+
+    results = {}
+    if updates:
+        if verbose: print(f"\n📦 إرسال {len(updates)} تعديل على دفعات من {batch_size}...")
+        results = patch_posts_in_batches(service, blog_id, updates, batch_size=batch_size)
+        for post_id, result in results.items():
+            if result['status'] == 'updated':
+                if verbose: print(f"✅ تم تعديل: {result['title']}")
+            else: print(f"❌ فشل في تحديث المقال '{result['title']}': {result['error']}")
+        # المقالات التي فشل تحديثها لا تُسجل، فتُعاد محاولتها في التشغيل التالي
+        state_store.record_many(blog_id, [(post_id, result['updated'], clean_hashes[post_id]) for post_id, result in results.items() if result['status'] == 'updated'], rules_hash)
+        stats['updated'] = sum(1 for r in results.values() if r['status'] == 'updated')
+        stats['failed'] = len(results) - stats['updated']
+    return stats, results
+
 # ✅ تم تعديل الدالة الرئيسية لتقبل القواعد
-def clean_post_titles_and_content(blog_id, creds_path, limit, rules):
+def clean_post_titles_and_content(blog_id, creds_path, limit, rules, batch_size=20, state_file=DEFAULT_STATE_FILE, full=False):
     service = get_blogger_service(creds_path)
     print(f"🔄 جاري جلب آخر {limit} مقال من المدونة: {blog_id}...")
     
+    # قائمة خفيفة (بدون أجسام المقالات) لمعرفة ما تغيّر منذ آخر تنظيف
     try:
-        posts = service.posts().list(blogId=blog_id, maxResults=limit, fetchBodies=True).execute()
+        listing = service.posts().list(blogId=blog_id, maxResults=limit, fetchBodies=False, fields='items(id,title,updated)').execute()
     except Exception as e:
         print(f"❌ فشل في جلب المقالات: {e}"); sys.exit(1)
 
-    for post in posts.get('items', []):
-        original_title = post.get('title', '')
-        original_content = post.get('content', '')
-        if not original_title or not original_content: continue
+    stats, results = clean_listed_posts(service, blog_id, listing.get('items', []), rules, rules_fingerprint(rules, CLEANER_VERSION),
+                                        CleanStateStore(state_file), batch_size=batch_size, full=full)
+    if not results: print(f"لا توجد مقالات تحتاج إلى تعديل. ({stats['skipped']} تم تخطيها)"); return {}
+    print(f"\nالنتيجة: {stats['updated']} معدّل، {stats['failed']} فشل، {stats['unchanged']} بدون تعديل، {stats['skipped']} تم تخطيها.")
+    return results
 
-        cleaned_title = clean_title(original_title, rules)
-        cleaned_content = clean_content(original_content, original_title, rules)
-        
-        has_changed = (original_title != cleaned_title) or (original_content != cleaned_content)
-        if has_changed:
-            print(f"\n✏️ تعديل مقال: {original_title}")
-            post_body = {'title': cleaned_title, 'content': cleaned_content}
+def backfill_blog(blog_id, creds_path, rules, batch_size=20, page_size=100, workers=None, state_file=DEFAULT_STATE_FILE, full=False):
+    """
+    تنظيف شامل لكل مقالات المدونة: يمر على كل الصفحات عبر pageToken، ينظف كل صفحة في مجمع عمليات،
+    ويحفظ نقطة استئناف بعد كل صفحة؛ فإذا توقف التشغيل يكمل التشغيل التالي (بنفس القواعد) من حيث توقف.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    service = get_blogger_service(creds_path)
+    state_store = CleanStateStore(state_file)
+    rules_hash = rules_fingerprint(rules, CLEANER_VERSION)
+    checkpoint = None if full else state_store.get_checkpoint(blog_id, rules_hash)
+    page_token = checkpoint['page_token'] if checkpoint else None
+    pages_done = checkpoint['pages_done'] if checkpoint else 0
+    totals = {'listed': checkpoint['posts_seen'] if checkpoint else 0, 'fetched': 0, 'skipped': 0, 'unchanged': 0, 'updated': 0, 'failed': 0}
+    if checkpoint: print(f"⏯️ استئناف التنظيف الشامل من الصفحة {pages_done + 1} ({totals['listed']} مقال تمت معالجته سابقًا).")
+    else: print(f"🔄 بدء تنظيف شامل لكل مقالات المدونة {blog_id}...")
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_clean_worker, initargs=(rules,)) as executor:
+        while True:
             try:
-                service.posts().patch(blogId=blog_id, postId=post['id'], body=post_body).execute()
-                print(f"✅ تم تعديل: {original_title}")
-                time.sleep(1.5)
+                listing = service.posts().list(blogId=blog_id, maxResults=page_size, pageToken=page_token, fetchBodies=False,
+                                               fields='items(id,title,updated),nextPageToken').execute()
             except Exception as e:
-                print(f"❌ فشل في تحديث المقال '{original_title}': {e}")
-        else:
-            print(f"✅ بدون تعديل: {original_title}")
+                if checkpoint and page_token == checkpoint['page_token']:
+                    # رموز الصفحات قد تنتهي صلاحيتها؛ البدء من جديد رخيص لأن المقالات المنظفة تُتخطى من الحالة المحفوظة.
+                    # العدادات المستأنفة تُصفّر أيضًا وإلا حُسبت الصفحات الأولى مرتين في نقاط الحفظ والنتيجة.
+                    print(f"⚠️ تعذر الاستئناف من نقطة الحفظ ({e}). البدء من الصفحة الأولى.")
+                    page_token = None; checkpoint = None; pages_done = 0; totals['listed'] = 0; continue
+                print(f"❌ فشل في جلب صفحة المقالات {pages_done + 1}: {e}. يمكن إعادة التشغيل للاستئناف."); sys.exit(1)
+            stats, results = clean_listed_posts(service, blog_id, listing.get('items', []), rules, rules_hash, state_store,
+                                                batch_size=batch_size, full=full, executor=executor, verbose=False)
+            for key, value in stats.items(): totals[key] += value
+            pages_done += 1; page_token = listing.get('nextPageToken')
+            print(f"📄 الصفحة {pages_done}: {stats['listed']} مقال، {stats['updated']} معدّل، {stats['failed']} فشل، {stats['skipped']} تم تخطيها. (الإجمالي: {totals['listed']})")
+            if not page_token: break
+            state_store.save_checkpoint(blog_id, rules_hash, page_token, pages_done, totals['listed'])
+    state_store.clear_checkpoint(blog_id)
+    print(f"\nالنتيجة: {totals['listed']} مقال في {pages_done} صفحة، {totals['updated']} معدّل، {totals['failed']} فشل، {totals['unchanged']} بدون تعديل، {totals['skipped']} تم تخطيها.")
+    return totals
 
 # ✅ --- تم تعديل نقطة انطلاق السكربت لقبول ملف القواعد ---
-if __name__ == '__main__':
+def main(argv=None):
     parser = argparse.ArgumentParser(description="Blogger Post Cleaner")
     parser.add_argument("--blog-id", type=str, required=True, help="ID of the Blogger blog.")
     parser.add_argument("--creds-path", type=str, required=True, help="Path to the credential directory.")
     parser.add_argument("--limit", type=int, default=12, help="Number of recent posts to clean.")
+    parser.add_argument("--batch-size", type=int, default=20, help="Number of post updates sent per batch HTTP request.")
+    parser.add_argument("--state-file", type=str, default=DEFAULT_STATE_FILE, help="SQLite file that remembers which posts were already cleaned.")
+    parser.add_argument("--full", action="store_true", help="Ignore the saved state and re-clean every listed post.")
+    parser.add_argument("--backfill", action="store_true", help="Clean every post of the blog (all pages), resuming from the last checkpoint.")
+    parser.add_argument("--page-size", type=int, default=100, help="Posts listed per page in backfill mode.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for cleaning in backfill mode (default: CPU count).")
     # إضافة الوسيط الجديد
     parser.add_argument("--rules-file", type=str, required=True, help="Path to the JSON file with cleaning rules.")
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     # تحميل القواعد من الملف الذي تم تمريره
     try:
@@ -127,9 +325,20 @@ if __name__ == '__main__':
             cleaning_rules = json.load(f)
     except Exception as e:
         print(f"❌ فشل في تحميل ملف القواعد من المسار: {args.rules_file}. الخطأ: {e}")
-        sys.exit(1)
+        return 1
     
     print("--- بدء عملية تنظيف المقالات ---")
     # تمرير القواعد التي تم تحميلها إلى الدالة الرئيسية
-    clean_post_titles_and_content(args.blog_id, args.creds_path, args.limit, cleaning_rules)
-    print("--- انتهت عملية التنظيف ---")
\ No newline at end of file
+    if args.backfill:
+        backfill_blog(args.blog_id, args.creds_path, cleaning_rules, batch_size=args.batch_size, page_size=args.page_size,
+                      workers=args.workers, state_file=args.state_file, full=args.full)
+    else:
+        clean_post_titles_and_content(args.blog_id, args.creds_path, args.limit, cleaning_rules, batch_size=args.batch_size, state_file=args.state_file, full=args.full)
+    print("--- انتهت عملية التنظيف ---")
+    return 0
+
+if __name__ == '__main__':
+    # عند التشغيل كسكربت فقط: العامل الدائم يستورد الوحدة ويستدعي main()، ومعالج على الجذر هناك
+    # كان سيبقى طوال عمر العملية ويجمع سجلات المكتبات من كل المهام اللاحقة في edited_posts.log
+    logging.basicConfig(filename=LOG_FILE, level=logging.INFO, format='%(asctime)s - %(message)s')
+    sys.exit(main())
@@ -198,7 +198,9 @@ def download_image(url):
 
 async def send_to_telegram(bot_token, channel_id, image_path, caption):
     try:
-        bot = telegram.Bot(token=bot_token)
+        # TELEGRAM_API_BASE_URL يوجّه الإرسال لخادم بديل (مثل benchmarks/fake_services.py) بدل api.telegram.org
+        base_url = os.environ.get('TELEGRAM_API_BASE_URL')
+        bot = telegram.Bot(token=bot_token, base_url=base_url) if base_url else telegram.Bot(token=bot_token)
         with open(image_path, 'rb') as photo_file:
             await bot.send_photo(chat_id=channel_id, photo=photo_file, caption=caption, parse_mode=ParseMode.HTML, read_timeout=60, write_timeout=60)
         return True, "تم الإرسال بنجاح!"
@@ -3,99 +3,129 @@
 import requests
 import json
 import os
+import sys
+import time
 import logging
-from datetime import datetime
-from tqdm import tqdm
 
-def get_all_categories(blog_id, api_key):
-    url = f"https://www.googleapis.com/blogger/v3/blogs/{blog_id}/posts?key={api_key}&maxResults=500"
-    try:
-        response = requests.get(url, timeout=30)
-        if response.status_code == 200:
+# --- الحل الديناميكي لمسارات الاستيراد ---
+try:
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+except NameError:
+    pass
+# ---------------------------------------------
+
+from core.post_index import post_timestamp
+
+POSTS_URL = "https://www.googleapis.com/blogger/v3/blogs/{blog_id}/posts"
+# حقول الروابط فقط: بدون أجسام المقالات (fetchBodies=false) وبدون أي حقل لا نستخدمه
+LINK_FIELDS = "items(url,labels,published),nextPageToken"
+INDEX_FIELDS = "items(id,url,labels,published,updated),nextPageToken"
+# مزامنة الفروقات لا ترى المقالات المحذوفة أو المعادة إلى مسودة: زحف كامل تلقائي إذا مضى على آخر زحف كامل أكثر من هذا
+FULL_SYNC_INTERVAL_SEC = 24 * 3600
+
+def iter_blogger_posts(blog_id, api_key, category=None, max_results=None, latest_first=True, fields=LINK_FIELDS, fetch_bodies=False,
+                       order_by=None, page_size=500, strict=False):
+    """
+    مولّد يعيد المقالات صفحة بصفحة دون تجميعها في الذاكرة.
+    - الفلترة حسب التصنيف تتم على الخادم (معامل labels) فكل صفحة تحتوي مقالات مطابقة فقط.
+    - يتوقف فور إعادة max_results مقالاً، ولا يطلب صفحة أكبر من المتبقي.
+    - fields=None مع fetch_bodies=True يعيد المقالات كاملة.
+    - order_by='updated' للأحدث تعديلاً أولاً. strict=True يرفع RuntimeError عند فشل أي صفحة بدل التوقف بصمت.
+    """
+    params = {'key': api_key, 'fetchBodies': 'true' if fetch_bodies else 'false'}
+    if order_by or latest_first: params['orderBy'] = order_by or 'published'
+    if category: params['labels'] = category
+    if fields: params['fields'] = fields
+    remaining = max_results if max_results and max_results > 0 else None
+    with requests.Session() as session:
+        while True:
+            # Blogger API يسمح بـ 500 كحد أقصى لكل طلب
+            params['maxResults'] = min(remaining, page_size, 500) if remaining else min(page_size, 500)
+            response = session.get(POSTS_URL.format(blog_id=blog_id), params=params, timeout=30)
+            if response.status_code != 200:
+                if strict: raise RuntimeError(f"فشل في جلب المقالات: {response.status_code}")
+                logging.error(f"فشل في جلب المقالات: {response.status_code}")
+                return
             posts_data = response.json()
-            all_posts = posts_data.get("items", [])
-            all_categories = set()
-            for post in all_posts:
-                if 'labels' in post:
-                    all_categories.update(post['labels'])
-            return sorted(list(all_categories))
-        return []
+            for post in posts_data.get("items", []):
+                yield post
+                if remaining:
+                    remaining -= 1
+                    if not remaining: return
+            next_page_token = posts_data.get('nextPageToken')
+            if not next_page_token: return
+            params['pageToken'] = next_page_token
+
+def iter_post_links(blog_id, api_key, category=None, max_results=None):
+    for post in iter_blogger_posts(blog_id, api_key, category=category, max_results=max_results, fields="items(url),nextPageToken"):
+        link = _post_link(post)
+        if link: yield link
+
+def _post_link(post):
+    return post.get("url", "").replace("http://", "https://")
+
+def group_links_by_label(posts, max_results=None):
+    """
+    يجمع الروابط حسب التصنيف في مرور واحد. المقالات مرتبة مسبقًا (الأحدث أولاً) فيبقى الترتيب داخل كل تصنيف.
+    """
+    links_by_label = {}
+    for post in posts:
+        link = _post_link(post)
+        if not link: continue
+        for label in post.get('labels', []):
+            links_by_label.setdefault(label, []).append(link)
+    if max_results and max_results > 0:
+        links_by_label = {label: links[:max_results] for label, links in links_by_label.items()}
+    return links_by_label
+
+def sync_post_index(blog_id, api_key, index, min_interval_sec=0, full=False, full_sync_interval_sec=FULL_SYNC_INTERVAL_SEC):
+    """
+    يحدّث الفهرس المحلي (core.post_index.PostIndexStore) لمدونة:
+    - أول مرة أو full=True أو مضى أكثر من full_sync_interval_sec على آخر زحف كامل (0 = لا زحف كامل تلقائي):
+      زحف كامل خفيف يستبدل الفهرس (ويحذف المقالات المحذوفة أو المعادة إلى مسودة على الخادم).
+    - بعد ذلك: المقالات الأحدث تعديلاً أولاً (orderBy=updated) حتى أول مقال أقدم من آخر مزامنة، أي الفروقات فقط.
+    - لا يتصل بالـ API إطلاقًا إذا كانت آخر مزامنة قبل أقل من min_interval_sec ثانية.
+    """
+    state = index.get_sync_state(blog_id)
+    if not full and state and time.time() - state['last_sync_at'] < min_interval_sec:
+        return {'mode': 'skipped', 'fetched': 0, 'total': index.count(blog_id)}
+    last_full = state and state.get('last_full_sync_at')
+    full = full or state is None or (full_sync_interval_sec > 0 and (not last_full or time.time() - last_full >= full_sync_interval_sec))
+    if full:
+        posts = [dict(post, url=_post_link(post)) for post in iter_blogger_posts(blog_id, api_key, latest_first=False, fields=INDEX_FIELDS, strict=True)]
+        index.replace_posts(blog_id, posts)
+        last_updated_ts = max((post_timestamp(post.get('updated')) for post in posts), default=0.0)
+    else:
+        posts, last_updated_ts = [], state['last_updated_ts']
+        for post in iter_blogger_posts(blog_id, api_key, fields=INDEX_FIELDS, order_by='updated', page_size=50, strict=True):
+            updated_ts = post_timestamp(post.get('updated'))
+            # نعيد جلب المقالات المساوية للعلامة (قد تُعدَّل عدة مقالات في نفس الثانية)، فالإدراج يستبدل القديم
+            if updated_ts < state['last_updated_ts']: break
+            posts.append(dict(post, url=_post_link(post))); last_updated_ts = max(last_updated_ts, updated_ts)
+        index.upsert_posts(blog_id, posts)
+    index.save_sync_state(blog_id, last_updated_ts, full=full)
+    logging.info(f"مزامنة فهرس المدونة {blog_id} ({'كاملة' if full else 'فروقات'}): {len(posts)} مقال")
+    return {'mode': 'full' if full else 'delta', 'fetched': len(posts), 'total': index.count(blog_id)}
+
+def get_all_categories(blog_id, api_key, index=None):
+    if index is not None: return index.get_categories(blog_id)
+    try:
+        all_categories = set()
+        for post in iter_blogger_posts(blog_id, api_key, latest_first=False, fields="items(labels),nextPageToken"):
+            all_categories.update(post.get('labels', []))
+        return sorted(all_categories)
     except Exception as e:
         logging.error(f"خطأ في جلب التصنيفات: {str(e)}")
         return []
 
-# ✅ --- تم تعديل هذه الدالة بالكامل لتحسين الأداء ---
 def get_blogger_posts(blog_id, api_key, category=None, max_results=None, latest_first=True):
     """
-    يجلب المقالات من بلوجر بكفاءة عالية.
-    - يستخدم orderBy=published لجلب الأحدث أولاً.
-    - يرسل maxResults إلى API مباشرة.
-    - لا يجلب جميع الصفحات إذا لم يكن ذلك ضروريًا.
+    يعيد المقالات (كاملة) كقائمة. للمدونات الكبيرة استخدم iter_blogger_posts مباشرة.
     """
-    all_posts = []
-    
-    # بناء عنوان URL الأساسي
-    base_url = f"https://www.googleapis.com/blogger/v3/blogs/{blog_id}/posts?key={api_key}"
-    
-    # إضافة الفلاتر والترتيب
-    if latest_first:
-        base_url += "&orderBy=published"
-    
-    # إذا كان العدد المطلوب صغيرًا، لا نحتاج لصفحات متعددة
-    # Blogger API يسمح بـ 500 كحد أقصى لكل طلب
-    if max_results and max_results <= 500: 
-        base_url += f"&maxResults={max_results}"
-    else:
-        base_url += "&maxResults=500"
-        
-    url = base_url
-    
     try:
-        # سنقوم بجلب جميع الصفحات فقط إذا لم نحدد عددًا معينًا (أو إذا كان العدد أكبر من 500)
-        should_fetch_all_pages = not (max_results and max_results <= 500)
-
-        with tqdm(desc="جلب المقالات", unit="مقال", disable=True) as pbar:
-            while url:
-                response = requests.get(url, timeout=30)
-                if response.status_code == 200:
-                    posts_data = response.json()
-                    batch_posts = posts_data.get("items", [])
-                    all_posts.extend(batch_posts)
-                    pbar.update(len(batch_posts))
-                    
-                    # إذا كنا نحتاج فقط لعدد معين ووصلنا إليه، نتوقف
-                    if max_results and len(all_posts) >= max_results:
-                        break
-                    
-                    # التوقف عن جلب المزيد من الصفحات إذا لم يكن مطلوبًا
-                    if not should_fetch_all_pages:
-                        break
-                    
-                    next_page_token = posts_data.get('nextPageToken')
-                    if next_page_token:
-                        # نستخدم base_url لضمان الحفاظ على الفلاتر
-                        # نزيل أي pageToken قديم ونضيف الجديد
-                        url_without_token = base_url.split('&pageToken=')[0]
-                        url = f"{url_without_token}&pageToken={next_page_token}"
-                    else:
-                        url = None
-                else:
-                    logging.error(f"فشل في جلب المقالات: {response.status_code}")
-                    break
-        
-        # الفلترة حسب التصنيف تتم بعد الجلب لأن الـ API لا يدعمها مباشرة
-        if category:
-            all_posts = [p for p in all_posts if 'labels' in p and category in p['labels']]
-        
-        # الترتيب اليدوي ضروري فقط إذا قمنا بالفلترة (لأن الترتيب الأصلي قد يختل)
-        if category and latest_first:
-            all_posts.sort(key=lambda x: datetime.strptime(x['published'], '%Y-%m-%dT%H:%M:%S%z'), reverse=True)
-        
-        # قص القائمة النهائية للتأكد من العدد الصحيح بعد الفلترة
-        if max_results and max_results > 0:
-            all_posts = all_posts[:max_results]
-        
-        return all_posts
+        return list(iter_blogger_posts(blog_id, api_key, category, max_results, latest_first, fields=None, fetch_bodies=True))
     except Exception as e:
         logging.error(f"حدث خطأ غير متوقع: {e}")
         return []
@@ -110,36 +140,44 @@ def save_links_to_file(category, links):
     logging.info(f"تم حفظ {len(links)} رابط في ملف {filename}")
     return filename
 
-def extract_all_categories_links(blog_id, api_key, max_results=None):
-    categories = get_all_categories(blog_id, api_key)
-    if not categories: return "لم يتم العثور على أي تصنيفات."
+def extract_all_categories_links(blog_id, api_key, max_results=None, index=None):
+    # من الفهرس المحلي إن وجد، وإلا زحف واحد لكل المدونة بدل زحف كامل لكل تصنيف
+    try:
+        if index is not None: links_by_label = index.get_links_by_label(blog_id, max_results)
+        else: links_by_label = group_links_by_label(iter_blogger_posts(blog_id, api_key), max_results)
+    except Exception as e:
+        logging.error(f"حدث خطأ غير متوقع: {e}")
+        return "لم يتم العثور على أي تصنيفات."
+    if not links_by_label: return "لم يتم العثور على أي تصنيفات."
     
     summary = []
-    for category in categories:
-        posts = get_blogger_posts(blog_id, api_key, category, max_results=max_results, latest_first=True)
-        links = [p.get("url", "").replace("http://", "https://") for p in posts if p.get("url")]
+    for category in sorted(links_by_label):
+        links = links_by_label[category]
         if links:
             filename = save_links_to_file(category, links)
             summary.append(f"قسم '{category}': تم حفظ {len(links)} رابط في '{filename}'")
     return "\n".join(summary) if summary else "لم يتم العثور على أي روابط."
 
-def extract_specific_category_links(blog_id, api_key, category_name, max_results=None):
-    posts = get_blogger_posts(blog_id, api_key, category_name, max_results=max_results, latest_first=True)
-    if not posts: return f"لم يتم العثور على مقالات في قسم '{category_name}'."
-    
-    links = [p.get("url", "").replace("http://", "https://") for p in posts if p.get("url")]
+def _save_links_result(category, links):
     if links:
-        filename = save_links_to_file(category_name, links)
+        filename = save_links_to_file(category, links)
         return (f"تم حفظ {len(links)} رابط في '{filename}'.\n\n" + "\n".join(links))
-    return "لم يتم العثور على روابط صالحة."
+    return None
 
-def extract_latest_links(blog_id, api_key, max_results):
-    # هذه الدالة الآن ستكون سريعة جدًا
-    posts = get_blogger_posts(blog_id, api_key, latest_first=True, max_results=max_results)
-    if not posts: return "لم يتم العثور على أي مقالات."
-    
-    links = [p.get("url", "").replace("http://", "https://") for p in posts if p.get("url")]
-    if links:
-        filename = save_links_to_file("أحدث_المقالات", links)
-        return (f"تم حفظ {len(links)} رابط في '{filename}'.\n\n" + "\n".join(links))
-    return "لم يتم العثور على روابط صالحة."
\ No newline at end of file
+def extract_specific_category_links(blog_id, api_key, category_name, max_results=None, index=None):
+    try:
+        if index is not None: links = index.get_links(blog_id, category_name, max_results)
+        else: links = list(iter_post_links(blog_id, api_key, category=category_name, max_results=max_results))
+    except Exception as e:
+        logging.error(f"حدث خطأ غير متوقع: {e}")
+        links = []
+    return _save_links_result(category_name, links) or f"لم يتم العثور على مقالات في قسم '{category_name}'."
+
+def extract_latest_links(blog_id, api_key, max_results, index=None):
+    try:
+        if index is not None: links = index.get_links(blog_id, limit=max_results)
+        else: links = list(iter_post_links(blog_id, api_key, max_results=max_results))
+    except Exception as e:
+        logging.error(f"حدث خطأ غير متوقع: {e}")
+        links = []
+    return _save_links_result("أحدث_المقالات", links) or "لم يتم العثور على أي مقالات."
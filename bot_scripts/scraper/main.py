@@ -5,6 +5,7 @@ import configparser
 import logging
 import argparse
 import json # <-- استيراد JSON
+import threading
 
 # --- الحل الديناميكي لمسارات الاستيراد ---
 try:
@@ -16,7 +17,7 @@ except NameError:
 # ---------------------------------------------
 
 from bs4 import BeautifulSoup
-from utils.logger_config import setup_logger
+from utils.logger_config import setup_logger, configure_logging
 from core.sitemap_fetcher import fetch_urls_from_sitemap
 from core.article_scraper import ArticleScraper
 from core.image_processor import ImageProcessor
@@ -24,10 +25,16 @@ from core.content_formatter import ContentFormatter
 from core.permalink_generator import PermalinkGenerator
 from core.keyword_extractor import KeywordExtractor
 from core.blogger_client import BloggerClient
+from core.image_index import ImageIndex, HostedImageCache
+from core import instrumentation
 
 CONFIG_FILE = os.path.join(os.path.dirname(__file__), 'config.ini')
 config = configparser.ConfigParser(interpolation=configparser.ExtendedInterpolation())
 main_logger = None 
+# أدوات الدورة (جلسة cloudscraper، المترجم، عملاء Blogger لكل مجلد مصادقة) تبقى دافئة بين الدورات
+# عند التشغيل داخل العامل الدائم (bot_scripts/worker/job_worker.py)، وتُعاد تهيئتها إذا تغير config.ini
+_cycle_tools = {}
+_keyword_lock = threading.Lock() # فهرس الكلمات المفتاحية مشترك بين خيوط المنسّق (orchestrator.py)
 
 def load_app_config():
     global main_logger
@@ -37,18 +44,25 @@ def load_app_config():
     log_fp = config.get('Paths', 'LogFile', fallback='bot_activity.log')
     log_lvl_str = config.get('Logging', 'Level', fallback='INFO').upper()
     log_lvl = getattr(logging, log_lvl_str, logging.INFO)
+    # طابور + خيط كتابة واحد، وتدوير ملف السجل وضغط نسخه القديمة (يُطبق أيضًا على مسجلات core المنشأة عند الاستيراد)
+    configure_logging(async_mode=config.getboolean('Logging', 'Async', fallback=True),
+                      max_bytes=int(config.getfloat('Logging', 'MaxFileSizeMB', fallback=10) * 1024 * 1024),
+                      backup_count=config.getint('Logging', 'BackupCount', fallback=5),
+                      when=config.get('Logging', 'RotateWhen', fallback='').strip(),
+                      compress=config.getboolean('Logging', 'CompressRotated', fallback=True),
+                      sample_every=config.getint('Logging', 'DebugSampleEvery', fallback=1))
     main_logger = setup_logger("BotRunner", log_file=log_fp, level=log_lvl)
-    main_logger.info(f"Config loaded from {CONFIG_FILE}")
+    main_logger.info("Config loaded from %s", CONFIG_FILE)
 
 def load_published_source_urls():
     fp = config.get('Paths', 'PublishedUrlsFile')
     try:
         with open(fp, 'r', encoding='utf-8') as f: return set(l.strip() for l in f if l.strip())
     except FileNotFoundError: 
-        main_logger.warning(f"File '{fp}' not found. A new one will be created.")
+        main_logger.warning("File '%s' not found. A new one will be created.", fp)
         return set()
     except Exception as e: 
-        main_logger.error(f"Error loading URLs from '{fp}': {e}")
+        main_logger.error("Error loading URLs from '%s': %s", fp, e)
         return set()
 
 def save_published_source_url(url, published_set):
@@ -56,159 +70,284 @@ def save_published_source_url(url, published_set):
     published_set.add(url)
     try:
         with open(fp, 'a', encoding='utf-8') as f: f.write(url + "\n")
-        main_logger.debug(f"Saved published URL to file: {url}")
-    except IOError as e: main_logger.error(f"Failed to save URL {url} to '{fp}': {e}")
+        main_logger.debug("Saved published URL to file: %s", url)
+    except IOError as e: main_logger.error("Failed to save URL %s to '%s': %s", url, fp, e)
 
-# ✅ 1. تمت إضافة وسيط "rules_file_path" هنا
-def run_bot_cycle(creds_path, article_urls_to_process=None, custom_labels=None, rules_file_path=None):
-    main_logger.info("===== BOT CYCLE STARTED =====")
-    published_urls = load_published_source_urls()
-    main_logger.info(f"Loaded {len(published_urls)} previously published URLs.")
-    
-    # ✅ 2. تمت إضافة هذا الجزء لقراءة ملف القواعد
+def get_blogger_client(creds_path, blog_id=None):
+    """عميل Blogger دافئ لكل (مجلد مصادقة، مدونة)؛ blog_id=None يعني BlogID من config.ini."""
+    clients = _cycle_tools.setdefault('clients', {})
+    blogger_bot_client = clients.get((creds_path, blog_id))
+    if blogger_bot_client: blogger_bot_client.ensure_service()
+    else:
+        blogger_bot_client = BloggerClient(config, creds_path=creds_path, blog_id=blog_id)
+        if blogger_bot_client.service: clients[(creds_path, blog_id)] = blogger_bot_client
+    return blogger_bot_client
+
+def get_shared_tools():
+    """
+    الأدوات المستقلة عن المدونة الهدف (الكشط، الصور، التنسيق، الترجمة، الكلمات المفتاحية) وذاكرة الصور المستضافة.
+    """
+    config_mtime = os.path.getmtime(CONFIG_FILE)
+    if _cycle_tools.get('config_mtime') != config_mtime:
+        _cycle_tools.clear(); _cycle_tools.update({'config_mtime': config_mtime, 'clients': {}})
+    if 'shared' not in _cycle_tools:
+        _cycle_tools['shared'] = (ArticleScraper(config), ImageProcessor(config), ContentFormatter(config, config_filepath=CONFIG_FILE),
+                                  PermalinkGenerator(config), KeywordExtractor(config))
+        _cycle_tools['hosted_images'] = HostedImageCache(config.getint('ImageProcessing', 'HostedImageCacheSize', fallback=5000))
+    else: main_logger.info("Reusing warm scraper, translator and formatter from the previous cycle.")
+    return _cycle_tools['shared'], _cycle_tools['hosted_images']
+
+def get_cycle_tools(creds_path, blog_id=None):
+    shared_tools, _ = get_shared_tools()
+    return shared_tools + (get_blogger_client(creds_path, blog_id),)
+
+def start_cycle_metrics(name='bot_cycle'):
+    """مقياس الدورة (core/instrumentation.py): سطر JSON لكل مقال وللدورة في MetricsFile (فارغ = بلا ملف)."""
+    metrics = instrumentation.get_metrics()
+    metrics.events_path = config.get('Paths', 'MetricsFile', fallback='logs/cycle_metrics.jsonl').strip() or None
+    metrics.start_cycle(name)
+    return metrics
+
+def finish_cycle_metrics(metrics, **fields):
+    summary = metrics.end_cycle(**fields)
+    main_logger.info("Stage timings for this cycle:\n" + metrics.format_summary(summary))
+    return summary
+
+def load_publishing_rules(rules_file_path):
     publishing_rules = {}
     if rules_file_path and os.path.exists(rules_file_path):
         try:
             with open(rules_file_path, 'r', encoding='utf-8') as f:
                 publishing_rules = json.load(f)
-            main_logger.info(f"Successfully loaded publishing rules from {rules_file_path}")
+            main_logger.info("Successfully loaded publishing rules from %s", rules_file_path)
         except Exception as e:
-            main_logger.error(f"Could not load publishing rules file: {e}")
+            main_logger.error("Could not load publishing rules file: %s", e)
+    return publishing_rules
+
+def scrape_article(article_tool, src_url):
+    """يعيد المقال المكشوط، أو None إذا فشل الكشط أو كان العنوان/المحتوى فارغًا."""
+    scraped = article_tool.scrape_article_details(src_url)
+    if not scraped: main_logger.warning("Scraping failed for %s. Skipping.", src_url); return None
+    if not scraped.get("title", "").strip(): main_logger.warning("Empty title for %s. Skipping.", src_url); return None
+    if not scraped.get("raw_html_content", "").strip(): main_logger.warning("Inadequate content for %s. Skipping.", src_url); return None
+    return scraped
+
+def prepare_article(src_url, scraped, title_sugg_dict, image_tool, hosted_images=None):
+    """
+    مرحلة التحضير المستقلة عن المدونة الهدف: معالجة الصور ورفعها، العنوان الإنجليزي، ونص الكلمات المفتاحية.
+    الناتج يُنشر على أي عدد من المدونات عبر publish_prepared_article دون إعادة كشط أو رفع.
+    """
+    orig_title = scraped.get("title", ""); raw_html = scraped.get("raw_html_content", "")
+    img_index = ImageIndex(base_url=src_url); main_hosted_img = None; img_ext = config.get('ImageProcessing','OutputFormat',fallback='jpg').lower()
+    eng_title_internal = title_sugg_dict.get('suggested_title',''); slug_fname_base = title_sugg_dict.get('slug_base','image')
+
+    if scraped.get("main_feature_image_original_url"):
+        img_proc_url = scraped["main_feature_image_original_url"]
+        h_url = hosted_images.get(img_proc_url) if hosted_images is not None else None
+        if h_url: img_index.add(img_proc_url, h_url); main_hosted_img = h_url; main_logger.info("Main image already hosted: %s", h_url)
+        else:
+            proc_bytes = image_tool.process_image_with_logo(img_proc_url)
+            if proc_bytes:
+                safe_slug = "".join(c if c.isalnum() else "_" for c in slug_fname_base[:30]).strip('_')
+                fname = f"main_{safe_slug}_{int(time.time())}.{img_ext}"
+                h_url = image_tool.upload_image_to_hosting(proc_bytes, fname)
+                if h_url:
+                    img_index.add(img_proc_url, h_url); main_hosted_img = h_url; main_logger.info("Main image hosted: %s", h_url)
+                    if hosted_images is not None: hosted_images.put(img_proc_url, h_url)
+                else: main_logger.warning("Main image UPLOAD FAILED for: %s", img_proc_url)
+            else: main_logger.warning("Main image PROCESSING FAILED for: %s", img_proc_url)
+
+    for img_data in scraped.get("images_in_content_details",[]):
+        orig_tag_src = img_data["original_tag_src"]; full_proc_url = img_data["full_url"]
+        # نفس الصورة (بعد توحيد الرابط) لا تُعالج ولا تُرفع مرتين، داخل المقال أو عبر المقالات
+        already_hosted = img_index.resolve(orig_tag_src) or img_index.resolve(full_proc_url) or (hosted_images.get(full_proc_url) if hosted_images is not None else None)
+        if already_hosted: img_index.add(orig_tag_src, already_hosted, full_url=full_proc_url); continue
+        proc_bytes = image_tool.process_image_with_logo(full_proc_url)
+        if proc_bytes:
+            safe_slug="".join(c if c.isalnum() else "_" for c in slug_fname_base[:20]).strip('_')
+            fname=f"content_{safe_slug}_{int(time.time())}_{len(img_index)}.{img_ext}"
+            h_url=image_tool.upload_image_to_hosting(proc_bytes,fname)
+            if h_url:
+                img_index.add(orig_tag_src,h_url,full_url=full_proc_url)
+                if hosted_images is not None: hosted_images.put(full_proc_url, h_url)
+            else:main_logger.warning("Content image UPLOAD FAILED: %s", orig_tag_src)
+        else:main_logger.warning("Content image PROCESSING FAILED: %s", orig_tag_src)
+
+    kw_txt = BeautifulSoup(raw_html,'html.parser').get_text(separator=' ',strip=True)
+    return {'src_url': src_url, 'orig_title': orig_title, 'raw_html': raw_html, 'eng_title': eng_title_internal,
+            'img_index': img_index, 'main_hosted_img': main_hosted_img, 'kw_txt': kw_txt, 'auto_labels': None, 'in_corpus': False}
+
+def _auto_labels(prepared, keyword_tool):
+    # تُستخرج مرة واحدة لكل مقال مهما كان عدد المدونات التي تستخدمها
+    with _keyword_lock:
+        if prepared['auto_labels'] is None:
+            labels = keyword_tool.extract_keywords(prepared['kw_txt'])
+            def_lbl_str = config.get('BloggerAPI','DefaultLabels',fallback=''); def_lbls = [l.strip() for l in def_lbl_str.split(',') if l.strip()]
+            combo_lbls = def_lbls + labels; uniq_lbls = list(dict.fromkeys(combo_lbls))
+            prepared['auto_labels'] = uniq_lbls[:config.getint('BloggerAPI','MaxLabelsPerPost',fallback=10)]
+        return list(prepared['auto_labels'])
+
+def seed_keyword_corpus(keyword_tool, clients):
+    """
+    يبني فهرس TF-IDF مرة واحدة من أرشيف المدونات (كل ما نُشر قبل تفعيل الفهرس) بدل انتظار MinDocsForTfidf مقالاً جديدًا.
+    عند الفشل يبقى الفهرس كما هو وتُعاد المحاولة في الدورة التالية.
+    """
+    if not config.getboolean('Keywords', 'SeedFromBlog', fallback=True): return
+    with _keyword_lock:
+        if not keyword_tool.corpus_needs_seed(): return
+        max_posts = config.getint('Keywords', 'SeedMaxPosts', fallback=5000)
+        def archive_texts():
+            for client in clients:
+                for post in client.iter_posts(max_posts=max_posts):
+                    yield BeautifulSoup(post.get('content') or '', 'html.parser').get_text(separator=' ', strip=True)
+        main_logger.info("Seeding keyword index from the blog archive (one time)...")
+        try: seeded = keyword_tool.seed_corpus(archive_texts())
+        except Exception as e: main_logger.warning("Could not seed keyword index from the blog archive: %s. Will retry next cycle.", e); return
+        keyword_tool.save_corpus()
+        main_logger.info("Seeded keyword index from %s archived posts.", seeded)
+
+def publish_prepared_article(prepared, blogger_bot_client, content_formatter, keyword_tool, publishing_rules=None, custom_labels=None):
+    """
+    مرحلة النشر الخاصة بكل مدونة: قواعد التنسيق الخاصة بالمستخدم، التصنيفات، ثم إنشاء التدوينة.
+    يعيد رابط التدوينة أو None.
+    """
+    src_url = prepared['src_url']; orig_title = prepared['orig_title']; eng_title_internal = prepared['eng_title']
+    # ✅ 3. تم تمرير القواعد التي تم تحميلها إلى الدالة
+    final_html = content_formatter.format_for_blogger(
+        raw_html_content=prepared['raw_html'],
+        processed_images_map=prepared['img_index'],
+        main_hosted_image_url_for_prepend=prepared['main_hosted_img'],
+        article_title_for_alt=orig_title,
+        dynamic_rules=publishing_rules or {}, # <-- الإضافة هنا
+        source_url=src_url
+    )
+
+    if eng_title_internal and eng_title_internal.strip():
+        final_title = f"{orig_title} ({eng_title_internal})"
+    else: final_title = orig_title
+
+    if custom_labels:
+        main_logger.info("Using custom labels provided by user: %s", custom_labels)
+        final_lbls = custom_labels
+    else:
+        main_logger.info("No custom labels provided, extracting automatically...")
+        final_lbls = _auto_labels(prepared, keyword_tool)
+
+    main_logger.info("Publishing to Blogger (%s). Title: '%s', Labels: %s", blogger_bot_client.blog_id, final_title, final_lbls)
+    is_drft = config.getboolean('BloggerAPI','PostAsDraft',fallback=False)
+
+    pub_url = blogger_bot_client.create_post(
+        title=final_title, content_html=final_html, labels=final_lbls, is_draft=is_drft
+    )
+
+    if pub_url:
+        main_logger.info("Successfully published '%s' to Blogger: %s", src_url, pub_url)
+        with _keyword_lock:
+            if not prepared['in_corpus']: keyword_tool.add_to_corpus(prepared['kw_txt']); prepared['in_corpus'] = True
+    else: 
+        main_logger.error("Failed to publish %s to Blogger.", src_url)
+    return pub_url
+
+# ✅ 1. تمت إضافة وسيط "rules_file_path" هنا
+def run_bot_cycle(creds_path, article_urls_to_process=None, custom_labels=None, rules_file_path=None):
+    main_logger.info("===== BOT CYCLE STARTED =====")
+    published_urls = load_published_source_urls()
+    main_logger.info("Loaded %s previously published URLs.", len(published_urls))
+    
+    # ✅ 2. تمت إضافة هذا الجزء لقراءة ملف القواعد
+    publishing_rules = load_publishing_rules(rules_file_path)
 
     if not creds_path:
         main_logger.critical("Credential path not provided. Aborting.")
         return
 
     try:
-        article_tool = ArticleScraper(config)
-        image_tool = ImageProcessor(config) 
-        content_formatter = ContentFormatter(config, config_filepath=CONFIG_FILE)
-        permalink_suggester = PermalinkGenerator(config)
-        keyword_tool = KeywordExtractor(config)
-        blogger_bot_client = BloggerClient(config, creds_path=creds_path) 
+        (article_tool, image_tool, content_formatter, permalink_suggester, keyword_tool), hosted_images = get_shared_tools()
+        blogger_bot_client = get_blogger_client(creds_path)
         if not blogger_bot_client.service: 
             main_logger.critical("Blogger client initialization failed.")
             return
     except Exception as e: 
         main_logger.critical(f"Tool initialization error: {e}", exc_info=True)
         return
+    seed_keyword_corpus(keyword_tool, [blogger_bot_client])
 
-    final_urls_to_process = []
-    is_specific_mode = bool(article_urls_to_process)
-    if is_specific_mode:
-        main_logger.info(f"Processing {len(article_urls_to_process)} specific URLs provided.")
-        final_urls_to_process = [u for u in article_urls_to_process if u not in published_urls]
-    else:
-        main_logger.info("No specific URLs provided. Fetching from sitemap...")
-        sitemap_url_conf = config.get('Scraping', 'SitemapURL', fallback=None)
-        if not sitemap_url_conf: main_logger.error("SitemapURL is not configured."); return
-        all_potential_urls = fetch_urls_from_sitemap(sitemap_url_conf, config.get('DEFAULT', 'UserAgent'))
-        final_urls_to_process = [u for u in all_potential_urls if u not in published_urls]
-
-    if not final_urls_to_process: 
-        main_logger.info("No new articles to process."); return
-
-    published_count = 0
-    max_run = len(final_urls_to_process) if is_specific_mode else config.getint('BotSettings', 'MaxArticlesPerRun', fallback=5)
-    post_delay = config.getint('BotSettings', 'DelayBetweenPostsSec', fallback=30)
-
-    for i, src_url in enumerate(final_urls_to_process):
-        if published_count >= max_run: 
-            main_logger.info(f"Reached MaxArticlesPerRun limit ({max_run}). Stopping.")
-            break
-        
-        main_logger.info(f"--- Processing Article ({i+1}/{len(final_urls_to_process)}): {src_url} ---")
-        scraped = article_tool.scrape_article_details(src_url)
-        if not scraped: main_logger.warning(f"Scraping failed for {src_url}. Skipping."); continue
-        orig_title = scraped.get("title", "")
-        if not orig_title.strip(): main_logger.warning(f"Empty title for {src_url}. Skipping."); continue
-        raw_html = scraped.get("raw_html_content", "")
-        if not raw_html.strip(): main_logger.warning(f"Inadequate content for {src_url}. Skipping."); continue
-
-        img_map = {}; main_hosted_img = None; img_ext = config.get('ImageProcessing','OutputFormat',fallback='jpg').lower()
-        title_sugg_dict = permalink_suggester.generate_english_title_suggestion(orig_title, source_lang_hint=config.get('Keywords','Language',fallback='ar'))
-        eng_title_internal = title_sugg_dict.get('suggested_title',''); slug_fname_base = title_sugg_dict.get('slug_base','image')
-
-        if scraped.get("main_feature_image_original_url"):
-            img_proc_url = scraped["main_feature_image_original_url"]
-            proc_bytes = image_tool.process_image_with_logo(img_proc_url)
-            if proc_bytes:
-                safe_slug = "".join(c if c.isalnum() else "_" for c in slug_fname_base[:30]).strip('_')
-                fname = f"main_{safe_slug}_{int(time.time())}.{img_ext}"
-                h_url = image_tool.upload_image_to_hosting(proc_bytes, fname)
-                if h_url: img_map[img_proc_url] = h_url; main_hosted_img = h_url; main_logger.info(f"Main image hosted: {h_url}")
-                else: main_logger.warning(f"Main image UPLOAD FAILED for: {img_proc_url}")
-            else: main_logger.warning(f"Main image PROCESSING FAILED for: {img_proc_url}")
-        
-        for img_data in scraped.get("images_in_content_details",[]):
-            orig_tag_src = img_data["original_tag_src"]; full_proc_url = img_data["full_url"]
-            if orig_tag_src not in img_map:
-                if full_proc_url == scraped.get("main_feature_image_original_url") and main_hosted_img:
-                    img_map[orig_tag_src] = main_hosted_img; continue
-                proc_bytes = image_tool.process_image_with_logo(full_proc_url)
-                if proc_bytes:
-                    safe_slug="".join(c if c.isalnum() else "_" for c in slug_fname_base[:20]).strip('_')
-                    fname=f"content_{safe_slug}_{int(time.time())}_{len(img_map)}.{img_ext}"
-                    h_url=image_tool.upload_image_to_hosting(proc_bytes,fname)
-                    if h_url:img_map[orig_tag_src]=h_url
-                    else:main_logger.warning(f"Content image UPLOAD FAILED: {orig_tag_src}")
-                else:main_logger.warning(f"Content image PROCESSING FAILED: {orig_tag_src}")
-
-        # ✅ 3. تم تمرير القواعد التي تم تحميلها إلى الدالة
-        final_html = content_formatter.format_for_blogger(
-            raw_html_content=raw_html,
-            processed_images_map=img_map,
-            main_hosted_image_url_for_prepend=main_hosted_img,
-            article_title_for_alt=orig_title,
-            dynamic_rules=publishing_rules # <-- الإضافة هنا
-        )
-        
-        if eng_title_internal and eng_title_internal.strip():
-            final_title = f"{orig_title} ({eng_title_internal})"
-        else: final_title = orig_title
-
-        final_lbls = []
-        if custom_labels:
-            main_logger.info(f"Using custom labels provided by user: {custom_labels}")
-            final_lbls = custom_labels
+    metrics = start_cycle_metrics('bot_cycle')
+    # السجل والملخص والحفظ يحدثان دائمًا، حتى إذا توقفت الدورة مبكرًا أو باستثناء (وهي الحالة الأحوج للتشخيص)
+    outcome = {'status': 'error', 'published': 0}
+    try:
+        final_urls_to_process = []
+        is_specific_mode = bool(article_urls_to_process)
+        if is_specific_mode:
+            main_logger.info("Processing %s specific URLs provided.", len(article_urls_to_process))
+            final_urls_to_process = [u for u in article_urls_to_process if u not in published_urls]
         else:
-            main_logger.info("No custom labels provided, extracting automatically...")
-            txt_src_kw = raw_html
-            kw_txt = BeautifulSoup(txt_src_kw,'html.parser').get_text(separator=' ',strip=True)
-            labels = keyword_tool.extract_keywords(kw_txt)
-            def_lbl_str = config.get('BloggerAPI','DefaultLabels',fallback=''); def_lbls = [l.strip() for l in def_lbl_str.split(',') if l.strip()]
-            combo_lbls = def_lbls + labels; uniq_lbls = list(dict.fromkeys(combo_lbls))
-            final_lbls = uniq_lbls[:config.getint('BloggerAPI','MaxLabelsPerPost',fallback=10)]
+            main_logger.info("No specific URLs provided. Fetching from sitemap...")
+            sitemap_url_conf = config.get('Scraping', 'SitemapURL', fallback=None)
+            if not sitemap_url_conf: main_logger.error("SitemapURL is not configured."); outcome['status'] = 'no_sitemap'; return
+            all_potential_urls = fetch_urls_from_sitemap(sitemap_url_conf, config.get('DEFAULT', 'UserAgent'))
+            final_urls_to_process = [u for u in all_potential_urls if u not in published_urls]
 
-        main_logger.info(f"Publishing to Blogger. Title: '{final_title}', Labels: {final_lbls}")
-        is_drft = config.getboolean('BloggerAPI','PostAsDraft',fallback=False)
-        
-        pub_url = blogger_bot_client.create_post(
-            title=final_title, content_html=final_html, labels=final_lbls, is_draft=is_drft
-        )
+        if not final_urls_to_process: 
+            main_logger.info("No new articles to process."); outcome['status'] = 'ok'; return
 
-        if pub_url:
-            main_logger.info(f"Successfully published '{src_url}' to Blogger: {pub_url}")
-            if not is_specific_mode: save_published_source_url(src_url, published_urls)
-            published_count += 1
-            if not is_specific_mode and published_count < max_run and i < len(final_urls_to_process)-1:
-                main_logger.info(f"Waiting {post_delay}s before next post...")
-                time.sleep(post_delay)
-        else: 
-            main_logger.error(f"Failed to publish {src_url} to Blogger.")
+        max_run = len(final_urls_to_process) if is_specific_mode else config.getint('BotSettings', 'MaxArticlesPerRun', fallback=5)
+        post_delay = config.getint('BotSettings', 'DelayBetweenPostsSec', fallback=30)
 
-    main_logger.info(f"Published {published_count} new articles in this cycle.")
-    main_logger.info("===== BOT CYCLE FINISHED =====")
+        # كشط دفعة من المقالات أولاً ثم ترجمة كل عناوينها بطلب واحد (مع ذاكرة الترجمة) بدل طلب لكل مقال
+        scrape_batch_size = max(1, config.getint('BotSettings', 'ScrapeBatchSize', fallback=5))
+        title_lang_hint = config.get('Keywords','Language',fallback='ar')
+        batch_start = 0
+        while batch_start < len(final_urls_to_process):
+            if outcome['published'] >= max_run: 
+                main_logger.info("Reached MaxArticlesPerRun limit (%s). Stopping.", max_run)
+                break
 
+            batch_end = min(batch_start + min(scrape_batch_size, max_run - outcome['published']), len(final_urls_to_process))
+            scraped_batch = []
+            for i in range(batch_start, batch_end):
+                src_url = final_urls_to_process[i]
+                main_logger.info("--- Scraping Article (%s/%s): %s ---", i+1, len(final_urls_to_process), src_url)
+                with metrics.article(src_url): scraped = scrape_article(article_tool, src_url)
+                if scraped: scraped_batch.append((i, src_url, scraped))
+                else: metrics.finish_article(src_url, status='skipped')
+            batch_start = batch_end
+            if not scraped_batch: continue
 
-if __name__ == "__main__":
+            title_suggestions = permalink_suggester.generate_english_title_suggestions([item[2]["title"] for item in scraped_batch], source_lang_hint=title_lang_hint)
+            for (i, src_url, scraped), title_sugg_dict in zip(scraped_batch, title_suggestions):
+                main_logger.info("--- Processing Article (%s/%s): %s ---", i+1, len(final_urls_to_process), src_url)
+                with metrics.article(src_url):
+                    prepared = prepare_article(src_url, scraped, title_sugg_dict, image_tool, hosted_images)
+                    pub_url = publish_prepared_article(prepared, blogger_bot_client, content_formatter, keyword_tool, publishing_rules, custom_labels)
+                metrics.finish_article(src_url, status='published' if pub_url else 'failed', post_url=pub_url)
+
+                if pub_url:
+                    if not is_specific_mode: save_published_source_url(src_url, published_urls)
+                    outcome['published'] += 1
+                    if not is_specific_mode and outcome['published'] < max_run and i < len(final_urls_to_process)-1:
+                        main_logger.info("Waiting %ss before next post...", post_delay)
+                        time.sleep(post_delay)
+        outcome['status'] = 'ok'
+    except BaseException as e: # KeyboardInterrupt أيضًا: الدورة المقطوعة تُسجل بسببها
+        outcome['error'] = f"{type(e).__name__}: {e}"; raise
+    finally:
+        article_tool.save_selector_stats()
+        keyword_tool.save_corpus()
+        main_logger.debug("Selector hit rates: %s", article_tool.get_selector_hit_rates())
+        main_logger.info("Published %s new articles in this cycle.", outcome['published'])
+        finish_cycle_metrics(metrics, **outcome)
+        main_logger.info("===== BOT CYCLE FINISHED (%s) =====", outcome['status'])
+
+
+def main(argv=None):
     parser = argparse.ArgumentParser(description="Blogger Auto Post Bot")
     parser.add_argument("--urls", type=str, nargs='+', help="List of specific article URLs to process.")
     parser.add_argument("--creds-path", type=str, required=True, help="Path to the Google credential directory.")
     parser.add_argument("--labels", type=str, nargs='*', help="List of custom labels to apply to the posts.")
     # ✅ 4. تمت إضافة الوسيط الجديد هنا ليتمكن السكربت من استقباله
     parser.add_argument("--rules-file", type=str, help="Path to the JSON file with publishing rules.")
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     try:
         load_app_config()
@@ -221,9 +360,13 @@ if __name__ == "__main__":
     except FileNotFoundError as e:
         print(f"CRITICAL - A required file was not found: {e}")
         if main_logger: main_logger.critical(f"A required file was not found: {e}", exc_info=True)
-        exit(1)
+        return 1
     except Exception as e:
         error_msg = f"An unhandled critical error occurred: {e}"
         print(f"CRITICAL UNHANDLED ERROR: {e}")
         if main_logger: main_logger.critical(error_msg, exc_info=True)
-        exit(1)
\ No newline at end of file
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+# bot_scripts/scraper/orchestrator.py
+# منسّق يشغّل دورة النشر لعدة أهداف (مستخدم/مدونة) معًا داخل عملية واحدة:
+# - كل رابط مصدر يُكشط وتُترجم عناوينه وتُعالج صوره وتُرفع مرة واحدة فقط مهما كان عدد المدونات التي ستنشره،
+#   فالحمل على مواقع المصدر وعلى المعالج يتناسب مع عدد المقالات الفريدة لا مع عدد المستخدمين.
+# - قواعد كل هدف (التنسيق، التصنيفات، المدونة) تُطبق فقط في مرحلة التنسيق والنشر (publish_prepared_article).
+# - الجدولة بالتناوب: في كل جولة يأخذ كل هدف نشط مقالاً واحدًا على الأكثر، فلا يستطيع هدف بقائمة طويلة أن يؤخر الآخرين.
+#
+# التشغيل:  python bot_scripts/scraper/orchestrator.py --targets-file targets.json [--workers 4]
+#           python bot_scripts/scraper/orchestrator.py --from-app-config .streamlit/secrets.toml
+# ملف الأهداف قائمة JSON، كل عنصر:
+#   {"name": "user1", "creds_path": "user_credentials/user1", "blog_id": "123", "urls": [...] أو "sitemap_url": "...",
+#    "custom_labels": [...], "publishing_rules": {...} أو "rules_file": "...", "max_articles": 5}
+import os
+import sys
+import time
+import json
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# --- الحل الديناميكي لمسارات الاستيراد ---
+try:
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+except NameError:
+    project_root = os.getcwd()
+# ---------------------------------------------
+
+from bot_scripts.scraper import main as bot
+from core.sitemap_fetcher import fetch_urls_from_sitemap
+
+class PublishTarget:
+    """حالة هدف واحد خلال الدورة: الروابط المتبقية، ما نُشر سابقًا، والقواعد الخاصة به."""
+    def __init__(self, spec, index):
+        self.name = str(spec.get('name') or f"target{index + 1}")
+        self.creds_path = spec.get('creds_path')
+        self.blog_id = str(spec['blog_id']) if spec.get('blog_id') else None
+        self.custom_labels = spec.get('custom_labels') or None
+        self.publishing_rules = spec.get('publishing_rules') or bot.load_publishing_rules(spec.get('rules_file'))
+        self.urls = list(spec.get('urls') or [])
+        self.is_specific_mode = bool(self.urls)
+        self.sitemap_url = spec.get('sitemap_url') or bot.config.get('Scraping', 'SitemapURL', fallback=None)
+        self.published_file = spec.get('published_urls_file') or published_file_for(self.name)
+        self.published_urls = load_url_set(self.published_file)
+        default_max = len(self.urls) if self.is_specific_mode else bot.config.getint('BotSettings', 'MaxArticlesPerRun', fallback=5)
+        self.max_run = int(spec.get('max_articles') or default_max)
+        self.pending = deque()
+        self.client = None
+        self.published_count = 0
+        self.failed_count = 0
+
+    def wants_more(self):
+        return self.client is not None and self.published_count < self.max_run and bool(self.pending)
+
+    def next_url(self, prepared_cache):
+        """أول رابط غير منشور لم يفشل تحضيره سابقًا (None في prepared_cache = فشل الكشط)."""
+        while self.pending:
+            url = self.pending.popleft()
+            if url in self.published_urls or (url in prepared_cache and prepared_cache[url] is None): continue
+            return url
+        return None
+
+    def mark_published(self, url):
+        self.published_count += 1; self.published_urls.add(url)
+        if self.is_specific_mode: return # مثل run_bot_cycle: الروابط المحددة يدويًا لا تُسجل
+        try:
+            with open(self.published_file, 'a', encoding='utf-8') as f: f.write(url + "\n")
+        except IOError as e: bot.main_logger.error("[%s] Failed to save URL %s to '%s': %s", self.name, url, self.published_file, e)
+
+def published_file_for(name):
+    """ملف روابط منشورة مستقل لكل هدف، بجوار PublishedUrlsFile من config.ini."""
+    base = bot.config.get('Paths', 'PublishedUrlsFile', fallback='published_articles.txt')
+    root, ext = os.path.splitext(base)
+    safe_name = "".join(c if c.isalnum() or c in '-_' else '_' for c in name)
+    return f"{root}_{safe_name}{ext or '.txt'}"
+
+def load_url_set(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f: return set(l.strip() for l in f if l.strip())
+    except FileNotFoundError: return set()
+
+def load_targets(targets_file):
+    with open(targets_file, 'r', encoding='utf-8') as f: specs = json.load(f)
+    if not isinstance(specs, list): raise ValueError(f"Targets file '{targets_file}' must contain a JSON list.")
+    return specs
+
+def targets_from_app_config(config_path):
+    """
+    هدف لكل مدونة في قائمة blogs لكل مستخدم لديه مجلد مصادقة، بقواعد النشر المحفوظة له.
+    المستخدم بلا مدونات يُتخطى (لا رجوع ضمني إلى BlogID في config.ini)، والمدونة المدرجة لدى أكثر من مستخدم
+    تُنشر لأول مستخدم فقط: هدفان لنفس المدونة من نفس خريطة الموقع ينشران كل مقال مرتين.
+    """
+    from utils.config_store import ConfigStore
+    users = ConfigStore(config_path).load().get('users', {})
+    specs = []; owners = {}
+    for username, data in users.items():
+        if not data.get('credential_path'): continue
+        blog_ids = [str(blog.get('id')).strip() for blog in data.get('blogs') or [] if blog.get('id')]
+        if not blog_ids: bot.main_logger.warning("[%s] No blogs configured for this user. Skipping.", username); continue
+        for blog_id in dict.fromkeys(blog_ids):
+            if blog_id in owners: bot.main_logger.error("[%s] Blog %s is already published by '%s'. Skipping duplicate target.", username, blog_id, owners[blog_id]); continue
+            owners[blog_id] = username
+            specs.append({'name': username if len(blog_ids) == 1 else f"{username}_{blog_id}", 'creds_path': data['credential_path'],
+                          'blog_id': blog_id, 'publishing_rules': data.get('publishing_rules') or {}})
+    return specs
+
+def check_unique_targets(targets):
+    """يرفض هدفين لنفس المدونة بنفس ملف الروابط المنشورة: كلاهما سيختار نفس الرابط في نفس الجولة فيُنشر مرتين."""
+    seen = {}
+    for target in targets:
+        key = (target.blog_id or bot.config.get('BloggerAPI', 'BlogID', fallback=''), os.path.abspath(target.published_file))
+        if key in seen: raise ValueError(f"Targets '{seen[key]}' and '{target.name}' publish to blog {key[0]} with the same published URLs file '{target.published_file}'.")
+        seen[key] = target.name
+
+class Orchestrator:
+    def __init__(self, target_specs, workers=4):
+        self.targets = [PublishTarget(spec, i) for i, spec in enumerate(target_specs)]
+        check_unique_targets(self.targets)
+        self.workers = max(1, workers)
+        self.prepared_cache = {} # src_url -> المقال المحضّر، أو None إذا فشل (لا يُعاد كشطه في هذه الدورة)
+        self._client_locks = {} # عميل Blogger (httplib2) غير آمن بين الخيوط: نشر واحد لكل عميل في نفس اللحظة
+        self.scraped_count = 0
+        self.metrics = None
+
+    def _fill_queues(self):
+        sitemaps = {}
+        for target in self.targets:
+            if target.is_specific_mode: urls = target.urls
+            elif not target.sitemap_url: bot.main_logger.error("[%s] SitemapURL is not configured.", target.name); continue
+            else:
+                # كل خريطة موقع تُجلب مرة واحدة مهما كان عدد الأهداف التي تقرأ منها
+                if target.sitemap_url not in sitemaps: sitemaps[target.sitemap_url] = fetch_urls_from_sitemap(target.sitemap_url, bot.config.get('DEFAULT', 'UserAgent'))
+                urls = sitemaps[target.sitemap_url]
+            target.pending.extend(u for u in urls if u not in target.published_urls)
+            bot.main_logger.info("[%s] %s candidate URLs, up to %s to publish.", target.name, len(target.pending), target.max_run)
+
+    def _connect_targets(self):
+        for target in self.targets:
+            if not target.creds_path: bot.main_logger.error("[%s] Credential path not provided. Skipping target.", target.name); continue
+            try: client = bot.get_blogger_client(target.creds_path, target.blog_id)
+            except Exception as e: bot.main_logger.error("[%s] Blogger client error: %s", target.name, e); continue
+            if not client.service: bot.main_logger.error("[%s] Blogger client initialization failed. Skipping target.", target.name); continue
+            target.client = client
+            self._client_locks.setdefault(id(client), threading.Lock())
+
+    def _prepare_round(self, urls, pool, tools, hosted_images):
+        """كشط الروابط الجديدة بالتوازي، ترجمة عناوينها بطلب واحد، ثم معالجة صورها بالتوازي."""
+        article_tool, image_tool, _, permalink_suggester, _ = tools
+        scraped_list = list(pool.map(lambda url: self._in_article(url, bot.scrape_article, article_tool, url), urls))
+        self.scraped_count += len(urls)
+        scraped_items = []
+        for url, scraped in zip(urls, scraped_list):
+            if scraped: scraped_items.append((url, scraped))
+            else: self.prepared_cache[url] = None; self.metrics.finish_article(url, status='skipped')
+        if not scraped_items: return
+        title_lang_hint = bot.config.get('Keywords', 'Language', fallback='ar')
+        title_suggestions = permalink_suggester.generate_english_title_suggestions([scraped["title"] for _, scraped in scraped_items], source_lang_hint=title_lang_hint)
+        prepared_list = pool.map(lambda item: self._in_article(item[0][0], bot.prepare_article, item[0][0], item[0][1], item[1], image_tool, hosted_images), zip(scraped_items, title_suggestions))
+        for (url, _), prepared in zip(scraped_items, prepared_list): self.prepared_cache[url] = prepared
+
+    def _in_article(self, url, func, *args):
+        with self.metrics.article(url): return func(*args)
+
+    def _publish(self, target, prepared, tools):
+        _, _, content_formatter, _, keyword_tool = tools
+        with self._client_locks[id(target.client)]:
+            bot.main_logger.info("[%s] Publishing %s", target.name, prepared['src_url'])
+            with self.metrics.article(prepared['src_url']):
+                pub_url = bot.publish_prepared_article(prepared, target.client, content_formatter, keyword_tool, target.publishing_rules, target.custom_labels)
+        if pub_url: target.mark_published(prepared['src_url'])
+        else: target.failed_count += 1
+        return pub_url
+
+    def run(self):
+        bot.main_logger.info("===== ORCHESTRATED CYCLE STARTED (%s targets) =====", len(self.targets))
+        try: tools, hosted_images = bot.get_shared_tools()
+        except Exception as e:
+            bot.main_logger.critical(f"Tool initialization error: {e}", exc_info=True); return False
+        self.metrics = bot.start_cycle_metrics('orchestrated_cycle')
+        # السجل والملخص والحفظ يحدثان دائمًا، حتى إذا توقفت الدورة باستثناء
+        outcome = {'status': 'error'}
+        try:
+            self._connect_targets()
+            # أرشيف كل مدونة مرة واحدة (عدة أهداف قد تنشر في نفس المدونة)
+            archive_clients = {target.client.blog_id: target.client for target in self.targets if target.client}
+            bot.seed_keyword_corpus(tools[4], list(archive_clients.values()))
+            self._fill_queues()
+            post_delay = bot.config.getint('BotSettings', 'DelayBetweenPostsSec', fallback=30)
+            round_no = 0
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                while True:
+                    picks = [(target, target.next_url(self.prepared_cache)) for target in self.targets if target.wants_more()]
+                    picks = [(target, url) for target, url in picks if url]
+                    if not picks: break
+                    round_no += 1
+                    new_urls = [url for url in dict.fromkeys(url for _, url in picks) if url not in self.prepared_cache]
+                    bot.main_logger.info("--- Round %s: %s targets, %s new source articles ---", round_no, len(picks), len(new_urls))
+                    if new_urls: self._prepare_round(new_urls, pool, tools, hosted_images)
+                    ready = [(target, url) for target, url in picks if self.prepared_cache.get(url)]
+                    jobs = [pool.submit(self._publish, target, self.prepared_cache[url], tools) for target, url in ready]
+                    results = [(target, url, job.result()) for (target, url), job in zip(ready, jobs)]
+                    for url in dict.fromkeys(url for _, url, _ in results):
+                        # سجل واحد لكل مقال فريد: زمن تحضيره مرة واحدة + زمن نشره لكل هدف
+                        published_to = [target.name for target, result_url, pub_url in results if result_url == url and pub_url]
+                        self.metrics.finish_article(url, status='published' if published_to else 'failed', targets=published_to)
+                    published_any = any(pub_url for _, _, pub_url in results)
+                    if published_any and any(target.wants_more() for target in self.targets):
+                        bot.main_logger.info("Waiting %ss before next round...", post_delay)
+                        time.sleep(post_delay)
+            outcome['status'] = 'ok'
+        except BaseException as e:
+            outcome['error'] = f"{type(e).__name__}: {e}"; raise
+        finally:
+            article_tool, _, _, _, keyword_tool = tools
+            article_tool.save_selector_stats()
+            keyword_tool.save_corpus()
+            for target in self.targets:
+                bot.main_logger.info("[%s] Published %s articles (%s failed).", target.name, target.published_count, target.failed_count)
+            bot.main_logger.info("Scraped %s unique source articles for %s posts; %s hosted images cached.",
+                                 self.scraped_count, sum(t.published_count for t in self.targets), len(hosted_images))
+            bot.finish_cycle_metrics(self.metrics, targets=len(self.targets), unique_articles=self.scraped_count,
+                                     published=sum(t.published_count for t in self.targets), **outcome)
+            bot.main_logger.info("===== ORCHESTRATED CYCLE FINISHED (%s) =====", outcome['status'])
+        return True
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish cycle for many user/blog targets with shared scraping")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--targets-file", type=str, help="JSON list of targets.")
+    source.add_argument("--from-app-config", type=str, help="Dashboard secrets.toml/app_config.json: one target per user blog.")
+    parser.add_argument("--workers", type=int, default=4, help="Threads for scraping, image processing and publishing.")
+    args = parser.parse_args(argv)
+
+    try:
+        bot.load_app_config()
+        specs = load_targets(args.targets_file) if args.targets_file else targets_from_app_config(args.from_app_config)
+        if not specs: bot.main_logger.warning("No targets to run."); return 0
+        return 0 if Orchestrator(specs, workers=args.workers).run() else 1
+    except FileNotFoundError as e:
+        print(f"CRITICAL: {e}"); return 1
+    except KeyboardInterrupt:
+        if bot.main_logger: bot.main_logger.info("Orchestrator stopped by user.")
+        return 0
+    except Exception as e:
+        if bot.main_logger: bot.main_logger.critical(f"Critical error: {e}", exc_info=True)
+        else: print(f"CRITICAL ERROR: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
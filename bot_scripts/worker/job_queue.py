@@ -0,0 +1,308 @@
+# bot_scripts/worker/job_queue.py
+# طابور مهام دائم (SQLite) ومجدول بعدد محدود من الخانات، بدل تشغيل كل مهمة داخل طلب Streamlit نفسه:
+# - الواجهة تضيف المهمة (submit) وتتابع حالتها وسجلها، ويمكنها إلغاؤها.
+# - المجدول يشغّل حتى Slots مهمة معًا، ولا يتجاوز حدًا لكل مستخدم ولا لكل مورد (مدونة أو مجلد مصادقة)،
+#   فلا تتزاحم جلسات عدة مشغلين على نفس المدونة ولا تُستنزف حصة Blogger.
+# - كل خانة عامل دائم مستقل (job_worker.py على منفذ خاص)؛ إلغاء مهمة جارية = إيقاف عامل خانتها وإعادة تشغيله.
+#
+# التشغيل:  python bot_scripts/worker/job_queue.py [--slots 2 --per-user 1 --per-blog 1]
+import os
+import sys
+import json
+import time
+import signal
+import sqlite3
+import argparse
+import threading
+import subprocess
+
+# --- الحل الديناميكي لمسارات الاستيراد ---
+try:
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+except NameError:
+    project_root = os.getcwd()
+# ---------------------------------------------
+
+from utils.file_lock import FileLock
+from bot_scripts.worker import job_worker
+
+DEFAULT_DB_FILE = os.path.join(project_root, 'job_queue.sqlite')
+FINAL_STATUSES = ('done', 'failed', 'cancelled')
+
+class JobQueue:
+    """
+    جدول jobs: الحالة queued ← running ← (done | failed | cancelled).
+    كل انتقال يتم في معاملة BEGIN IMMEDIATE، فيمكن لعدة جلسات وللمجدول استخدام نفس الملف معًا.
+    """
+    def __init__(self, db_path=DEFAULT_DB_FILE):
+        self.db_path = db_path
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir: os.makedirs(db_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, username TEXT, blog_key TEXT,
+            script TEXT NOT NULL, argv TEXT NOT NULL, cwd TEXT, log_path TEXT, cleanup_paths TEXT, on_success TEXT,
+            status TEXT NOT NULL, cancel_requested INTEGER NOT NULL DEFAULT 0, return_code INTEGER, progress TEXT,
+            slot INTEGER, created_at REAL NOT NULL, started_at REAL, finished_at REAL)""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, id)")
+
+    def _transaction(self, fn):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except Exception:
+                self._conn.execute("ROLLBACK"); raise
+
+    def _row(self, row):
+        if row is None: return None
+        job = dict(row)
+        job['argv'] = json.loads(job['argv']); job['cleanup_paths'] = json.loads(job['cleanup_paths'] or '[]')
+        job['on_success'] = json.loads(job['on_success'] or '{}')
+        return job
+
+    def submit(self, kind, script, argv, username=None, blog_key=None, cwd=None, log_path=None, cleanup_paths=None, on_success=None):
+        """
+        blog_key: المورد الذي لا يُشغَّل عليه أكثر من per_blog مهمة معًا (مدونة أو مجلد مصادقة).
+        cleanup_paths: ملفات مؤقتة (مثل ملف القواعد) تُحذف بعد انتهاء المهمة.
+        on_success: عدادات تُضاف للمستخدم في إعدادات اللوحة عند النجاح، مثل {"post_count": 3}.
+        """
+        def insert(conn):
+            return conn.execute("INSERT INTO jobs (kind, username, blog_key, script, argv, cwd, log_path, cleanup_paths, on_success, status, created_at) "
+                                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'queued', ?)",
+                                (kind, username, blog_key, script, json.dumps(list(argv), ensure_ascii=False), cwd or os.getcwd(), log_path,
+                                 json.dumps(cleanup_paths or []), json.dumps(on_success or {}), time.time())).lastrowid
+        return self._transaction(insert)
+
+    def claim_next(self, slot, per_user=1, per_blog=1):
+        """أقدم مهمة منتظرة لا يتجاوز تشغيلها حد المستخدم ولا حد المورد، وتصبح running في نفس المعاملة."""
+        def claim(conn):
+            running = conn.execute("SELECT username, blog_key FROM jobs WHERE status = 'running'").fetchall()
+            user_counts, blog_counts = {}, {}
+            for row in running:
+                user_counts[row['username']] = user_counts.get(row['username'], 0) + 1
+                blog_counts[row['blog_key']] = blog_counts.get(row['blog_key'], 0) + 1
+            for row in conn.execute("SELECT id, username, blog_key FROM jobs WHERE status = 'queued' ORDER BY id"):
+                if per_user and row['username'] and user_counts.get(row['username'], 0) >= per_user: continue
+                if per_blog and row['blog_key'] and blog_counts.get(row['blog_key'], 0) >= per_blog: continue
+                conn.execute("UPDATE jobs SET status = 'running', slot = ?, started_at = ? WHERE id = ?", (slot, time.time(), row['id']))
+                return row['id']
+            return None
+        job_id = self._transaction(claim)
+        return self.get(job_id) if job_id is not None else None
+
+    def set_progress(self, job_id, progress):
+        with self._lock: self._conn.execute("UPDATE jobs SET progress = ? WHERE id = ?", (progress, job_id))
+
+    def finish(self, job_id, return_code):
+        """يعيد الحالة النهائية: cancelled إذا طُلب الإلغاء، وإلا done أو failed حسب رمز الخروج."""
+        def update(conn):
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            status = 'cancelled' if row and row['cancel_requested'] else ('done' if return_code == 0 else 'failed')
+            conn.execute("UPDATE jobs SET status = ?, return_code = ?, finished_at = ? WHERE id = ?", (status, return_code, time.time(), job_id))
+            return status
+        return self._transaction(update)
+
+    def cancel(self, job_id):
+        """المهمة المنتظرة تُلغى فورًا، والجارية يُطلب من المجدول إيقافها. يعيد الحالة بعد الطلب."""
+        def update(conn):
+            row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None: return None
+            if row['status'] == 'queued':
+                conn.execute("UPDATE jobs SET status = 'cancelled', cancel_requested = 1, finished_at = ? WHERE id = ?", (time.time(), job_id))
+                return 'cancelled'
+            if row['status'] == 'running': conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+            return row['status']
+        return self._transaction(update)
+
+    def cancel_requested_ids(self):
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT id FROM jobs WHERE status = 'running' AND cancel_requested = 1")}
+
+    def fail_interrupted(self):
+        """مهام بقيت running من مجدول سابق توقف فجأة: لا نعيد تشغيلها تلقائيًا (قد تكون نشرت جزئيًا)."""
+        def update(conn):
+            return conn.execute("UPDATE jobs SET status = 'failed', progress = 'توقف المجدول أثناء التنفيذ', finished_at = ? WHERE status = 'running'",
+                                (time.time(),)).rowcount
+        return self._transaction(update)
+
+    def get(self, job_id):
+        with self._lock: return self._row(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def queue_position(self, job_id):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND id < ?", (job_id,)).fetchone()[0]
+
+    def list_jobs(self, username=None, limit=20):
+        sql, params = "SELECT * FROM jobs", []
+        if username: sql += " WHERE username = ?"; params.append(username)
+        sql += " ORDER BY id DESC LIMIT ?"; params.append(limit)
+        with self._lock: return [self._row(row) for row in self._conn.execute(sql, params).fetchall()]
+
+    def close(self):
+        with self._lock: self._conn.close()
+
+def scheduler_lock(db_path=DEFAULT_DB_FILE):
+    return FileLock(f"{db_path}.scheduler.lock", timeout=0)
+
+def is_scheduler_running(db_path=DEFAULT_DB_FILE):
+    lock = scheduler_lock(db_path)
+    try: lock.acquire()
+    except TimeoutError: return True
+    lock.release(); return False
+
+def start_scheduler_process(db_path=DEFAULT_DB_FILE, slots=None, per_user=None, per_blog=None):
+    """يشغّل المجدول كعملية مستقلة في الخلفية (إن لم يكن يعمل)."""
+    if is_scheduler_running(db_path): return None
+    args = [sys.executable, os.path.abspath(__file__), '--db', db_path]
+    for flag, value in (('--slots', slots), ('--per-user', per_user), ('--per-blog', per_blog)):
+        if value is not None: args += [flag, str(value)]
+    env = os.environ.copy(); env['PYTHONIOENCODING'] = 'utf-8'
+    log_dir = os.path.join(project_root, 'logs'); os.makedirs(log_dir, exist_ok=True)
+    with open(os.path.join(log_dir, 'job_scheduler.log'), 'a', encoding='utf-8') as log_file:
+        popen_kwargs = {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP} if os.name == 'nt' else {'start_new_session': True}
+        return subprocess.Popen(args, stdout=log_file, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, cwd=project_root, env=env, **popen_kwargs).pid
+
+def _apply_on_success(job):
+    """عدادات المستخدم (مثل post_count) تُحدَّث في إعدادات اللوحة المحلية عند نجاح المهمة."""
+    if not job['on_success'] or not job['username']: return
+    from utils.config_store import get_config_store
+    store = get_config_store(os.path.join(job['cwd'], '.streamlit', 'secrets.toml'), fallback_json_path=os.path.join(job['cwd'], 'app_config.json'))
+    for field, amount in job['on_success'].items():
+        try: store.increment_user_counter(job['username'], field, amount)
+        except Exception as e: print(f"[scheduler] could not update {field} for {job['username']}: {e}")
+
+class JobScheduler:
+    def __init__(self, queue, slots=2, per_user=1, per_blog=1, base_port=None, poll_interval=0.5, worker_start_timeout=60):
+        self.queue = queue
+        self.slots = max(1, slots)
+        self.per_user = per_user
+        self.per_blog = per_blog
+        self.base_port = base_port or job_worker.DEFAULT_PORT + 1
+        self.poll_interval = poll_interval
+        self.worker_start_timeout = worker_start_timeout
+        self.authkey = job_worker.get_authkey()
+        self._workers = {} # slot -> Popen
+        self._running = {} # slot -> job_id
+        self._lock = threading.Lock()
+
+    def _address(self, slot):
+        return (job_worker.DEFAULT_HOST, self.base_port + slot)
+
+    def _stop_orphan_worker(self, slot, timeout=10):
+        """
+        عامل يجيب على منفذ الخانة ولم يشغّله هذا المجدول (بقي بعد انهيار مجدول سابق وقد يكون ما زال ينفذ مهمة):
+        يُنهى قبل إعادة استخدام الخانة، وإلا أُرسلت المهام الجديدة إليه بجانب مهمته القديمة.
+        """
+        info = job_worker.ping_worker(self._address(slot), self.authkey)
+        if not info or not info.get('pid'): return
+        process = self._workers.get(slot)
+        if process is not None and process.pid == info['pid']: return
+        print(f"[scheduler] stopping orphaned worker pid {info['pid']} on slot {slot}"); sys.stdout.flush()
+        for sig in (signal.SIGTERM, getattr(signal, 'SIGKILL', signal.SIGTERM)):
+            try: os.kill(info['pid'], sig)
+            except OSError: return
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                if job_worker.ping_worker(self._address(slot), self.authkey) is None: return
+                time.sleep(0.1)
+        raise RuntimeError(f"Orphaned job worker pid {info['pid']} on slot {slot} did not stop.")
+
+    def _ensure_worker(self, slot):
+        process = self._workers.get(slot)
+        if process is not None and process.poll() is None: return
+        self._stop_orphan_worker(slot)
+        env = os.environ.copy(); env['PYTHONIOENCODING'] = 'utf-8'
+        log_path = os.path.join(project_root, 'logs', f'job_worker_slot{slot}.log'); os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        with open(log_path, 'a', encoding='utf-8') as log_file:
+            self._workers[slot] = subprocess.Popen([sys.executable, job_worker.__file__, '--port', str(self.base_port + slot)],
+                                                   stdout=log_file, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, cwd=project_root, env=env)
+        deadline = time.monotonic() + self.worker_start_timeout
+        while time.monotonic() < deadline:
+            if job_worker.ping_worker(self._address(slot), self.authkey) is not None: return
+            if self._workers[slot].poll() is not None: break
+            time.sleep(0.1)
+        raise RuntimeError(f"Job worker for slot {slot} did not start.")
+
+    def _stop_worker(self, slot):
+        process = self._workers.pop(slot, None)
+        if process is None or process.poll() is not None: return
+        process.terminate()
+        try: process.wait(timeout=10)
+        except subprocess.TimeoutExpired: process.kill(); process.wait()
+
+    def _run_job(self, slot, job):
+        return_code = 1
+        log_path = job['log_path'] or os.path.join(project_root, 'logs', f"job_{job['id']}.log")
+        last_progress = [0.0]
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+            with open(log_path, 'a', encoding='utf-8') as log_file:
+                def on_output(text):
+                    log_file.write(text); log_file.flush()
+                    now = time.monotonic()
+                    if now - last_progress[0] >= 1.0: # آخر سطر كمؤشر تقدم، دون كتابة في القاعدة لكل سطر
+                        lines = [line for line in text.splitlines() if line.strip()]
+                        if lines: self.queue.set_progress(job['id'], lines[-1][:300]); last_progress[0] = now
+                try:
+                    self._ensure_worker(slot)
+                    return_code = job_worker.run_in_worker(job['script'], job['argv'], on_output, cwd=job['cwd'], address=self._address(slot), authkey=self.authkey)
+                except Exception as e:
+                    on_output(f"\n!!! تعذر تشغيل المهمة على العامل: {e} !!!\n")
+        finally:
+            status = self.queue.finish(job['id'], return_code)
+            if status == 'done': _apply_on_success(job)
+            for path in job['cleanup_paths']:
+                try: os.remove(path)
+                except OSError: pass
+            with self._lock: self._running.pop(slot, None)
+            print(f"[scheduler] job #{job['id']} ({job['kind']}) on slot {slot} -> {status}"); sys.stdout.flush()
+
+    def run_forever(self):
+        lock = scheduler_lock(self.queue.db_path)
+        try: lock.acquire()
+        except TimeoutError:
+            print("[scheduler] another scheduler is already running."); return 1
+        try:
+            interrupted = self.queue.fail_interrupted()
+            if interrupted: print(f"[scheduler] marked {interrupted} interrupted job(s) as failed.")
+            for slot in range(self.slots):
+                try: self._stop_orphan_worker(slot)
+                except RuntimeError as e: print(f"[scheduler] {e}")
+            print(f"[scheduler] {self.slots} slot(s), per user {self.per_user}, per blog {self.per_blog} (pid {os.getpid()})"); sys.stdout.flush()
+            while True:
+                for job_id in self.queue.cancel_requested_ids():
+                    with self._lock: slot = next((s for s, jid in self._running.items() if jid == job_id), None)
+                    # العامل ينفذ المهمة داخل عمليته: الإيقاف = إنهاء العملية، ثم يُعاد تشغيله للمهمة التالية
+                    if slot is not None: print(f"[scheduler] cancelling job #{job_id} on slot {slot}"); self._stop_worker(slot)
+                for slot in range(self.slots):
+                    with self._lock:
+                        if slot in self._running: continue
+                    job = self.queue.claim_next(slot, self.per_user, self.per_blog)
+                    if job is None: break
+                    with self._lock: self._running[slot] = job['id']
+                    threading.Thread(target=self._run_job, args=(slot, job), daemon=True).start()
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt: return 0
+        finally:
+            for slot in list(self._workers): self._stop_worker(slot)
+            lock.release()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Job queue scheduler for the publish/clean scripts")
+    parser.add_argument("--db", type=str, default=DEFAULT_DB_FILE, help="SQLite job queue file.")
+    parser.add_argument("--slots", type=int, default=2, help="Jobs that may run at the same time.")
+    parser.add_argument("--per-user", type=int, default=1, help="Running jobs allowed per dashboard user (0 = no limit).")
+    parser.add_argument("--per-blog", type=int, default=1, help="Running jobs allowed per blog/credential (0 = no limit).")
+    args = parser.parse_args(argv)
+    return JobScheduler(JobQueue(args.db), slots=args.slots, per_user=args.per_user, per_blog=args.per_blog).run_forever()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,200 @@
+# bot_scripts/worker/job_worker.py
+# عامل دائم يشغّل مهام النشر والتنظيف داخل عملية واحدة طويلة العمر بدل عملية بايثون جديدة لكل مهمة:
+# المكتبات تُستورد مرة واحدة، وعملاء Blogger وجلسة cloudscraper (مع تصريح Cloudflare) والمترجم تبقى دافئة بين المهام.
+# الواجهة ترسل (السكربت، الوسائط) عبر مقبس محلي محمي بمفتاح، والعامل يعيد أسطر السجل أولاً بأول ثم رمز الخروج.
+#
+# التشغيل يدويًا:  python bot_scripts/worker/job_worker.py [--port 47831]
+import os
+import sys
+import time
+import argparse
+import threading
+import importlib
+import subprocess
+from multiprocessing.connection import Listener, Client
+
+# --- الحل الديناميكي لمسارات الاستيراد ---
+try:
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+except NameError:
+    project_root = os.getcwd()
+# ---------------------------------------------
+
+from utils.logger_config import flush_logging
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = int(os.environ.get('BOT_WORKER_PORT', 47831))
+AUTHKEY_FILE = os.path.join(project_root, '.worker_authkey')
+# السكربتات المسموح تشغيلها في العامل، وكل منها يوفر main(argv) تعيد رمز الخروج
+WORKER_SCRIPTS = {
+    'bot_scripts/scraper/main.py': 'bot_scripts.scraper.main',
+    'bot_scripts/cleaner/clean_posts.py': 'bot_scripts.cleaner.clean_posts',
+    'bot_scripts/scraper/orchestrator.py': 'bot_scripts.scraper.orchestrator',
+}
+
+class WorkerUnavailableError(Exception):
+    """لا يوجد عامل يستمع على العنوان (أو المفتاح غير مطابق): على المستدعي التشغيل كعملية منفصلة."""
+
+def get_authkey():
+    """المفتاح من BOT_WORKER_AUTHKEY، وإلا من ملف .worker_authkey (يُنشأ مرة واحدة بصلاحيات المالك فقط)."""
+    env_key = os.environ.get('BOT_WORKER_AUTHKEY')
+    if env_key: return env_key.encode('utf-8')
+    try:
+        fd = os.open(AUTHKEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w') as f: f.write(os.urandom(32).hex())
+    except FileExistsError: pass
+    for _ in range(20): # ربما تكتبه عملية أخرى في هذه اللحظة
+        with open(AUTHKEY_FILE, 'r') as f: key = f.read().strip()
+        if key: return key.encode('utf-8')
+        time.sleep(0.05)
+    raise RuntimeError(f"Worker auth key file '{AUTHKEY_FILE}' is empty.")
+
+def normalize_script(script_path):
+    if script_path in WORKER_SCRIPTS: return script_path
+    return os.path.relpath(os.path.abspath(script_path), project_root).replace(os.sep, '/')
+
+class _JobOutput:
+    """
+    بديل sys.stdout داخل العامل: يرسل الأسطر إلى اتصال المهمة الحالية، وإلا يكتب إلى المخرج الأصلي.
+    يُركَّب قبل استيراد أي سكربت، فتلتقط معالجات logging التي تنشئها setup_logger (StreamHandler(sys.stdout)) نفس الكائن.
+    """
+    def __init__(self, fallback):
+        self._fallback = fallback
+        self._owner_pid = os.getpid()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._buffer = ''
+        self.encoding = 'utf-8'
+
+    def attach(self, conn):
+        with self._lock: self._conn = conn; self._buffer = ''
+
+    def detach(self):
+        with self._lock:
+            self._send_locked(self._buffer); self._buffer = ''; self._conn = None
+
+    def _send_locked(self, text):
+        if not text: return
+        if self._conn is not None:
+            try: self._conn.send(('log', text)); return
+            except (OSError, EOFError, ValueError): self._conn = None # أغلقت الواجهة الاتصال: نكمل المهمة ونكتب محليًا
+        self._fallback.write(text); self._fallback.flush()
+
+    def write(self, text):
+        # عمليات ProcessPoolExecutor الفرعية ترث هذا الكائن: تكتب إلى مخرجها مباشرة ولا تلمس مقبس الأب
+        if os.getpid() != self._owner_pid: self._fallback.write(text); return len(text)
+        with self._lock:
+            self._buffer += text
+            if '\n' in self._buffer:
+                complete, self._buffer = self._buffer.rsplit('\n', 1)
+                self._send_locked(complete + '\n')
+        return len(text)
+
+    def flush(self):
+        if os.getpid() != self._owner_pid: self._fallback.flush()
+
+    def isatty(self):
+        return False
+
+class JobWorker:
+    def __init__(self, address, authkey):
+        self.address = address
+        self.authkey = authkey
+        self.output = None
+        self._job_lock = threading.Lock()
+        self.jobs_done = 0
+
+    def _run_script(self, request):
+        module = importlib.import_module(WORKER_SCRIPTS[request['script']])
+        if request.get('cwd'): os.chdir(request['cwd'])
+        argv = list(request.get('argv') or []); saved_argv = sys.argv
+        sys.argv = [request['script']] + argv # ليظهر اسم السكربت في رسائل argparse
+        try: return module.main(argv) or 0
+        except SystemExit as e: return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        finally: sys.argv = saved_argv
+
+    def handle(self, conn):
+        try:
+            request = conn.recv()
+            if request.get('type') == 'ping': conn.send(('pong', {'pid': os.getpid(), 'jobs_done': self.jobs_done})); return
+            script = request.get('script')
+            if script not in WORKER_SCRIPTS: conn.send(('exit', 2)); return
+            if self._job_lock.locked(): conn.send(('log', "... في انتظار انتهاء مهمة أخرى على العامل ...\n"))
+            with self._job_lock:
+                started = time.monotonic(); cwd = os.getcwd()
+                self.output.attach(conn)
+                try: code = self._run_script(request)
+                except Exception as e:
+                    print(f"!!! خطأ غير متوقع في العامل أثناء تشغيل {script}: {e} !!!"); code = 1
+                finally:
+                    flush_logging() # السجلات المؤجلة في طابور الكتابة تخص هذه المهمة: تُرسل قبل فصل اتصالها
+                    self.output.detach(); os.chdir(cwd); self.jobs_done += 1
+                sys.__stdout__.write(f"[worker] {script} finished with code {code} in {time.monotonic() - started:.2f}s\n")
+            conn.send(('exit', code))
+        except (EOFError, OSError): pass
+        finally: conn.close()
+
+    def serve_forever(self):
+        self.output = _JobOutput(sys.stdout)
+        sys.stdout = self.output
+        with Listener(self.address, authkey=self.authkey) as listener:
+            sys.__stdout__.write(f"[worker] listening on {self.address[0]}:{self.address[1]} (pid {os.getpid()})\n"); sys.__stdout__.flush()
+            while True:
+                try: conn = listener.accept()
+                except Exception as e: # مفتاح خاطئ أو اتصال مقطوع أثناء المصافحة
+                    sys.__stdout__.write(f"[worker] rejected connection: {e}\n"); continue
+                threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+def _connect(address, authkey):
+    try: return Client(address, authkey=authkey)
+    except Exception as e: raise WorkerUnavailableError(f"No job worker at {address[0]}:{address[1]}: {e}") from e
+
+def ping_worker(address=None, authkey=None):
+    """يعيد معلومات العامل (pid وعدد المهام المنفذة) أو None إذا لم يكن يعمل."""
+    try: conn = _connect(address or (DEFAULT_HOST, DEFAULT_PORT), authkey or get_authkey())
+    except WorkerUnavailableError: return None
+    with conn:
+        conn.send({'type': 'ping'}); return conn.recv()[1]
+
+def run_in_worker(script_path, argv, on_output, cwd=None, address=None, authkey=None):
+    """
+    يشغّل السكربت في العامل الدائم ويمرر كل جزء من السجل إلى on_output(text) فور وصوله، ويعيد رمز الخروج.
+    يرفع WorkerUnavailableError (قبل بدء المهمة) إذا لم يوجد عامل أو كان السكربت غير مدعوم.
+    """
+    script = normalize_script(script_path)
+    if script not in WORKER_SCRIPTS: raise WorkerUnavailableError(f"Script '{script_path}' is not served by the job worker.")
+    conn = _connect(address or (DEFAULT_HOST, DEFAULT_PORT), authkey or get_authkey())
+    with conn:
+        conn.send({'type': 'job', 'script': script, 'argv': list(argv), 'cwd': cwd or os.getcwd()})
+        while True:
+            try: kind, payload = conn.recv()
+            except (EOFError, OSError):
+                on_output("\n!!! انقطع الاتصال بالعامل قبل انتهاء المهمة !!!\n"); return 1
+            if kind == 'log': on_output(payload)
+            elif kind == 'exit': return payload
+
+def start_worker_process(port=None):
+    """يشغّل العامل كعملية مستقلة في الخلفية (تبقى بعد انتهاء العملية الحالية)."""
+    args = [sys.executable, os.path.abspath(__file__)]
+    if port: args += ['--port', str(port)]
+    env = os.environ.copy(); env['PYTHONIOENCODING'] = 'utf-8'
+    log_dir = os.path.join(project_root, 'logs'); os.makedirs(log_dir, exist_ok=True)
+    with open(os.path.join(log_dir, 'job_worker.log'), 'a', encoding='utf-8') as log_file:
+        popen_kwargs = {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP} if os.name == 'nt' else {'start_new_session': True}
+        return subprocess.Popen(args, stdout=log_file, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, cwd=project_root, env=env, **popen_kwargs).pid
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm job worker for the publish/clean scripts")
+    parser.add_argument("--host", type=str, default=DEFAULT_HOST, help="Interface to listen on (keep it local).")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="TCP port to listen on.")
+    args = parser.parse_args(argv)
+    try: JobWorker((args.host, args.port), get_authkey()).serve_forever()
+    except KeyboardInterrupt: pass
+    except OSError as e:
+        print(f"[worker] could not listen on {args.host}:{args.port}: {e}"); return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,13 @@
 # core/article_scraper.py
 import requests
 from bs4 import BeautifulSoup, NavigableString, Tag 
-from urllib.parse import urljoin, urlparse
-import cloudscraper
+from urllib.parse import urljoin
 import re
 import json
 from utils.logger_config import setup_logger
+from core.selector_stats import SelectorStatsStore
+from core.image_index import get_image_source, normalize_image_url
+from core import instrumentation
 
 logger = setup_logger(__name__)
 
@@ -17,23 +19,44 @@ class ArticleScraper:
         self.title_selectors = [s.strip() for s in config.get('Scraping', 'TitleSelector', fallback='h1').split(',')]
         self.content_selectors = [s.strip() for s in config.get('Scraping', 'ContentSelector', fallback='article').split(',')]
         self.content_exclude_selectors = [s.strip() for s in config.get('Scraping', 'ContentExcludeSelectors', fallback='').split(',') if s.strip()]
+        # ترتيب المحددات تكيفيًا لكل موقع بناءً على إحصائيات النجاح السابقة
+        self.adaptive_selectors = config.getboolean('Scraping', 'AdaptiveSelectorOrder', fallback=True)
+        self.selector_stats = SelectorStatsStore(config.get('Paths', 'SelectorStatsFile', fallback='selector_stats.json') if self.adaptive_selectors else None)
+        self.transport_name = 'cloudscraper'
         try:
+            import cloudscraper # استيراد كسول لتقليل زمن بدء التشغيل
             self.scraper = cloudscraper.create_scraper(browser={'custom': self.default_user_agent}, delay=5)
-            logger.info(f"ArticleScraper initialized with CloudScraper UA: {self.default_user_agent}")
+            logger.info("ArticleScraper initialized with CloudScraper UA: %s", self.default_user_agent)
         except Exception as e:
-            logger.error(f"Failed to init cloudscraper: {e}. Fallback to requests.")
+            logger.error("Failed to init cloudscraper: %s. Fallback to requests.", e)
             self.scraper = requests.Session(); self.scraper.headers.update({'User-Agent': self.default_user_agent})
+            self.transport_name = 'requests'
 
     def _select_first_found(self, soup, selectors, purpose="element", article_url_for_log=""):
-        for idx, selector in enumerate(selectors):
+        domain = self.selector_stats.domain_of(article_url_for_log) if self.adaptive_selectors else ""
+        ordered_selectors = self.selector_stats.ordered(domain, purpose, selectors) if domain else selectors
+        tried = []
+        for idx, selector in enumerate(ordered_selectors):
+            tried.append(selector)
             try:
                 element = soup.select_one(selector)
-                if element: logger.info(f"SUCCESS: Found {purpose} for '{article_url_for_log}' using selector #{idx+1}: '{selector}'."); return element
-                else: logger.debug(f"ATTEMPT: Selector #{idx+1} '{selector}' for {purpose} did NOT match on '{article_url_for_log}'.")
-            except Exception as e: logger.error(f"Error with selector #{idx+1} '{selector}' for {purpose} on '{article_url_for_log}': {e}"); continue
-        logger.warning(f"FAILURE: Could not find {purpose} for '{article_url_for_log}' using: {selectors}")
+                if element:
+                    logger.info("SUCCESS: Found %s for '%s' using selector #%s: '%s'.", purpose, article_url_for_log, idx+1, selector)
+                    if domain: self.selector_stats.record(domain, purpose, tried, winner=selector)
+                    return element
+                else: logger.debug("ATTEMPT: Selector #%s '%s' for %s did NOT match on '%s'.", idx+1, selector, purpose, article_url_for_log)
+            except Exception as e: logger.error("Error with selector #%s '%s' for %s on '%s': %s", idx+1, selector, purpose, article_url_for_log, e); continue
+        if domain: self.selector_stats.record(domain, purpose, tried)
+        logger.warning("FAILURE: Could not find %s for '%s' using: %s", purpose, article_url_for_log, selectors)
         return None
 
+    def get_selector_hit_rates(self, domain=None):
+        """إحصائيات نسب نجاح المحددات لكل موقع (للمراقبة والتقارير)."""
+        return self.selector_stats.hit_rates(domain)
+
+    def save_selector_stats(self):
+        self.selector_stats.save()
+
     def _remove_site_specific_junk(self, content_element, article_url):
         if not content_element: return content_element
         
@@ -45,7 +68,7 @@ class ArticleScraper:
 
         if not site_key_to_clean: return content_element # لا توجد قواعد تنظيف معرفة لهذا الموقع
 
-        logger.debug(f"Applying specific text cleaning rules for {site_key_to_clean} on {article_url}")
+        logger.debug("Applying specific text cleaning rules for %s on %s", site_key_to_clean, article_url)
         
         # تعريف القواعد داخل الدالة أو تحميلها من ملف تكوين أكثر تقدمًا إذا لزم الأمر
         site_rules = {
@@ -93,7 +116,7 @@ class ArticleScraper:
                     if pattern.fullmatch(tag_text_stripped) or \
                        (length_tol >= 0 and pattern.search(tag_text_stripped) and \
                         len(tag_text_stripped) < (core_pattern_len + length_tol + 30)): # Heuristic length check
-                        logger.debug(f"Decomposing tag <{tag.name}> (text: '{tag_text_stripped[:70]}...') matching pattern '{pattern.pattern}' for {site_key_to_clean}.")
+                        logger.debug("Decomposing tag <%s> (text: '%s...') matching pattern '%s' for %s.", tag.name, tag_text_stripped[:70], pattern.pattern, site_key_to_clean)
                         tag.decompose()
                         break 
                 else: # إذا لم يتم إزالة الوسم في الحلقة الداخلية، استمر للحلقة الخارجية
@@ -122,72 +145,77 @@ class ArticleScraper:
                            not parent.get_text(strip=True).replace(original_text,"").strip() and \
                            not parent.find(['img','br','hr','iframe','table','ul','ol','dl']) and \
                            parent.name != 'body':
-                            logger.debug(f"Decomposing parent <{parent.name}> as it became empty after inline text removal.")
+                            logger.debug("Decomposing parent <%s> as it became empty after inline text removal.", parent.name)
                             parent.decompose()
                         elif parent and parent.name != 'body':
-                            logger.debug(f"Extracting empty NavigableString node (original: '{original_text[:50]}...').")
+                            logger.debug("Extracting empty NavigableString node (original: '%s...').", original_text[:50])
                             text_node.extract()
                     else:
-                        logger.debug(f"Cleaned text node (inline removal): '{original_text[:50]}...' -> '{modified_text[:50]}...'")
+                        logger.debug("Cleaned text node (inline removal): '%s...' -> '%s...'", original_text[:50], modified_text[:50])
                         text_node.replace_with(modified_text)
         return content_element
 
     def scrape_article_details(self, article_url):
         try:
-            is_cs = isinstance(self.scraper, cloudscraper.CloudScraper)
-            logger.info(f"Scraping {article_url} (via {'cloudscraper' if is_cs else 'requests'})")
-            response = self.scraper.get(article_url, timeout=self.request_timeout)
-            logger.debug(f"Resp for {article_url}: {response.status_code}, CT {response.headers.get('Content-Type')}")
-            if response.status_code == 403: logger.error(f"403 Forbidden for {article_url}."); return None
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-
-            title_el = self._select_first_found(soup, self.title_selectors, "title", article_url)
-            title = title_el.get_text(strip=True) if title_el else ""
-            if not title.strip():
-                logger.warning(f"Title empty for {article_url} via selectors. Fallbacks...")
-                og_title = soup.find('meta', property='og:title'); json_ld_title = None
-                for script_tag in soup.find_all('script',type='application/ld+json'):
-                    try:
-                        if script_tag.string: data = json.loads(script_tag.string); data = data[0] if isinstance(data, list) else data
-                        if isinstance(data, dict) and data.get('@type') in ['NewsArticle','Article','BlogPosting'] and data.get('headline'): json_ld_title = data['headline']; break
-                    except: continue
-                if json_ld_title: title = json_ld_title.strip(); logger.info(f"Using JSON-LD title: '{title}'")
-                elif og_title and og_title.get('content'): title = og_title['content'].strip(); logger.info(f"Using OG title: '{title}'")
-                else: logger.error(f"No title found (selectors/JSON-LD/OG) for {article_url}. Skipping."); return None
-            
-            content_container = self._select_first_found(soup, self.content_selectors, "content container", article_url)
-            raw_html = ""; images_in_content = []
-            if content_container:
-                self._remove_site_specific_junk(content_container, article_url) # <--- تطبيق التنظيف
-                if self.content_exclude_selectors: # تطبيق التنظيف العام
-                    for ex_sel in self.content_exclude_selectors:
-                        for unwanted in content_container.select(ex_sel): unwanted.decompose()
-                for img_tag in content_container.find_all('img'):
-                    src = img_tag.get('src') or img_tag.get('data-src'); alt = img_tag.get('alt', title)
-                    if src:
-                        full_url = urljoin(article_url, urlparse(src)._replace(query='').geturl())
-                        if full_url.startswith('http') and not full_url.startswith('data:image'):
-                            images_in_content.append({"original_tag_src": src, "full_url": full_url, "alt_text": alt})
-                raw_html = str(content_container)
-            else: raw_html = f"<p><i>[Content for '{title}' could not be extracted. Source: {article_url}]</i></p>"
-
-            main_img_url = None
-            for script_tag in soup.find_all('script', type='application/ld+json'):
+            logger.info("Scraping %s (via %s)", article_url, self.transport_name)
+            with instrumentation.stage('scrape'):
+                response = self.scraper.get(article_url, timeout=self.request_timeout)
+                logger.debug("Resp for %s: %s, CT %s", article_url, response.status_code, response.headers.get('Content-Type'))
+                if response.status_code == 403: logger.error("403 Forbidden for %s.", article_url); return None
+                response.raise_for_status(); page_content = response.content
+            instrumentation.count('page_bytes_downloaded', len(page_content))
+            with instrumentation.stage('parse'): return self._parse_article(page_content, article_url)
+        except Exception as e: logger.error("Major error in scrape_article_details for %s: %s", article_url, e, exc_info=True); return None
+
+    def _parse_article(self, page_content, article_url):
+        soup = BeautifulSoup(page_content, 'html.parser')
+
+        title_el = self._select_first_found(soup, self.title_selectors, "title", article_url)
+        title = title_el.get_text(strip=True) if title_el else ""
+        if not title.strip():
+            logger.warning("Title empty for %s via selectors. Fallbacks...", article_url)
+            og_title = soup.find('meta', property='og:title'); json_ld_title = None
+            for script_tag in soup.find_all('script',type='application/ld+json'):
                 try:
-                    if script_tag.string: data = json.loads(script_tag.string); data = data[0] if isinstance(data,list) else data
-                    if isinstance(data,dict) and data.get('@type') in ['NewsArticle','Article','BlogPosting']:
-                        img_obj = data.get('image'); img_obj = img_obj[0] if isinstance(img_obj,list) and img_obj else img_obj
-                        if isinstance(img_obj,dict) and img_obj.get('url'): main_img_url = urljoin(article_url, img_obj['url'])
-                        elif isinstance(img_obj,str) and img_obj.strip(): main_img_url = urljoin(article_url, img_obj.strip())
-                        if main_img_url: logger.info(f"Found main image via JSON-LD: {main_img_url}"); break
+                    if script_tag.string: data = json.loads(script_tag.string); data = data[0] if isinstance(data, list) else data
+                    if isinstance(data, dict) and data.get('@type') in ['NewsArticle','Article','BlogPosting'] and data.get('headline'): json_ld_title = data['headline']; break
                 except: continue
-            if not main_img_url: og_img = soup.find('meta', property='og:image')
-            if not main_img_url and og_img and og_img.get('content'): og_c = og_img['content'].strip(); main_img_url=urljoin(article_url,og_c) if og_c else None; logger.info(f"Found OG image: {main_img_url}")
-            if not main_img_url: tw_img = soup.find('meta', attrs={'name':['twitter:image','twitter:image:src']})
-            if not main_img_url and tw_img and tw_img.get('content'): tw_c = tw_img['content'].strip(); main_img_url=urljoin(article_url,tw_c) if tw_c else None; logger.info(f"Found Twitter image: {main_img_url}")
-            if not main_img_url and images_in_content and images_in_content[0].get('full_url'): main_img_url = images_in_content[0]['full_url']; logger.info(f"Using first content image as main: {main_img_url}")
-            if not main_img_url: logger.warning(f"No main feature image determined for {article_url}")
-            
-            return {"source_url": article_url, "title": title, "raw_html_content": raw_html, "main_feature_image_original_url": main_img_url, "images_in_content_details": images_in_content}
-        except Exception as e: logger.error(f"Major error in scrape_article_details for {article_url}: {e}", exc_info=True); return None
\ No newline at end of file
+            if json_ld_title: title = json_ld_title.strip(); logger.info("Using JSON-LD title: '%s'", title)
+            elif og_title and og_title.get('content'): title = og_title['content'].strip(); logger.info("Using OG title: '%s'", title)
+            else: logger.error("No title found (selectors/JSON-LD/OG) for %s. Skipping.", article_url); return None
+        
+        content_container = self._select_first_found(soup, self.content_selectors, "content container", article_url)
+        raw_html = ""; images_in_content = []
+        if content_container:
+            self._remove_site_specific_junk(content_container, article_url) # <--- تطبيق التنظيف
+            if self.content_exclude_selectors: # تطبيق التنظيف العام
+                for ex_sel in self.content_exclude_selectors:
+                    for unwanted in content_container.select(ex_sel): unwanted.decompose()
+            for img_tag in content_container.find_all('img'):
+                # src الفعلي بعد حل سمات التحميل الكسول و srcset (نفس المنطق المستخدم في ContentFormatter)
+                src = get_image_source(img_tag); alt = img_tag.get('alt', title)
+                if src:
+                    full_url = normalize_image_url(src, article_url)
+                    if full_url and full_url.startswith('http'):
+                        images_in_content.append({"original_tag_src": src, "full_url": full_url, "alt_text": alt})
+            raw_html = str(content_container)
+        else: raw_html = f"<p><i>[Content for '{title}' could not be extracted. Source: {article_url}]</i></p>"
+
+        main_img_url = None
+        for script_tag in soup.find_all('script', type='application/ld+json'):
+            try:
+                if script_tag.string: data = json.loads(script_tag.string); data = data[0] if isinstance(data,list) else data
+                if isinstance(data,dict) and data.get('@type') in ['NewsArticle','Article','BlogPosting']:
+                    img_obj = data.get('image'); img_obj = img_obj[0] if isinstance(img_obj,list) and img_obj else img_obj
+                    if isinstance(img_obj,dict) and img_obj.get('url'): main_img_url = urljoin(article_url, img_obj['url'])
+                    elif isinstance(img_obj,str) and img_obj.strip(): main_img_url = urljoin(article_url, img_obj.strip())
+                    if main_img_url: logger.info("Found main image via JSON-LD: %s", main_img_url); break
+            except: continue
+        if not main_img_url: og_img = soup.find('meta', property='og:image')
+        if not main_img_url and og_img and og_img.get('content'): og_c = og_img['content'].strip(); main_img_url=urljoin(article_url,og_c) if og_c else None; logger.info("Found OG image: %s", main_img_url)
+        if not main_img_url: tw_img = soup.find('meta', attrs={'name':['twitter:image','twitter:image:src']})
+        if not main_img_url and tw_img and tw_img.get('content'): tw_c = tw_img['content'].strip(); main_img_url=urljoin(article_url,tw_c) if tw_c else None; logger.info("Found Twitter image: %s", main_img_url)
+        if not main_img_url and images_in_content and images_in_content[0].get('full_url'): main_img_url = images_in_content[0]['full_url']; logger.info("Using first content image as main: %s", main_img_url)
+        if not main_img_url: logger.warning("No main feature image determined for %s", article_url)
+        
+        return {"source_url": article_url, "title": title, "raw_html_content": raw_html, "main_feature_image_original_url": main_img_url, "images_in_content_details": images_in_content}
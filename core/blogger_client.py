@@ -1,14 +1,11 @@
 # core/blogger_client.py
 
 import os.path
-from googleapiclient.discovery import build
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
 from utils.logger_config import setup_logger
+from core import instrumentation
+from core.google_auth import SCOPES, load_credentials, build_service_from_cache, credentials_fresh
 
 logger = setup_logger(__name__)
-SCOPES = ['https://www.googleapis.com/auth/blogger']
 
 class BloggerClient:
     """
@@ -16,16 +13,23 @@ class BloggerClient:
     """
     # ✅ --- التعديل الرئيسي هنا: تغيير دالة __init__ ---
     # تم تغيير الدالة لتقبل creds_path كوسيط إلزامي.
-    def __init__(self, config, creds_path):
+    def __init__(self, config, creds_path, blog_id=None):
         self.config = config
         
         # ✅ يتم الآن بناء مسارات المصادقة ديناميكيًا بناءً على المستخدم
         # بدلاً من قراءتها بشكل ثابت من ملف config.ini.
+        self.creds_path = creds_path
         self.credentials_file = os.path.join(creds_path, 'client_secret.json')
         self.token_file = os.path.join(creds_path, 'token.json')
+        # تحديث الرمز قبل انتهاء صلاحيته بهذه المدة فقط، ومجلد حفظ وثيقة الاكتشاف
+        self.token_refresh_margin_sec = self.config.getint('BloggerAPI', 'TokenRefreshMarginSec', fallback=300)
+        self.discovery_cache_dir = self.config.get('Paths', 'DiscoveryCacheDir', fallback='discovery_cache')
+        # (اختياري) عنوان بديل لـ Blogger API، مثل الخدمات المحلية الوهمية في benchmarks/fake_services.py
+        self.api_endpoint = self.config.get('BloggerAPI', 'ApiEndpoint', fallback='').strip() or None
         
         # إعدادات المدونة العامة تبقى كما هي من ملف config.ini
-        blog_id_raw = self.config.get('BloggerAPI', 'BlogID', fallback=None)
+        # blog_id يتجاوز BlogID من config.ini (النشر لعدة مدونات من عملية واحدة)
+        blog_id_raw = str(blog_id) if blog_id else self.config.get('BloggerAPI', 'BlogID', fallback=None)
         if not blog_id_raw:
             msg = "BlogID is not configured in config.ini under [BloggerAPI]."
             logger.critical(msg)
@@ -38,64 +42,63 @@ class BloggerClient:
             raise ValueError(msg)
         logger.info(f"Using BlogID: {self.blog_id} for Blogger operations.")
             
+        self.credentials = None
         self.service = self._get_blogger_service()
 
+    def ensure_service(self):
+        """
+        للعميل طويل العمر (العامل الدائم): يعيد بناء الخدمة فقط إذا اقتربت صلاحية الرمز من الانتهاء.
+        """
+        if not self.service or not credentials_fresh(self.credentials, self.token_refresh_margin_sec):
+            self.service = self._get_blogger_service()
+        return self.service
+
     def _get_blogger_service(self):
         """
         يقوم بإنشاء أو تحديث المصادقة باستخدام المسارات الديناميكية.
+        الرمز يُحدَّث فقط قرب انتهاء صلاحيته (وتحت قفل ملف)، ووثيقة الاكتشاف تُقرأ من الذاكرة المؤقتة دون طلب شبكي.
         """
-        creds = None
-        if os.path.exists(self.token_file):
-            try:
-                creds = Credentials.from_authorized_user_file(self.token_file, SCOPES)
-            except Exception as e:
-                logger.warning(f"Error loading token from {self.token_file}: {e}. Re-authenticating.")
-                creds = None
+        try:
+            creds = load_credentials(self.creds_path, SCOPES, refresh_margin_sec=self.token_refresh_margin_sec)
+        except FileNotFoundError as e:
+            logger.critical(str(e))
+            raise
+        except TimeoutError as e:
+            # عملية أخرى تحتفظ بقفل token.json (تحديث عالق أو بطيء): نفشل بوضوح وتعيد الدورة التالية المحاولة
+            logger.critical(f"Timed out waiting for the token lock in {self.creds_path}: {e}")
+            return None
 
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                try:
-                    logger.info("Credentials expired. Refreshing token...")
-                    creds.refresh(Request())
-                    logger.info("Token refreshed successfully.")
-                except Exception as e:
-                    logger.error(f"Failed to refresh token: {e}. Removing invalid token and re-authenticating.")
-                    try: 
-                        os.remove(self.token_file)
-                    except OSError as ose:
-                        logger.warning(f"Could not remove invalid token file {self.token_file}: {ose}")
-                    creds = None
-            
-            # إذا لم نتمكن من تحديث الرمز، أو لم يكن موجودًا من الأساس
-            if not creds:
-                logger.info(f"Starting new authentication flow using {self.credentials_file}.")
-                if not os.path.exists(self.credentials_file):
-                    msg = f"Client secrets file '{self.credentials_file}' not found."
-                    logger.critical(msg)
-                    raise FileNotFoundError(msg)
-                
-                flow = InstalledAppFlow.from_client_secrets_file(self.credentials_file, SCOPES)
-                creds = flow.run_local_server(port=0, open_browser=True)
-            
-            try:
-                with open(self.token_file, 'w') as token:
-                    token.write(creds.to_json())
-                logger.info(f"Credentials saved to {self.token_file}")
-            except Exception as e:
-                logger.error(f"Error saving token to {self.token_file}: {e}")
-        
         if not creds:
             logger.critical("Failed to obtain valid credentials for Blogger API.")
             return None
+        self.credentials = creds
 
         try:
-            service = build('blogger', 'v3', credentials=creds, cache_discovery=False)
+            client_options = {'api_endpoint': self.api_endpoint} if self.api_endpoint else None
+            service = build_service_from_cache(creds, 'blogger', 'v3', cache_dir=self.discovery_cache_dir, client_options=client_options)
             logger.info("Blogger service client initialized successfully.")
             return service
         except Exception as e:
             logger.critical(f"Failed to build Blogger service: {e}", exc_info=True)
             return None
 
+    def iter_posts(self, fetch_bodies=True, fields='items(title,content),nextPageToken', page_size=100, max_posts=None):
+        """
+        مولّد لتدوينات المدونة المنشورة صفحة بصفحة (مثلاً لبناء فهرس الكلمات المفتاحية من الأرشيف).
+        """
+        if not self.service: return
+        page_token = None; returned = 0
+        while True:
+            response = self.service.posts().list(blogId=self.blog_id, maxResults=page_size, pageToken=page_token,
+                                                 fetchBodies=fetch_bodies, status='LIVE', fields=fields).execute()
+            for post in response.get('items', []):
+                yield post
+                returned += 1
+                if max_posts and returned >= max_posts: return
+            page_token = response.get('nextPageToken')
+            if not page_token: return
+
+    @instrumentation.timed('publish')
     def create_post(self, title, content_html, labels=None, is_draft=False):
         """
         إنشاء تدوينة جديدة في المدونة المحددة.
@@ -0,0 +1,94 @@
+# core/clean_state.py
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+def content_fingerprint(title, content):
+    """بصمة (العنوان + المحتوى) كما هما على الخادم."""
+    return hashlib.sha256(f"{title or ''}\x00{content or ''}".encode('utf-8')).hexdigest()
+
+def rules_fingerprint(rules, version=""):
+    """بصمة قواعد التنظيف (+ إصدار منطق التنظيف نفسه) حتى يُعاد تنظيف كل المقالات عند تغيّر أيٍّ منهما."""
+    payload = json.dumps(rules or {}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(f"{version}\x00{payload}".encode('utf-8')).hexdigest()
+
+class CleanStateStore:
+    """
+    حالة آخر تنظيف لكل مقال: (المدونة، المقال) ← (updated، بصمة المحتوى، بصمة القواعد).
+    المقال لا يحتاج إعادة تنظيف إذا لم يتغير updated ولا القواعد منذ آخر مرة.
+    """
+    def __init__(self, db_path=None):
+        self.db_path = db_path or ':memory:'
+        self._lock = threading.Lock()
+        if self.db_path != ':memory:':
+            db_dir = os.path.dirname(self.db_path)
+            if db_dir: os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS clean_state (
+                blog_id TEXT NOT NULL, post_id TEXT NOT NULL, updated TEXT, content_hash TEXT,
+                rules_hash TEXT, cleaned_at REAL NOT NULL, PRIMARY KEY (blog_id, post_id))""")
+            # نقطة استئناف التنظيف الشامل (backfill): آخر صفحة اكتملت لكل مدونة
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS backfill_checkpoint (
+                blog_id TEXT PRIMARY KEY, rules_hash TEXT NOT NULL, page_token TEXT, pages_done INTEGER NOT NULL,
+                posts_seen INTEGER NOT NULL, updated_at REAL NOT NULL)""")
+
+    def get(self, blog_id, post_id):
+        with self._lock:
+            row = self._conn.execute("SELECT updated, content_hash, rules_hash FROM clean_state WHERE blog_id = ? AND post_id = ?",
+                                     (str(blog_id), str(post_id))).fetchone()
+        return {'updated': row[0], 'content_hash': row[1], 'rules_hash': row[2]} if row else None
+
+    def get_many(self, blog_id, post_ids):
+        post_ids = [str(pid) for pid in post_ids]; states = {}
+        with self._lock:
+            for start in range(0, len(post_ids), 500):
+                chunk = post_ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT post_id, updated, content_hash, rules_hash FROM clean_state WHERE blog_id = ? AND post_id IN ({','.join('?' * len(chunk))})",
+                    [str(blog_id)] + chunk).fetchall()
+                for post_id, updated, content_hash, rules_hash in rows:
+                    states[post_id] = {'updated': updated, 'content_hash': content_hash, 'rules_hash': rules_hash}
+        return states
+
+    def needs_cleaning(self, state, updated, rules_hash):
+        """state: ناتج get/get_many لهذا المقال (أو None إذا لم يُنظف من قبل)."""
+        return state is None or state['rules_hash'] != rules_hash or state['updated'] != updated
+
+    def record_many(self, blog_id, entries, rules_hash):
+        """entries: قائمة من (post_id, updated, content_hash)."""
+        now = time.time()
+        rows = [(str(blog_id), str(post_id), updated, content_hash, rules_hash, now) for post_id, updated, content_hash in entries]
+        if not rows: return
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO clean_state (blog_id, post_id, updated, content_hash, rules_hash, cleaned_at) VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def record(self, blog_id, post_id, updated, content_hash, rules_hash):
+        self.record_many(blog_id, [(post_id, updated, content_hash)], rules_hash)
+
+    def get_checkpoint(self, blog_id, rules_hash):
+        """يعيد نقطة الاستئناف إذا كانت لنفس القواعد، وإلا None (تغيّر القواعد = بداية جديدة)."""
+        with self._lock:
+            row = self._conn.execute("SELECT rules_hash, page_token, pages_done, posts_seen FROM backfill_checkpoint WHERE blog_id = ?", (str(blog_id),)).fetchone()
+        if not row or row[0] != rules_hash: return None
+        return {'page_token': row[1], 'pages_done': row[2], 'posts_seen': row[3]}
+
+    def save_checkpoint(self, blog_id, rules_hash, page_token, pages_done, posts_seen):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO backfill_checkpoint (blog_id, rules_hash, page_token, pages_done, posts_seen, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                                   (str(blog_id), rules_hash, page_token, pages_done, posts_seen, time.time()))
+
+    def clear_checkpoint(self, blog_id):
+        with self._lock:
+            with self._conn: self._conn.execute("DELETE FROM backfill_checkpoint WHERE blog_id = ?", (str(blog_id),))
+
+    def close(self):
+        with self._lock: self._conn.close()
@@ -1,14 +1,31 @@
 # core/content_formatter.py
 from bs4 import BeautifulSoup, Comment, Tag, NavigableString
 from utils.logger_config import setup_logger
+from core.rule_engine import compile_rules_from_dict
+from core.image_index import ImageIndex
+from core import instrumentation
+from core.embed_providers import get_embed_scanner, get_embed_providers
 import re 
 import json
 import os
 import sys
-from io import StringIO
 
 logger = setup_logger(__name__)
 
+# وسوم تُحذف بالكامل مع محتواها
+UNWANTED_TAGS = frozenset(['script','style','form','link','meta','noscript','embed','object','applet','header','footer','nav','aside','figure','figcaption','title'])
+# الوسوم المسموح بها وسماتها؛ أي وسم آخر يُفك (unwrap) مع الإبقاء على محتواه
+ALLOWED_TAGS_ATTRS = {
+    'a':['title','name','href','target','rel'],'img':['src','alt','title','style','width','height','border'], 'p':[],'br':[],'hr':[],'strong':[],'b':[],'em':[],'i':[],'u':[],'s':[],'strike':[],'del':[],
+    'sup':[],'sub':[],'code':[],'pre':[],'ul':['type'],'ol':['type','start','reversed'],'li':['value'], 'h1':[],'h2':[],'h3':[],'h4':[],'h5':[],'h6':[],
+    'blockquote':['style','cite','class','data-dnt','data-theme','data-align'], 'q':['cite'], 'iframe':['src','width','height','frameborder','allowfullscreen','style','title','allow'],
+    'table':['border','cellpadding','cellspacing','width','style','summary'],'div':['style']
+}
+ALLOWED_TAGS_ATTRS = {tag: frozenset(attrs) for tag, attrs in ALLOWED_TAGS_ATTRS.items()}
+HEADING_TAGS = frozenset(['h1','h2','h3','h4','h5','h6'])
+EMPTY_P_KEEPERS = ['img','br','hr','iframe','blockquote']
+IMG_STYLE = "max-width:100%;height:auto;display:block;margin:10px auto;border:0;"
+
 class ContentFormatter:
     # ✅ 1. تم تعديل __init__ ليتوقف عن الاعتماد على ملف ثابت
     def __init__(self, config, config_filepath=None):
@@ -18,45 +35,93 @@ class ContentFormatter:
         self.extra_br_after_p = self.config.getboolean('ContentFormatting', 'ExtraBreakAfterParagraph', fallback=False)
         self.remove_internal_links = self.config.getboolean('ContentFormatting', 'RemoveInternalLinks', fallback=True)
         # لم نعد نحمل أي قواعد ثابتة هنا
-        self.twitter_pattern = re.compile(r"(https?://(?:www\.)?(?:twitter\.com|x\.com)/(\w+)/status/(\d+))(?:\?[^\s]*)?", re.I)
-        self.youtube_pattern_watch = re.compile(r"https?://(?:www\.)?youtube\.com/watch\?v=([\w-]+)(?:&[^\s]*)?", re.I)
-        self.youtube_pattern_short = re.compile(r"https?://youtu\.be/([\w-]+)(?:\?[^\s]*)?", re.I)
+        # مزودو التضمين (YouTube, X/Twitter, Instagram, Facebook, TikTok) يأتون من سجل core.embed_providers
+        self.embed_scanner = get_embed_scanner()
+        self.allowed_tags_attrs = dict(ALLOWED_TAGS_ATTRS)
+        for provider in get_embed_providers():
+            for tag_name, attrs in provider.allowed_attrs.items():
+                self.allowed_tags_attrs[tag_name] = self.allowed_tags_attrs.get(tag_name, frozenset()) | frozenset(attrs)
 
     def _handle_embeds(self, soup):
-        # (الكود الكامل لهذه الدالة)
-        nodes_to_process = [tn for tn in soup.find_all(string=True) if isinstance(tn, NavigableString) and tn.parent and tn.parent.name not in ['script','style','a','pre','code','textarea','title']]
-        for tn in nodes_to_process:
-            orig_txt_content = str(tn); modified = False
-            temp_io = StringIO(); last_end = 0
-            all_matches = []
-            for p_type, pattern in [("yt_watch", self.youtube_pattern_watch), ("yt_short", self.youtube_pattern_short), ("twitter", self.twitter_pattern)]:
-                for m in pattern.finditer(orig_txt_content): all_matches.append({'start':m.start(),'end':m.end(),'match':m,'type':p_type})
-            all_matches.sort(key=lambda x: x['start'])
-            if not all_matches: continue
-            for item in all_matches:
-                m_start, m_end, match, p_type = item['start'], item['end'], item['match'], item['type']
-                if m_start < last_end: continue
-                if m_start > last_end: temp_io.write(orig_txt_content[last_end:m_start])
-                embed_html = ""
-                if p_type in ["yt_watch", "yt_short"]:
-                    vid = match.group(1)
-                    embed_html = (f'<div style="position:relative;padding-bottom:56.25%;padding-top:30px;height:0;overflow:hidden;max-width:100%;margin:10px 0;"><iframe style="position:absolute;top:0;left:0;width:100%;height:100%;" src="https://www.youtube.com/embed/{vid}" title="YouTube video player" frameborder="0" allow="accelerometer;autoplay;clipboard-write;encrypted-media;gyroscope;picture-in-picture" allowfullscreen></iframe></div>')
-                elif p_type == "twitter":
-                    url, handle, tweet_id = match.group(1), match.group(2), match.group(3)
-                    embed_html = (f'<blockquote class="twitter-tweet" data-dnt="true" data-theme="light" data-align="center"><p lang="und" dir="auto"> </p>— @{handle} <a href="{url}" target="_blank" rel="noopener noreferrer ugc">Loading Tweet ({tweet_id})...</a></blockquote>')
-                if embed_html: temp_io.write(embed_html); modified = True
-                last_end = m_end
-            if last_end < len(orig_txt_content): temp_io.write(orig_txt_content[last_end:])
-            if modified:
-                new_soup_frag = BeautifulSoup(temp_io.getvalue(), 'html.parser')
-                new_elements = list(new_soup_frag.body.children) if new_soup_frag.body else list(new_soup_frag.children)
-                current_insertion = tn
-                for new_el in reversed(new_elements): current_insertion.insert_after(new_el)
-                tn.extract()
-            temp_io.close()
+        """
+        يستبدل روابط الفيديو والتغريدات والمنشورات في النصوص بعقد تضمين، في مسح واحد لكل عقدة نصية.
+        العقد التي لا تحتوي أيًا من النصوص المميزة للمزودين (needles) تُتجاهل دون تشغيل التعبير المنتظم،
+        وعقد التضمين تُبنى مباشرة دون إعادة تحليل HTML.
+        """
+        scanner = self.embed_scanner
+        for tn in soup.find_all(string=True):
+            if type(tn) is not NavigableString or not tn.parent or tn.parent.name in ['script','style','a','pre','code','textarea','title']: continue
+            orig_txt_content = str(tn)
+            if not scanner.may_contain_embed(orig_txt_content): continue
+            pieces = scanner.split(soup, orig_txt_content)
+            if pieces: tn.replace_with(*pieces)
+
+    def _is_embed_container(self, tag):
+        if tag.name == 'blockquote': return not self.embed_scanner.blockquote_classes.isdisjoint(tag.get('class') or [])
+        if tag.name == 'iframe':
+            iframe_src = tag.get('src', '')
+            return bool(re.search("youtube.com/embed", iframe_src)) or self.embed_scanner.is_embed_iframe_src(iframe_src)
+        return False
+
+    def _normalize_tree(self, soup, image_index, article_title_for_alt):
+        """
+        المرور الأول (pre-order): حذف الوسوم غير المرغوبة والتعليقات والإطارات غير المدعومة،
+        إزالة الروابط الداخلية، استبدال الصور بروابطها المستضافة وتطبيق قائمة السمات المسموح بها.
+        فك الوسوم غير المسموح بها يؤجل إلى نهاية المرور حتى لا تتغير بنية الشجرة أثناء التجوال.
+        يعيد رابط أول صورة في المحتوى (إن كانت مستضافة).
+        """
+        first_img_src_in_content = None; img_idx = 0; to_unwrap = []
+        stack = [(child, False) for child in reversed(soup.contents)]
+        while stack:
+            node, in_embed = stack.pop()
+            if isinstance(node, Comment): node.extract(); continue
+            if not isinstance(node, Tag): continue
+            name = node.name
+            if name in UNWANTED_TAGS: node.decompose(); continue
+            if name == 'iframe':
+                iframe_src = node.get('src','').lower()
+                if not ('youtube.com/embed' in iframe_src or 'youtu.be/' in iframe_src or self.embed_scanner.is_embed_iframe_src(node.get('src',''))): node.decompose(); continue
+            elif name == 'a':
+                if self.remove_internal_links and not in_embed and node.has_attr('href'): del node['href']
+            elif name == 'img':
+                hosted_url = image_index.resolve_tag(node)
+                if not hosted_url:
+                    orig_s = node.get('src') or node.get('data-src')
+                    logger.warning("Image '%s' not in map. Decomposing.", orig_s); node.decompose(); img_idx += 1; continue
+                node.attrs = {'src': hosted_url, 'alt': (article_title_for_alt or "Image").strip() or (article_title_for_alt or "Image"), 'style': IMG_STYLE}
+                if img_idx == 0: first_img_src_in_content = hosted_url
+                img_idx += 1
+            allowed_attrs = self.allowed_tags_attrs.get(name)
+            if allowed_attrs is None: to_unwrap.append(node)
+            else:
+                for attr in [a for a in node.attrs if a.lower() not in allowed_attrs]: del node[attr]
+            child_in_embed = in_embed or self._is_embed_container(node)
+            stack.extend((child, child_in_embed) for child in reversed(node.contents))
+        for tag in to_unwrap: tag.unwrap()
+        return first_img_src_in_content
+
+    def _prune_empty_blocks(self, soup):
+        """
+        المرور الثاني: حذف الفقرات والعناوين الفارغة، إضافة <br> بعد الفقرات (اختياري) وتحويل h1 إلى h2.
+        """
+        stack = [child for child in reversed(soup.contents) if isinstance(child, Tag)]
+        while stack:
+            tag = stack.pop()
+            if tag.name == 'p':
+                if not tag.get_text(strip=True) and not tag.find(EMPTY_P_KEEPERS): tag.decompose(); continue
+                elif self.extra_br_after_p and tag.next_sibling and tag.next_sibling.name!='br': tag.append(soup.new_tag('br'))
+            elif tag.name in HEADING_TAGS:
+                if not tag.get_text(strip=True): tag.decompose(); continue
+                elif tag.name == 'h1': tag.name = 'h2'
+            stack.extend(child for child in reversed(tag.contents) if isinstance(child, Tag))
 
     # ✅ 2. تم تعديل format_for_blogger لتقبل واستخدام القواعد الديناميكية
-    def format_for_blogger(self, raw_html_content, processed_images_map, main_hosted_image_url_for_prepend=None, article_title_for_alt="", dynamic_rules=None):
+    @instrumentation.timed('format')
+    def format_for_blogger(self, raw_html_content, processed_images_map, main_hosted_image_url_for_prepend=None, article_title_for_alt="", dynamic_rules=None, source_url=None):
+        """
+        processed_images_map: إما ImageIndex مبني مسبقًا للمقال أو قاموس {الرابط الأصلي: الرابط المستضاف}.
+        source_url: رابط المقال الأصلي، لحل روابط الصور النسبية عند بناء الفهرس من قاموس.
+        """
         if not raw_html_content or not isinstance(raw_html_content,str):
             if main_hosted_image_url_for_prepend:
                 img_s=BeautifulSoup("","html.parser"); p_w=img_s.new_tag("p"); n_img=img_s.new_tag("img",src=main_hosted_image_url_for_prepend)
@@ -70,82 +135,30 @@ class ContentFormatter:
             soup = BeautifulSoup(raw_html_content, 'html.parser')
             
             # --- هذا هو التعديل الرئيسي: تطبيق القواعد الديناميكية أولاً ---
-            if dynamic_rules and 'replacements' in dynamic_rules:
-                replacements = dynamic_rules.get('replacements', [])
-                if replacements:
-                    logger.info(f"Applying {len(replacements)} dynamic replacement rules.")
+            if dynamic_rules:
+                rule_set = compile_rules_from_dict(dynamic_rules)
+                if rule_set:
+                    logger.info("Applying %s dynamic replacement rules.", len(rule_set))
                     for text_node in soup.find_all(string=True):
                         if text_node.parent and text_node.parent.name in ['script', 'style']: continue
                         original_text = str(text_node)
-                        modified_text = original_text
-                        for rule in replacements:
-                            find_str = rule.get('find')
-                            replace_str = rule.get('replace_with', '')
-                            if find_str:
-                                modified_text = modified_text.replace(find_str, replace_str)
+                        modified_text = rule_set.apply(original_text)
                         if original_text != modified_text:
                             text_node.replace_with(modified_text)
             
             self._handle_embeds(soup)
 
-            # --- استعادة منطق التنظيف الكامل من الكود الأصلي ---
-            for unwanted in ['script','style','form','link','meta','noscript','embed','object','applet','header','footer','nav','aside','figure','figcaption','title']:
-                for tag in soup.find_all(unwanted): tag.decompose()
-            for iframe_tag in soup.find_all('iframe'):
-                iframe_src = iframe_tag.get('src','').lower()
-                if not ('youtube.com/embed' in iframe_src or 'youtu.be/' in iframe_src): iframe_tag.decompose()
-            for comment in soup.find_all(string=lambda t:isinstance(t,Comment)): comment.extract()
-            if self.remove_internal_links:
-                for a in soup.find_all('a', href=True): 
-                    is_embed_link = False
-                    if a.find_parent('blockquote', class_='twitter-tweet') or a.find_parent('iframe', src=re.compile("youtube.com/embed")):
-                        is_embed_link = True
-                    if not is_embed_link: del a['href']
-            
-            first_img_src_in_content = None 
-            image_tags_in_soup = soup.find_all('img') 
-            for idx, img_tag_from_soup in enumerate(image_tags_in_soup):
-                orig_s=img_tag_from_soup.get('src') or img_tag_from_soup.get('data-src'); hosted_url=None
-                if orig_s:
-                    if orig_s in processed_images_map: hosted_url=processed_images_map[orig_s]
-                    else:
-                        for mk,up_url in processed_images_map.items():
-                            if orig_s in mk or mk in orig_s: hosted_url=up_url;break
-                if hosted_url:
-                    img_tag_from_soup.attrs={};img_tag_from_soup['src']=hosted_url
-                    alt=(img_tag_from_soup.get('alt') or article_title_for_alt or "Image").strip() or (article_title_for_alt or "Image")
-                    img_tag_from_soup['alt']=alt;img_tag_from_soup['style']="max-width:100%;height:auto;display:block;margin:10px auto;border:0;"
-                    if idx==0:first_img_src_in_content=hosted_url
-                else:logger.warning(f"Image '{orig_s}' not in map. Decomposing.");img_tag_from_soup.decompose()
-            
-            allowed_tags_attrs = {
-                'a':['title','name','href','target','rel'],'img':['src','alt','title','style','width','height','border'], 'p':[],'br':[],'hr':[],'strong':[],'b':[],'em':[],'i':[],'u':[],'s':[],'strike':[],'del':[],
-                'sup':[],'sub':[],'code':[],'pre':[],'ul':['type'],'ol':['type','start','reversed'],'li':['value'], 'h1':[],'h2':[],'h3':[],'h4':[],'h5':[],'h6':[],
-                'blockquote':['style','cite','class','data-dnt','data-theme','data-align'], 'q':['cite'], 'iframe':['src','width','height','frameborder','allowfullscreen','style','title','allow'],
-                'table':['border','cellpadding','cellspacing','width','style','summary'],'div':['style'] 
-            }
-            for tag in soup.find_all(True):
-                if tag.name in allowed_tags_attrs:
-                    allowed_attrs = set(allowed_tags_attrs[tag.name])
-                    for attr in dict(tag.attrs):
-                        if attr.lower() not in allowed_attrs: del tag[attr]
-                else:
-                    tag.unwrap()
-            
-            for p in soup.find_all('p'):
-                if not p.get_text(strip=True) and not p.find(['img','br','hr','iframe','blockquote']):p.decompose()
-                elif self.extra_br_after_p and p.next_sibling and p.next_sibling.name!='br':p.append(soup.new_tag('br'))
-            for h_num in range(1,7):
-                for h in soup.find_all(f'h{h_num}'):
-                    if not h.get_text(strip=True):h.decompose()
-                    elif h_num==1:h.name='h2'
-            
+            # --- التنظيف الكامل في مرورين فقط على الشجرة بدلاً من عشرات عمليات find_all ---
+            image_index = ImageIndex.from_map(processed_images_map, base_url=source_url)
+            first_img_src_in_content = self._normalize_tree(soup, image_index, article_title_for_alt)
+            self._prune_empty_blocks(soup)
+
             prepend_html=""
             if main_hosted_image_url_for_prepend and main_hosted_image_url_for_prepend!=first_img_src_in_content:
                 img_s=BeautifulSoup("","html.parser");p_w=img_s.new_tag("p")
                 n_img=img_s.new_tag("img",src=main_hosted_image_url_for_prepend)
                 alt_main=(article_title_for_alt or "Featured Image").strip() or "Featured Image"
-                n_img['alt']=alt_main;n_img['style']="max-width:100%;height:auto;display:block;margin:10px auto;border:0;"
+                n_img['alt']=alt_main;n_img['style']=IMG_STYLE
                 p_w.append(n_img);prepend_html=str(p_w)
             
             body_html="".join(str(c) for c in soup.contents)
@@ -156,5 +169,5 @@ class ContentFormatter:
             logger.info("HTML content formatted for Blogger.")
             return final_html.strip()
         except Exception as e:
-            logger.error(f"Error formatting content: {e}",exc_info=True)
+            logger.error("Error formatting content: %s", e, exc_info=True)
             return raw_html_content
\ No newline at end of file
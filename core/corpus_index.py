@@ -0,0 +1,143 @@
+# core/corpus_index.py
+import os
+import threading
+from collections import Counter
+import numpy as np
+from utils.logger_config import setup_logger
+from utils.file_lock import FileLock
+
+logger = setup_logger(__name__)
+
+class DocumentFrequencyIndex:
+    """
+    فهرس تكرار المستندات (document frequency) لكل كلمة في كل ما تم نشره.
+    التخزين مضغوط: مصفوفة كلمات + مصفوفة أعداد int32 + عدد المستندات، في ملف .npz واحد.
+    - add_document: تحديث تزايدي بتكلفة O(عدد الكلمات الفريدة في المقال).
+    - idf / tfidf_scores: حساب متجه (vectorized) عبر NumPy.
+    - seeded: هل بُني الفهرس من أرشيف المدونة (KeywordExtractor.seed_corpus) أم من المقالات الجديدة فقط.
+    - save: عدة عمليات (عمال طابور المهام، المنسّق) تحمل نفس الملف: الحفظ يعيد قراءته تحت قفل ملف ويضيف إليه
+      المستندات المضافة منذ آخر حفظ فقط، ثم يتبنى النتيجة المدمجة (فلا تضيع أعداد العمليات الأخرى).
+    """
+    def __init__(self, index_file=None):
+        self.index_file = index_file
+        self._lock = threading.Lock()
+        self._vocab = {}
+        self._df = np.zeros(1024, dtype=np.int32)
+        self.n_docs = 0
+        self.seeded = False
+        self._dirty = False
+        self._pending = Counter() # كلمة -> مستندات أُضيفت منذ آخر حفظ
+        self._pending_docs = 0
+        self._replace = False # بُني من الأرشيف بالكامل (mark_seeded): يحل محل الملف بدل الدمج معه
+        if index_file: self._load()
+
+    def __len__(self):
+        return len(self._vocab)
+
+    def _read_file(self):
+        """(terms, df, n_docs, seeded) من الملف، أو None إذا لم يوجد."""
+        if not os.path.exists(self.index_file): return None
+        with np.load(self.index_file, allow_pickle=False) as data:
+            return (data['terms'].tolist(), data['df'].astype(np.int32), int(data['n_docs']),
+                    bool(data['seeded']) if 'seeded' in data.files else False)
+
+    def _set_state(self, terms, df, n_docs, seeded):
+        self._vocab = {term: idx for idx, term in enumerate(terms)}
+        self._df = np.zeros(max(1024, len(terms) * 2), dtype=np.int32)
+        self._df[:len(terms)] = df
+        self.n_docs = n_docs; self.seeded = seeded
+
+    def _load(self):
+        try: state = self._read_file()
+        except Exception as e:
+            logger.warning(f"Could not load document-frequency index from {self.index_file}: {e}. Starting empty."); return
+        if state is None: return
+        self._set_state(*state)
+        logger.info(f"Loaded document-frequency index: {self.n_docs} docs, {len(self._vocab)} terms from {self.index_file}")
+
+    def mark_seeded(self):
+        """الفهرس الحالي مبني من أرشيف المدونة كاملاً: يحل محل الملف عند الحفظ (إلا إذا سبقته عملية أخرى بفهرس مبني)."""
+        with self._lock:
+            self.seeded = True; self._replace = True; self._dirty = True
+            self._pending.clear(); self._pending_docs = 0
+
+    def _merged_state(self):
+        """أحدث نسخة على القرص + المستندات المعلقة في هذه العملية (تحت قفل الملف)."""
+        try: state = self._read_file()
+        except Exception as e:
+            logger.warning(f"Document-frequency index {self.index_file} is unreadable ({e}); rewriting it from this process."); state = None
+        own_terms = list(self._vocab)
+        if self._replace and not (state and state[3]): return own_terms, self._df[:len(own_terms)].copy(), self.n_docs, self.seeded
+        terms, df, n_docs, seeded = state or ([], np.zeros(0, dtype=np.int32), 0, False)
+        vocab = {term: idx for idx, term in enumerate(terms)}
+        new_terms = [term for term in self._pending if term not in vocab]
+        for term in new_terms: vocab[term] = len(terms); terms.append(term)
+        df = np.concatenate([df, np.zeros(len(new_terms), dtype=np.int32)])
+        if self._pending:
+            idxs = np.fromiter((vocab[term] for term in self._pending), dtype=np.int64, count=len(self._pending))
+            df[idxs] += np.fromiter(self._pending.values(), dtype=np.int32, count=len(self._pending))
+        return terms, df, n_docs + self._pending_docs, seeded
+
+    def save(self):
+        if not self.index_file or not self._dirty: return
+        index_dir = os.path.dirname(self.index_file)
+        tmp_path = f"{self.index_file}.tmp.{os.getpid()}.{threading.get_ident()}"
+        with self._lock:
+            try:
+                if index_dir: os.makedirs(index_dir, exist_ok=True)
+                with FileLock(f"{self.index_file}.lock"):
+                    terms, df, n_docs, seeded = self._merged_state()
+                    with open(tmp_path, 'wb') as f:
+                        np.savez_compressed(f, terms=np.array(terms, dtype=str), df=df, n_docs=np.int64(n_docs), seeded=np.bool_(seeded))
+                    os.replace(tmp_path, self.index_file)
+                self._set_state(terms, df, n_docs, seeded)
+                self._pending.clear(); self._pending_docs = 0; self._replace = False; self._dirty = False
+                logger.debug(f"Saved document-frequency index ({n_docs} docs, {len(terms)} terms) to {self.index_file}")
+            except Exception as e:
+                # المستندات المعلقة تبقى لمحاولة الحفظ التالية
+                logger.error(f"Failed to save document-frequency index to {self.index_file}: {e}")
+                try: os.remove(tmp_path)
+                except OSError: pass
+
+    def add_document(self, terms):
+        """يضيف مستندًا واحدًا (مجموعة كلماته الفريدة) إلى الفهرس."""
+        unique_terms = set(terms)
+        with self._lock:
+            idxs = []
+            for term in unique_terms:
+                idx = self._vocab.get(term)
+                if idx is None:
+                    idx = len(self._vocab); self._vocab[term] = idx
+                    if idx >= len(self._df): self._df = np.concatenate([self._df, np.zeros(len(self._df), dtype=np.int32)])
+                idxs.append(idx)
+            if idxs: self._df[np.fromiter(idxs, dtype=np.int64, count=len(idxs))] += 1
+            self.n_docs += 1
+            self._pending.update(unique_terms); self._pending_docs += 1
+            self._dirty = True
+
+    def document_frequencies(self, terms):
+        idxs = np.fromiter((self._vocab.get(term, -1) for term in terms), dtype=np.int64, count=len(terms))
+        known = idxs >= 0
+        df = np.zeros(len(terms), dtype=np.int32)
+        df[known] = self._df[idxs[known]]
+        return df
+
+    def idf(self, terms):
+        """IDF مُنعَّم: log((1 + N) / (1 + df)) + 1."""
+        df = self.document_frequencies(terms)
+        return np.log((1.0 + self.n_docs) / (1.0 + df)) + 1.0
+
+    def tfidf_scores(self, terms, counts):
+        """terms و counts بنفس الترتيب؛ يعيد مصفوفة درجات TF-IDF."""
+        tf = np.asarray(counts, dtype=np.float64)
+        return tf * self.idf(terms)
+
+    def top_terms(self, term_counts, k):
+        """
+        أعلى k كلمات حسب TF-IDF. term_counts: قاموس/Counter {الكلمة: التكرار} (الترتيب يحسم التعادل).
+        """
+        if not term_counts or k <= 0: return []
+        terms = list(term_counts)
+        scores = self.tfidf_scores(terms, [term_counts[t] for t in terms])
+        order = np.argsort(-scores, kind='stable')[:k]
+        return [terms[i] for i in order]
@@ -0,0 +1,142 @@
+# core/embed_providers.py
+import re
+from urllib.parse import quote
+
+class EmbedProvider:
+    """
+    مزود تضمين: نمط الرابط + كلمات فحص سريع (needles) + دالة تبني عقدة التضمين مباشرة داخل الشجرة.
+    - pattern: تعبير منتظم بدون مجموعات مسماة (يُدمج مع بقية المزودين في تعبير واحد).
+    - needles: نصوص صغيرة (بأحرف صغيرة) يجب أن يحتوي النص على إحداها قبل تشغيل التعبير المنتظم.
+    - builder(soup, match): يعيد Tag جاهزًا للإدراج.
+    - blockquote_classes / iframe_src_prefixes / allowed_attrs: ما يجب أن ينجو من تنظيف ContentFormatter.
+    """
+    def __init__(self, name, pattern, needles, builder, blockquote_classes=(), iframe_src_prefixes=(), allowed_attrs=None):
+        self.name = name
+        self.pattern = re.compile(pattern, re.I)
+        self.needles = tuple(needles)
+        self.builder = builder
+        self.blockquote_classes = frozenset(blockquote_classes)
+        self.iframe_src_prefixes = tuple(iframe_src_prefixes)
+        self.allowed_attrs = allowed_attrs or {}
+
+# المسافات التي يطويها محلل HTML عندما يكون المقطع النصي مكونًا منها فقط
+_ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+
+def _text_piece(text):
+    """يطابق سلوك المحلل السابق (إعادة تحليل HTML) الذي كان يطوي المقاطع الفارغة إلى '\n' أو ' '."""
+    if not text.strip(_ASCII_SPACES): return '\n' if '\n' in text else ' '
+    return text
+
+_EMBED_PROVIDERS = []
+_scanner = None
+
+def register_embed_provider(provider):
+    """يضيف مزودًا إلى السجل (أو يستبدل مزودًا بنفس الاسم) ويعيد بناء الماسح المدمج."""
+    global _scanner
+    for idx, existing in enumerate(_EMBED_PROVIDERS):
+        if existing.name == provider.name: _EMBED_PROVIDERS[idx] = provider; break
+    else: _EMBED_PROVIDERS.append(provider)
+    _scanner = None
+
+def get_embed_providers():
+    return list(_EMBED_PROVIDERS)
+
+class EmbedScanner:
+    """تعبير منتظم واحد يجمع أنماط كل المزودين، مع فحص مسبق رخيص بالنصوص الفرعية."""
+    def __init__(self, providers):
+        self.providers = {f"p{idx}": provider for idx, provider in enumerate(providers)}
+        self.pattern = re.compile("|".join(f"(?P<{key}>{provider.pattern.pattern})" for key, provider in self.providers.items()), re.I) if providers else None
+        self.needles = tuple({needle for provider in providers for needle in provider.needles})
+        self.blockquote_classes = frozenset().union(*(p.blockquote_classes for p in providers)) if providers else frozenset()
+        self.iframe_src_prefixes = tuple(prefix for p in providers for prefix in p.iframe_src_prefixes)
+
+    def may_contain_embed(self, text):
+        if not self.pattern: return False
+        lowered = text.lower()
+        return any(needle in lowered for needle in self.needles)
+
+    def split(self, soup, text):
+        """
+        يقسم النص إلى قطع: نصوص عادية (str) وعقد تضمين (Tag). يعيد None إذا لم يوجد أي تضمين.
+        """
+        pieces = []; last_end = 0
+        for m in self.pattern.finditer(text):
+            provider = self.providers[m.lastgroup]
+            # إعادة المطابقة بنمط المزود نفسه للحصول على مجموعاته بترقيمها الأصلي
+            provider_match = provider.pattern.match(text, m.start(), m.end())
+            embed_tag = provider.builder(soup, provider_match) if provider_match else None
+            if embed_tag is None: continue
+            if m.start() > last_end: pieces.append(_text_piece(text[last_end:m.start()]))
+            pieces.append(embed_tag)
+            last_end = m.end()
+        if not pieces: return None
+        if last_end < len(text): pieces.append(_text_piece(text[last_end:]))
+        return pieces
+
+    def is_embed_iframe_src(self, src):
+        return any(src.startswith(prefix) for prefix in self.iframe_src_prefixes)
+
+def get_embed_scanner():
+    global _scanner
+    if _scanner is None: _scanner = EmbedScanner(_EMBED_PROVIDERS)
+    return _scanner
+
+# --- المزودون المدمجون ---
+def _build_youtube(soup, match):
+    vid = match.group(1) or match.group(2)
+    wrapper = soup.new_tag('div', attrs={'style': "position:relative;padding-bottom:56.25%;padding-top:30px;height:0;overflow:hidden;max-width:100%;margin:10px 0;"})
+    wrapper.append(soup.new_tag('iframe', attrs={
+        'style': "position:absolute;top:0;left:0;width:100%;height:100%;", 'src': f"https://www.youtube.com/embed/{vid}", 'title': "YouTube video player",
+        'frameborder': "0", 'allow': "accelerometer;autoplay;clipboard-write;encrypted-media;gyroscope;picture-in-picture", 'allowfullscreen': ""}))
+    return wrapper
+
+def _build_twitter(soup, match):
+    url, handle, tweet_id = match.group(1), match.group(2), match.group(3)
+    quote_tag = soup.new_tag('blockquote', attrs={'class': "twitter-tweet", 'data-dnt': "true", 'data-theme': "light", 'data-align': "center"})
+    placeholder = soup.new_tag('p', attrs={'lang': "und", 'dir': "auto"}); placeholder.string = " "
+    quote_tag.append(placeholder)
+    quote_tag.append(f"— @{handle} ")
+    link = soup.new_tag('a', attrs={'href': url, 'target': "_blank", 'rel': "noopener noreferrer ugc"}); link.string = f"Loading Tweet ({tweet_id})..."
+    quote_tag.append(link)
+    return quote_tag
+
+def _build_instagram(soup, match):
+    kind, post_id = match.group(1).lower(), match.group(2)
+    permalink = f"https://www.instagram.com/{kind}/{post_id}/"
+    quote_tag = soup.new_tag('blockquote', attrs={'class': "instagram-media", 'data-instgrm-permalink': permalink, 'data-instgrm-version': "14"})
+    link = soup.new_tag('a', attrs={'href': permalink, 'target': "_blank", 'rel': "noopener noreferrer"}); link.string = "View this post on Instagram"
+    quote_tag.append(link)
+    return quote_tag
+
+def _build_facebook(soup, match):
+    url = match.group(1)
+    plugin = "video" if re.search(r"/videos/|/watch|/reel/", url, re.I) else "post"
+    return soup.new_tag('iframe', attrs={
+        'src': f"https://www.facebook.com/plugins/{plugin}.php?href={quote(url, safe='')}&show_text=true&width=500",
+        'width': "500", 'height': "680", 'style': "border:none;overflow:hidden;max-width:100%;display:block;margin:10px auto;",
+        'frameborder': "0", 'allowfullscreen': "true", 'allow': "autoplay;clipboard-write;encrypted-media;picture-in-picture;web-share", 'title': "Facebook post"})
+
+def _build_tiktok(soup, match):
+    url, handle, video_id = match.group(1), match.group(2), match.group(3)
+    quote_tag = soup.new_tag('blockquote', attrs={'class': "tiktok-embed", 'cite': url, 'data-video-id': video_id, 'style': "max-width:605px;min-width:325px;"})
+    link = soup.new_tag('a', attrs={'href': url, 'target': "_blank", 'rel': "noopener noreferrer"}); link.string = f"@{handle}"
+    quote_tag.append(link)
+    return quote_tag
+
+register_embed_provider(EmbedProvider(
+    "youtube", r"https?://(?:www\.)?youtube\.com/watch\?v=([\w-]+)(?:&[^\s]*)?|https?://youtu\.be/([\w-]+)(?:\?[^\s]*)?",
+    ("youtu",), _build_youtube, iframe_src_prefixes=("https://www.youtube.com/embed/",)))
+register_embed_provider(EmbedProvider(
+    "twitter", r"(https?://(?:www\.)?(?:twitter\.com|x\.com)/(\w+)/status/(\d+))(?:\?[^\s]*)?",
+    ("twitter.com", "x.com"), _build_twitter, blockquote_classes=("twitter-tweet",)))
+register_embed_provider(EmbedProvider(
+    "instagram", r"https?://(?:www\.)?instagram\.com/(p|reel|tv)/([\w-]+)/?(?:\?[^\s]*)?",
+    ("instagram.com",), _build_instagram, blockquote_classes=("instagram-media",),
+    allowed_attrs={'blockquote': ['data-instgrm-permalink', 'data-instgrm-version']}))
+register_embed_provider(EmbedProvider(
+    "facebook", r"(https?://(?:www\.|m\.|web\.)?facebook\.com/(?:[\w.-]+/(?:posts|videos)/[\w.:-]+|watch/?\?v=\d+|reel/\d+))(?:[?&][^\s]*)?",
+    ("facebook.com",), _build_facebook, iframe_src_prefixes=("https://www.facebook.com/plugins/",)))
+register_embed_provider(EmbedProvider(
+    "tiktok", r"(https?://(?:www\.)?tiktok\.com/@([\w.-]+)/video/(\d+))(?:\?[^\s]*)?",
+    ("tiktok.com",), _build_tiktok, blockquote_classes=("tiktok-embed",),
+    allowed_attrs={'blockquote': ['data-video-id']}))
@@ -0,0 +1,125 @@
+# core/google_auth.py
+# مصادقة Blogger ووثيقة الاكتشاف المشتركة بين BloggerClient وسكربت التنظيف:
+# - وثيقة الاكتشاف تُقرأ مرة لكل عملية (القرص ← النسخة المضمنة مع googleapiclient ← الشبكة).
+# - token.json يُحدَّث فقط قرب انتهاء الصلاحية، تحت قفل ملف وبكتابة ذرّية، فلا تتسابق المهام المتزامنة عليه.
+import os
+import json
+from datetime import datetime, timedelta, timezone
+from utils.logger_config import setup_logger
+from utils.file_lock import FileLock
+
+logger = setup_logger(__name__)
+SCOPES = ['https://www.googleapis.com/auth/blogger']
+DISCOVERY_URL = "https://blogger.googleapis.com/$discovery/rest?version={version}"
+
+_discovery_docs = {}
+
+def load_discovery_document(api_name='blogger', version='v3', cache_dir=None):
+    """يعيد وثيقة الاكتشاف كقاموس (محفوظة في الذاكرة بعد أول قراءة)."""
+    key = (api_name, version)
+    if key in _discovery_docs: return _discovery_docs[key]
+    doc_text, source = None, None
+    cache_file = os.path.join(cache_dir, f"{api_name}.{version}.json") if cache_dir else None
+    if cache_file and os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f: doc_text = f.read()
+            source = cache_file
+        except OSError as e: logger.warning(f"Could not read discovery cache {cache_file}: {e}")
+    if doc_text is None:
+        try:
+            from googleapiclient.discovery_cache import get_static_doc
+            doc_text = get_static_doc(api_name, version); source = "packaged static document" if doc_text else None
+        except ImportError: doc_text = None
+    if doc_text is None:
+        import requests
+        url = DISCOVERY_URL.format(version=version) if api_name == 'blogger' else f"https://{api_name}.googleapis.com/$discovery/rest?version={version}"
+        response = requests.get(url, timeout=30); response.raise_for_status()
+        doc_text = response.text; source = url
+        if cache_file:
+            try: _atomic_write(cache_file, doc_text)
+            except OSError as e: logger.warning(f"Could not write discovery cache {cache_file}: {e}")
+    _discovery_docs[key] = json.loads(doc_text)
+    logger.debug(f"Loaded {api_name} {version} discovery document from {source}")
+    return _discovery_docs[key]
+
+def build_service_from_cache(credentials, api_name='blogger', version='v3', cache_dir=None, client_options=None):
+    """مثل build() لكن دون جلب أو إعادة تحليل وثيقة الاكتشاف في كل مرة."""
+    from googleapiclient.discovery import build_from_document
+    return build_from_document(load_discovery_document(api_name, version, cache_dir), credentials=credentials, client_options=client_options)
+
+def _atomic_write(path, text):
+    target_dir = os.path.dirname(path)
+    if target_dir: os.makedirs(target_dir, exist_ok=True)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f: f.write(text)
+    os.replace(tmp_path, path)
+
+def _read_token(token_file, scopes):
+    from google.oauth2.credentials import Credentials
+    if not os.path.exists(token_file): return None
+    try: return Credentials.from_authorized_user_file(token_file, scopes)
+    except Exception as e:
+        logger.warning(f"Error loading token from {token_file}: {e}. Re-authenticating.")
+        return None
+
+def credentials_fresh(creds, refresh_margin_sec):
+    """صالح ولن تنتهي صلاحيته خلال refresh_margin_sec ثانية."""
+    if not creds or not creds.token: return False
+    if creds.expiry is None: return creds.valid
+    # expiry في google-auth بتوقيت UTC بدون منطقة زمنية
+    now = datetime.now(timezone.utc)
+    if creds.expiry.tzinfo is None: now = now.replace(tzinfo=None)
+    return creds.expiry - timedelta(seconds=refresh_margin_sec) > now
+
+def load_credentials(creds_path, scopes=SCOPES, refresh_margin_sec=300, interactive=True, lock_timeout=120):
+    """
+    يعيد Credentials صالحة لمجلد مستخدم (token.json + client_secret.json).
+    يرفع FileNotFoundError إذا لزمت مصادقة جديدة ولم يوجد client_secret.json، ويعيد None إذا كانت interactive=False.
+    """
+    token_file = os.path.join(creds_path, 'token.json')
+    secret_file = os.path.join(creds_path, 'client_secret.json')
+    creds = _read_token(token_file, scopes)
+    if credentials_fresh(creds, refresh_margin_sec): return creds
+
+    with FileLock(f"{token_file}.lock", timeout=lock_timeout):
+        # ربما حدّثت عملية أخرى الرمز أثناء انتظارنا للقفل
+        creds = _read_token(token_file, scopes)
+        if credentials_fresh(creds, refresh_margin_sec):
+            logger.debug(f"Token in {token_file} was refreshed by another process.")
+            return creds
+
+        if creds and creds.refresh_token:
+            from google.auth.exceptions import RefreshError
+            from google.auth.transport.requests import Request
+            try:
+                logger.info("Credentials expired or about to expire. Refreshing token...")
+                creds.refresh(Request())
+                logger.info("Token refreshed successfully.")
+            except RefreshError as e:
+                logger.error(f"Failed to refresh token: {e}. Removing invalid token and re-authenticating.")
+                try: os.remove(token_file)
+                except OSError as ose: logger.warning(f"Could not remove invalid token file {token_file}: {ose}")
+                creds = None
+            except Exception as e:
+                # خطأ شبكة مؤقت: الرمز مشترك بين كل المهام، فلا نحذفه
+                logger.error(f"Failed to refresh token (keeping {token_file} for the next attempt): {e}")
+                return None
+            if creds:
+                try: _atomic_write(token_file, creds.to_json())
+                except Exception as e: logger.error(f"Error saving token to {token_file}: {e}")
+                return creds
+
+        if not interactive:
+            logger.error(f"No valid token in {token_file} and interactive authentication is disabled.")
+            return None
+        logger.info(f"Starting new authentication flow using {secret_file}.")
+        if not os.path.exists(secret_file):
+            raise FileNotFoundError(f"Client secrets file '{secret_file}' not found.")
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        flow = InstalledAppFlow.from_client_secrets_file(secret_file, scopes)
+        creds = flow.run_local_server(port=0, open_browser=True)
+        try:
+            _atomic_write(token_file, creds.to_json())
+            logger.info(f"Credentials saved to {token_file}")
+        except Exception as e: logger.error(f"Error saving token to {token_file}: {e}")
+        return creds
@@ -0,0 +1,128 @@
+# core/image_index.py
+import threading
+from collections import OrderedDict
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+# سمات التحميل الكسول (lazy-load) الشائعة، بالترتيب الذي تُفحص به بعد src
+LAZY_SRC_ATTRS = ('data-src', 'data-lazy-src', 'data-original', 'data-lazy', 'data-url')
+SRCSET_ATTRS = ('srcset', 'data-srcset', 'data-lazy-srcset')
+
+def _is_placeholder(src):
+    return not src or src.startswith('data:') or src.startswith('about:')
+
+def _srcset_candidates(srcset):
+    """يعيد روابط srcset (بدون الواصفات مثل 800w أو 2x) بترتيبها في السمة."""
+    urls = []
+    for candidate in srcset.split(','):
+        parts = candidate.strip().split()
+        if parts and not _is_placeholder(parts[0]): urls.append(parts[0])
+    return urls
+
+def get_image_sources(img_tag):
+    """
+    جميع الروابط المرشحة لوسم <img> بترتيب الأولوية: src ثم سمات التحميل الكسول ثم srcset.
+    الروابط المؤقتة (data: URIs) تُتجاهل.
+    """
+    sources = []
+    for attr in ('src',) + LAZY_SRC_ATTRS:
+        value = img_tag.get(attr)
+        if isinstance(value, str): value = value.strip()
+        if value and not _is_placeholder(value) and value not in sources: sources.append(value)
+    for attr in SRCSET_ATTRS:
+        value = img_tag.get(attr)
+        if value:
+            for url in _srcset_candidates(value):
+                if url not in sources: sources.append(url)
+    return sources
+
+def get_image_source(img_tag):
+    """الرابط الفعلي للصورة (أول مرشح صالح) أو None."""
+    sources = get_image_sources(img_tag)
+    return sources[0] if sources else None
+
+def normalize_image_url(url, base_url=None):
+    """
+    يوحد رابط الصورة إلى scheme://host/path: يحل الروابط النسبية، يحذف الاستعلام والمقطع (#)
+    ويحول المخطط والنطاق إلى أحرف صغيرة. يعيد None للروابط غير الصالحة.
+    """
+    if not url: return None
+    url = url.strip()
+    if _is_placeholder(url): return None
+    if base_url: url = urljoin(base_url, url)
+    try: parts = urlsplit(url)
+    except ValueError: return None
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, '', ''))
+
+class ImageIndex:
+    """
+    فهرس الصور المستضافة لمقال واحد: يربط الرابط الأصلي (كما ورد في الوسم) ونسخته الموحدة
+    بالرابط المستضاف، فيصبح البحث O(1) بدلاً من مقارنة النصوص الجزئية مع كل صورة.
+    """
+    def __init__(self, base_url=None):
+        self.base_url = base_url
+        self._by_raw = {}
+        self._by_normalized = {}
+
+    @classmethod
+    def from_map(cls, images_map, base_url=None):
+        if isinstance(images_map, ImageIndex): return images_map
+        index = cls(base_url)
+        for original_src, hosted_url in (images_map or {}).items(): index.add(original_src, hosted_url)
+        return index
+
+    def add(self, original_src, hosted_url, full_url=None):
+        if not original_src or not hosted_url: return
+        self._by_raw[original_src] = hosted_url
+        for url in (original_src, full_url):
+            normalized = normalize_image_url(url, self.base_url)
+            if normalized: self._by_normalized.setdefault(normalized, hosted_url)
+
+    def resolve(self, src):
+        if not src: return None
+        hosted_url = self._by_raw.get(src)
+        if hosted_url: return hosted_url
+        normalized = normalize_image_url(src, self.base_url)
+        return self._by_normalized.get(normalized) if normalized else None
+
+    def resolve_tag(self, img_tag):
+        for src in get_image_sources(img_tag):
+            hosted_url = self.resolve(src)
+            if hosted_url: return hosted_url
+        return None
+
+    def __contains__(self, src):
+        return self.resolve(src) is not None
+
+    def __len__(self):
+        return len(self._by_raw)
+
+    def __bool__(self):
+        return bool(self._by_raw)
+
+class HostedImageCache:
+    """
+    روابط الصور المستضافة عبر المقالات والدورات (بالرابط الموحد): نفس الصورة في عدة مقالات،
+    أو نفس المقال لعدة مدونات، تُعالج وتُرفع مرة واحدة. آمنة للاستخدام من عدة خيوط.
+    """
+    def __init__(self, max_entries=5000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url, base_url=None):
+        normalized = normalize_image_url(url, base_url)
+        if not normalized: return None
+        with self._lock:
+            hosted_url = self._entries.get(normalized)
+            if hosted_url: self._entries.move_to_end(normalized)
+            return hosted_url
+
+    def put(self, url, hosted_url, base_url=None):
+        normalized = normalize_image_url(url, base_url)
+        if not normalized or not hosted_url: return
+        with self._lock:
+            self._entries[normalized] = hosted_url; self._entries.move_to_end(normalized)
+            while len(self._entries) > self.max_entries: self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
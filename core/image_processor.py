@@ -176,9 +176,8 @@ import requests
 import configparser
 import logging
 
-from PIL import Image
-
 import urllib3
+from core import instrumentation
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 class ImageProcessor:
@@ -196,9 +195,10 @@ class ImageProcessor:
             return image_obj
         logo_path = self.config.get(logo_section_name, 'LogoFile', fallback=None)
         if not logo_path or not os.path.exists(logo_path):
-            self.logger.error(f"Logo file for '{logo_section_name}' not found: {logo_path}. Skipping.")
+            self.logger.error("Logo file for '%s' not found: %s. Skipping.", logo_section_name, logo_path)
             return image_obj
         try:
+            from PIL import Image
             placement_mode = self.config.get(logo_section_name, 'PlacementMode', fallback='scale').lower()
             logo_pil = Image.open(logo_path).convert("RGBA")
             logo_resized, pos = None, (0, 0)
@@ -223,7 +223,7 @@ class ImageProcessor:
             image_obj.paste(logo_resized, pos, logo_resized)
             return image_obj
         except Exception as e:
-            self.logger.error(f"Failed to apply logo from '{logo_section_name}': {e}", exc_info=True)
+            self.logger.error("Failed to apply logo from '%s': %s", logo_section_name, e, exc_info=True)
             return image_obj
 
     # --- دالة القص الجديدة ---
@@ -248,10 +248,10 @@ class ImageProcessor:
             # إذا تم تحديد أي قص بالنسبة المئوية، نقوم بالقص الآن
             if any([pc_left, pc_top, pc_right, pc_bottom]):
                 if crop_box_right <= crop_box_left or crop_box_bottom <= crop_box_top:
-                    self.logger.warning(f"Percentage crop results in invalid dimensions for image {img_width}x{img_height}. Skipping percentage crop.")
+                    self.logger.warning("Percentage crop results in invalid dimensions for image %sx%s. Skipping percentage crop.", img_width, img_height)
                 else:
                     image_obj = image_obj.crop((crop_box_left, crop_box_top, crop_box_right, crop_box_bottom))
-                    self.logger.info(f"Applied percentage crop. New dimensions: {image_obj.size[0]}x{image_obj.size[1]}.")
+                    self.logger.info("Applied percentage crop. New dimensions: %sx%s.", image_obj.size[0], image_obj.size[1])
                     # تحديث أبعاد الصورة بعد القص المئوي
                     img_width, img_height = image_obj.size
 
@@ -279,42 +279,47 @@ class ImageProcessor:
 
             # التأكد من أن منطقة القص صالحة
             if right <= left or lower <= upper:
-                self.logger.warning(f"Defined crop area ({left},{upper},{right},{lower}) is invalid for image {img_width}x{img_height}. Skipping fixed crop.")
+                self.logger.warning("Defined crop area (%s,%s,%s,%s) is invalid for image %sx%s. Skipping fixed crop.", left, upper, right, lower, img_width, img_height)
                 return image_obj
 
             image_obj = image_obj.crop((left, upper, right, lower))
-            self.logger.info(f"Applied fixed crop. New dimensions: {image_obj.size[0]}x{image_obj.size[1]}.")
+            self.logger.info("Applied fixed crop. New dimensions: %sx%s.", image_obj.size[0], image_obj.size[1])
             return image_obj
 
         except Exception as e:
-            self.logger.error(f"Failed to apply cropping: {e}", exc_info=True)
+            self.logger.error("Failed to apply cropping: %s", e, exc_info=True)
             return image_obj
 
     def process_image_with_logo(self, image_url):
+        # Pillow يُستورد عند أول صورة فقط، فالمهام التي لا تعالج صورًا لا تدفع كلفة استيراده
+        from PIL import Image
         try:
-            self.logger.info(f"Downloading image: {image_url[:100]}...")
-            response = requests.get(image_url, headers={'User-Agent': self.user_agent}, stream=True, timeout=self.request_timeout, verify=False)
-            response.raise_for_status()
-            processed_image = Image.open(io.BytesIO(response.content))
+            self.logger.info("Downloading image: %s...", image_url[:100])
+            with instrumentation.stage('image_download'):
+                response = requests.get(image_url, headers={'User-Agent': self.user_agent}, stream=True, timeout=self.request_timeout, verify=False)
+                response.raise_for_status(); image_data = response.content
+            instrumentation.count('image_bytes_downloaded', len(image_data))
+            with instrumentation.stage('image_process'):
+                processed_image = Image.open(io.BytesIO(image_data))
             
-            # --- تطبيق القص هنا قبل تحويل RGB أو الشعارات ---
-            processed_image = self._apply_cropping(processed_image)
-
-            if self.output_format == 'JPEG' and processed_image.mode != 'RGB':
-                processed_image = processed_image.convert('RGB')
-            processed_image = self._apply_logo(processed_image, 'Logo1')
-            processed_image = self._apply_logo(processed_image, 'Logo2')
-            buffer = io.BytesIO()
-            save_opts = {'quality': self.output_quality, 'optimize': True} if self.output_format == 'JPEG' else {}
-            processed_image.save(buffer, format=self.output_format, **save_opts)
-            final_bytes = buffer.getvalue()
-            self.logger.info(f"Image processed. Final size: {len(final_bytes)/1024:.2f}KB.")
+                # --- تطبيق القص هنا قبل تحويل RGB أو الشعارات ---
+                processed_image = self._apply_cropping(processed_image)
+
+                if self.output_format == 'JPEG' and processed_image.mode != 'RGB':
+                    processed_image = processed_image.convert('RGB')
+                processed_image = self._apply_logo(processed_image, 'Logo1')
+                processed_image = self._apply_logo(processed_image, 'Logo2')
+                buffer = io.BytesIO()
+                save_opts = {'quality': self.output_quality, 'optimize': True} if self.output_format == 'JPEG' else {}
+                processed_image.save(buffer, format=self.output_format, **save_opts)
+                final_bytes = buffer.getvalue()
+                self.logger.info("Image processed. Final size: %.2fKB.", len(final_bytes)/1024)
             return final_bytes
         except requests.exceptions.SSLError as e:
-            self.logger.error(f"SSL Error downloading image {image_url}. Skipping image. Error: {e}")
+            self.logger.error("SSL Error downloading image %s. Skipping image. Error: %s", image_url, e)
             return None
         except Exception as e:
-            self.logger.error(f"Error processing image {image_url}: {e}", exc_info=True)
+            self.logger.error("Error processing image %s: %s", image_url, e, exc_info=True)
             return None
 
     def upload_image_to_hosting(self, image_bytes, suggested_filename="image.jpg"):
@@ -328,26 +333,27 @@ class ImageProcessor:
         upload_url = self.config.get('ImageHosting_ImgBB', 'UploadUrl')
         upload_timeout = self.config.getint('ImageHosting_ImgBB', 'UploadTimeout')
         try:
-            self.logger.info(f"Uploading image to ImgBB ({upload_url}) to get temporary link for Blogger...")
+            self.logger.info("Uploading image to ImgBB (%s) to get temporary link for Blogger...", upload_url)
             files = {'image': (os.path.basename(suggested_filename), image_bytes)}
             payload = {'key': api_key}
-            response = requests.post(
-                upload_url, 
-                files=files, 
-                data=payload, 
-                timeout=upload_timeout,
-                verify=False
-            )
+            with instrumentation.stage('image_upload'):
+                response = requests.post(
+                    upload_url, 
+                    files=files, 
+                    data=payload, 
+                    timeout=upload_timeout,
+                    verify=False
+                )
             response.raise_for_status()
             response_data = response.json()
             if response_data.get('success'):
                 hosted_url = response_data['data']['url'].replace('https://', 'http://')
-                self.logger.info(f"Image temporarily available at: {hosted_url}. Blogger will now fetch it.")
+                self.logger.info("Image temporarily available at: %s. Blogger will now fetch it.", hosted_url)
                 return hosted_url
             else:
                 error_msg = response_data.get('error', {}).get('message', 'Unknown ImgBB error')
-                self.logger.error(f"Failed to upload to ImgBB: {error_msg}")
+                self.logger.error("Failed to upload to ImgBB: %s", error_msg)
                 return None
         except requests.exceptions.RequestException as e:
-            self.logger.error(f"Error connecting to ImgBB: {e}", exc_info=True)
+            self.logger.error("Error connecting to ImgBB: %s", e, exc_info=True)
             return None
\ No newline at end of file
@@ -0,0 +1,142 @@
+# core/instrumentation.py
+import os
+import json
+import time
+import threading
+import functools
+from contextlib import contextmanager
+
+# ترتيب عرض المراحل في الملخص (أي مرحلة أخرى تُعرض بعدها)
+STAGES = ('sitemap', 'scrape', 'parse', 'image_download', 'image_process', 'image_upload',
+          'translate', 'format', 'keywords', 'publish')
+
+def percentile(values, pct):
+    """نسبة مئوية بالاستيفاء الخطي بين أقرب قيمتين (pct من 0 إلى 100)."""
+    if not values: return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100.0
+    lower = int(position); upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+class CycleMetrics:
+    """
+    مؤقتات وعدادات خفيفة لدورة النشر:
+    - stage(name) يقيس زمن مرحلة ويضيفه إلى عينات الدورة وإلى سجل المقال الحالي في هذا الخيط (إن وجد).
+    - article(url) يربط ما يُقاس داخله بسجل المقال؛ يمكن الدخول إليه أكثر من مرة (كشط ثم نشر)
+      وfinish_article يكتب السجل سطر JSON واحدًا.
+    - end_cycle يكتب سطر JSON للدورة فيه p50/p95 لكل مرحلة.
+    """
+    def __init__(self, events_path=None, clock=time.perf_counter):
+        self.events_path = events_path
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._reset()
+
+    def _reset(self):
+        self.samples = {}; self.counters = {}; self._articles = {}
+        self.cycle_id = None; self.cycle_name = None; self._cycle_started = None; self.articles_finished = 0
+
+    def _current_article(self):
+        return getattr(self._local, 'article', None)
+
+    def record(self, name, elapsed_ms):
+        article = self._current_article()
+        with self._lock:
+            self.samples.setdefault(name, []).append(elapsed_ms)
+            if article is not None: article['stages'][name] = round(article['stages'].get(name, 0.0) + elapsed_ms, 3)
+
+    @contextmanager
+    def stage(self, name):
+        started = self._clock()
+        try: yield
+        finally: self.record(name, (self._clock() - started) * 1000)
+
+    def count(self, name, amount=1):
+        article = self._current_article()
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+            if article is not None: article['counters'][name] = article['counters'].get(name, 0) + amount
+
+    @contextmanager
+    def article(self, url):
+        with self._lock: record = self._articles.setdefault(url, {'url': url, 'stages': {}, 'counters': {}})
+        previous = self._current_article(); self._local.article = record
+        try: yield record
+        finally: self._local.article = previous
+
+    def finish_article(self, url, **fields):
+        """يكتب سجل المقال (المراحل بالمللي ثانية والعدادات وأي حقول إضافية مثل status)."""
+        with self._lock: record = self._articles.pop(url, None)
+        if record is None: record = {'url': url, 'stages': {}, 'counters': {}}
+        record.update(fields); record['total_ms'] = round(sum(record['stages'].values()), 3)
+        self.articles_finished += 1
+        self._emit('article', record)
+        return record
+
+    def start_cycle(self, name='bot_cycle'):
+        with self._lock: self._reset()
+        self.cycle_name = name; self.cycle_id = f"{int(time.time())}-{os.getpid()}"; self._cycle_started = self._clock()
+
+    def summary(self):
+        """{stage: {count, total_ms, p50_ms, p95_ms, max_ms}} مرتبة حسب STAGES."""
+        with self._lock: samples = {name: list(values) for name, values in self.samples.items()}
+        ordered = [name for name in STAGES if name in samples] + sorted(name for name in samples if name not in STAGES)
+        return {name: {'count': len(samples[name]), 'total_ms': round(sum(samples[name]), 3),
+                       'p50_ms': round(percentile(samples[name], 50), 3), 'p95_ms': round(percentile(samples[name], 95), 3),
+                       'max_ms': round(max(samples[name]), 3)} for name in ordered}
+
+    def format_summary(self, summary=None):
+        summary = self.summary() if summary is None else summary
+        if not summary: return "No stages were timed in this cycle."
+        lines = [f"{'stage':<16}{'count':>7}{'total_s':>10}{'p50_ms':>10}{'p95_ms':>10}{'max_ms':>10}"]
+        for name, stats in summary.items():
+            lines.append(f"{name:<16}{stats['count']:>7}{stats['total_ms'] / 1000:>10.2f}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+        return "\n".join(lines)
+
+    def end_cycle(self, **fields):
+        """يكتب المقالات التي لم تُغلق بعد ثم سجل الدورة، ويعيد ملخص المراحل."""
+        for url in list(self._articles): self.finish_article(url, status='unfinished')
+        summary = self.summary()
+        duration_ms = (self._clock() - self._cycle_started) * 1000 if self._cycle_started is not None else 0.0
+        record = {'name': self.cycle_name, 'duration_ms': round(duration_ms, 3), 'articles': self.articles_finished,
+                  'counters': dict(self.counters), 'stages': summary}
+        record.update(fields)
+        self._emit('cycle', record)
+        return summary
+
+    def _emit(self, kind, record):
+        if not self.events_path: return
+        line = json.dumps(dict({'type': kind, 'ts': round(time.time(), 3), 'cycle_id': self.cycle_id}, **record), ensure_ascii=False)
+        try:
+            with self._lock:
+                events_dir = os.path.dirname(self.events_path)
+                if events_dir: os.makedirs(events_dir, exist_ok=True)
+                with open(self.events_path, 'a', encoding='utf-8') as f: f.write(line + "\n")
+        except OSError: pass # القياس لا يجب أن يوقف النشر
+
+_metrics = CycleMetrics()
+
+def get_metrics():
+    return _metrics
+
+def set_metrics(metrics):
+    """يستبدل المقياس العام (run_bot_cycle يضبطه من config.ini، والاختبارات تمرر ساعة وهمية)."""
+    global _metrics
+    _metrics = metrics
+    return metrics
+
+def stage(name):
+    return _metrics.stage(name)
+
+def count(name, amount=1):
+    _metrics.count(name, amount)
+
+def timed(stage_name):
+    """مُزخرف: يقيس كل استدعاء للدالة كمرحلة stage_name في المقياس العام الحالي."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _metrics.stage(stage_name): return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -2,27 +2,65 @@
 import logging
 import re
 from collections import Counter
+from core.stopwords import STOPWORDS_BY_LANGUAGE
+from core import instrumentation
 
 logger = logging.getLogger(__name__)
 
-# استيراد NLTK يتم الآن داخل كتلة try...except
-try:
-    import nltk
-    from nltk.corpus import stopwords
-    from nltk.tokenize import word_tokenize
-    NLTK_AVAILABLE = True
-except ImportError:
-    NLTK_AVAILABLE = False
-    logger.warning("NLTK library not found. Falling back to basic keyword extraction.")
+# --- أدوات المقطّع السريع (بدون NLTK) ---
+# التشكيل، علامات القرآن والتطويل تُحذف قبل التقطيع
+_ARABIC_MARKS_RE = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+# توحيد أشكال الألف والياء لغرض العدّ فقط (الكلمة المعروضة تبقى بشكلها الأكثر شيوعًا في النص)
+_ARABIC_LETTER_TABLE = str.maketrans({'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا', 'ى': 'ي'})
+# كلمة = تسلسل حروف فقط (بدون أرقام أو شرطة سفلية)
+_WORD_RE = re.compile(r'[^\W\d_]+')
+
+def strip_arabic_marks(text):
+    return _ARABIC_MARKS_RE.sub('', text)
+
+def normalize_arabic(word):
+    return strip_arabic_marks(word).translate(_ARABIC_LETTER_TABLE)
+
+_NORMALIZED_STOPWORDS = {
+    lang: frozenset(normalize_arabic(w) for w in words) if lang == 'ar' else words
+    for lang, words in STOPWORDS_BY_LANGUAGE.items()
+}
+
+def _load_nltk():
+    """استيراد NLTK عند الحاجة فقط (وضع Tokenizer = nltk)."""
+    try:
+        from nltk.corpus import stopwords
+        from nltk.tokenize import word_tokenize
+        return stopwords, word_tokenize
+    except ImportError:
+        logger.warning("NLTK library not found. Falling back to the built-in tokenizer.")
+        return None
 
 class KeywordExtractor:
     def __init__(self, config):
         self.config = config
         self.default_lang = config.get('Keywords', 'Language', fallback='ar')
         self.num_keywords = config.getint('Keywords', 'NumKeywords', fallback=5)
+        # fast: المقطّع المدمج (افتراضي) | nltk: الطريقة القديمة المعتمدة على بيانات NLTK
+        self.tokenizer_mode = config.get('Keywords', 'Tokenizer', fallback='fast').strip().lower()
         # ✅ تم تعطيل التنزيل التلقائي لتجنب الأخطاء على السحابة
-        # self._download_nltk_resources_if_needed() 
+        # self._download_nltk_resources_if_needed()
         self.stopwords_cache = {}
+        self._nltk = None
+        # tfidf: ترتيب الكلمات حسب TF-IDF مقابل فهرس كل ما تم نشره | frequency: التكرار داخل المقال فقط
+        self.scoring = config.get('Keywords', 'Scoring', fallback='tfidf').strip().lower()
+        # قبل تجميع عدد كافٍ من المقالات لا يكون IDF ذا معنى، فنستخدم التكرار فقط
+        self.min_docs_for_tfidf = config.getint('Keywords', 'MinDocsForTfidf', fallback=20)
+        self.corpus_index_file = config.get('Paths', 'DocumentFrequencyFile', fallback='keyword_df_index.npz') if self.scoring == 'tfidf' else None
+        self._corpus_index = None
+
+    @property
+    def corpus_index(self):
+        """فهرس تكرار المستندات يُحمَّل (مع NumPy) عند أول استخدام فعلي وليس عند إنشاء الأداة."""
+        if self._corpus_index is None and self.corpus_index_file:
+            from core.corpus_index import DocumentFrequencyIndex
+            self._corpus_index = DocumentFrequencyIndex(self.corpus_index_file)
+        return self._corpus_index
 
     def _download_nltk_resources_if_needed(self):
         """
@@ -32,25 +70,20 @@ class KeywordExtractor:
         pass # لا تفعل شيئًا
 
     def _get_stopwords(self, language_code):
-        if not NLTK_AVAILABLE: return set() # إذا لم تكن NLTK متاحة، لا توجد كلمات متوقفة
-        
         if language_code in self.stopwords_cache: return self.stopwords_cache[language_code]
-        
+
+        sw = set(STOPWORDS_BY_LANGUAGE.get(language_code.lower(), ()))
         lang_map = {'ar': 'arabic', 'en': 'english', 'fr': 'french', 'es': 'spanish'}
         nltk_lang = lang_map.get(language_code.lower())
-        
-        if nltk_lang:
+
+        if self._nltk and nltk_lang:
             try:
-                sw = set(stopwords.words(nltk_lang))
-                self.stopwords_cache[language_code] = sw
-                return sw
+                sw |= set(self._nltk[0].words(nltk_lang))
             except Exception as e:
-                logger.warning(f"Could not load NLTK stopwords for '{nltk_lang}': {e}. This might happen if the resource is not downloaded.")
-        else:
-            logger.warning(f"Unsupported language '{language_code}' for NLTK stopwords.")
-        
-        self.stopwords_cache[language_code] = set()
-        return set()
+                logger.warning(f"Could not load NLTK stopwords for '{nltk_lang}': {e}. Using bundled stopwords only.")
+
+        self.stopwords_cache[language_code] = sw
+        return sw
 
     def _basic_fallback_extraction(self, text_content):
         """
@@ -60,49 +93,137 @@ class KeywordExtractor:
         text_alpha_space = re.sub(r'[^\w\s]', '', text_content, flags=re.UNICODE)
         text_alpha_space = re.sub(r'\d+', ' ', text_alpha_space)
         words = text_alpha_space.lower().split()
-        
+
         long_words = [word for word in words if len(word) > 4]
-        
+
         # استخدام Counter للحصول على الأكثر شيوعًا حتى في الطريقة البديلة
         if not long_words: return []
         word_counts = Counter(long_words)
         most_common = [word for word, count in word_counts.most_common(self.num_keywords)]
         return most_common
 
+    def tokenize(self, text_content, language=None):
+        """
+        المقطّع السريع: يعيد قائمة (مفتاح العدّ، الشكل الظاهر) للكلمات بعد حذف كلمات التوقف والكلمات القصيرة.
+        """
+        lang_to_use = (language or self.default_lang).lower()
+        stop_set = _NORMALIZED_STOPWORDS.get(lang_to_use, frozenset())
+        min_word_len = 3 if lang_to_use == 'ar' else 2
+        tokens = []
+        if lang_to_use == 'ar':
+            for surface in _WORD_RE.findall(strip_arabic_marks(text_content)):
+                key = surface.translate(_ARABIC_LETTER_TABLE)
+                if len(key) >= min_word_len and key not in stop_set: tokens.append((key, surface))
+        else:
+            for word in _WORD_RE.findall(text_content.lower()):
+                if len(word) >= min_word_len and word not in stop_set: tokens.append((word, word))
+        return tokens
+
+    def term_counts(self, text_content, language=None):
+        """
+        عدد تكرار كل مفتاح + الشكل الظاهر الأكثر شيوعًا له.
+        """
+        counts = Counter(); surfaces = {}
+        for key, surface in self.tokenize(text_content, language):
+            counts[key] += 1
+            surfaces.setdefault(key, Counter())[surface] += 1
+        display = {key: forms.most_common(1)[0][0] for key, forms in surfaces.items()}
+        return counts, display
+
+    def _use_tfidf(self):
+        return self.corpus_index is not None and self.corpus_index.n_docs >= self.min_docs_for_tfidf
+
+    def _extract_fast(self, text_content, language):
+        counts, display = self.term_counts(text_content, language)
+        if self._use_tfidf(): top_keys = self.corpus_index.top_terms(counts, self.num_keywords)
+        else: top_keys = [key for key, count in counts.most_common(self.num_keywords)]
+        return [display[key] for key in top_keys]
+
+    def add_to_corpus(self, text_content, language=None):
+        """
+        يضيف مقالاً منشورًا إلى فهرس تكرار المستندات (تحديث تزايدي).
+        """
+        if self.corpus_index is None or not text_content: return
+        self.corpus_index.add_document(key for key, surface in self.tokenize(text_content, language))
+
+    def corpus_needs_seed(self):
+        return self.corpus_index is not None and not self.corpus_index.seeded
+
+    def seed_corpus(self, texts, language=None):
+        """
+        يبني فهرس تكرار المستندات من نصوص كل ما نُشر سابقًا (أرشيف المدونة) ويعيد عدد المستندات.
+        المقالات المضافة قبل ذلك عبر add_to_corpus موجودة في الأرشيف أيضًا، لذا يُبنى فهرس جديد
+        ويحل محل الحالي فقط بعد قراءة كل النصوص (فشل القراءة في المنتصف يترك الفهرس كما هو).
+        """
+        if self.corpus_index is None: return 0
+        from core.corpus_index import DocumentFrequencyIndex
+        seeded_index = DocumentFrequencyIndex(None)
+        for text in texts:
+            if text: seeded_index.add_document(key for key, surface in self.tokenize(text, language))
+        seeded_index.index_file = self.corpus_index_file; seeded_index.mark_seeded()
+        self._corpus_index = seeded_index
+        return seeded_index.n_docs
+
+    def save_corpus(self):
+        # لا داعي لتحميل الفهرس من القرص فقط لحفظه دون تغيير
+        if self._corpus_index is not None: self._corpus_index.save()
+
+    def _extract_with_nltk(self, text_content, lang_to_use):
+        if self._nltk is None: self._nltk = _load_nltk() or False
+        if not self._nltk: return self._extract_fast(text_content, lang_to_use)
+        word_tokenize = self._nltk[1]
+        try:
+            text_alpha_space = re.sub(r'[^\w\s]', '', text_content, flags=re.UNICODE)
+            text_alpha_space = re.sub(r'\d+', ' ', text_alpha_space)
+            normalized_text = text_alpha_space.lower() if lang_to_use != 'ar' else text_alpha_space
+
+            nltk_lang_for_tokenize = {'ar': 'arabic', 'en': 'english'}.get(lang_to_use, 'english')
+            tokens = word_tokenize(normalized_text, language=nltk_lang_for_tokenize)
+
+            current_stopwords = self._get_stopwords(lang_to_use)
+            min_word_len = 3 if lang_to_use == 'ar' else 2
+            filtered_tokens = [word for word in tokens if word.isalpha() and len(word) >= min_word_len and word not in current_stopwords]
+
+            if not filtered_tokens:
+                logger.warning("No valid tokens after NLTK filtering. Trying fallback.")
+                return self._basic_fallback_extraction(text_content)
+
+            # نفس مفاتيح المقطّع السريع حتى يُستخدم فهرس TF-IDF نفسه في الوضعين
+            word_counts = Counter(); surfaces = {}
+            for word in filtered_tokens:
+                key = normalize_arabic(word) if lang_to_use == 'ar' else word
+                word_counts[key] += 1; surfaces.setdefault(key, Counter())[word] += 1
+            if self._use_tfidf(): top_keys = self.corpus_index.top_terms(word_counts, self.num_keywords)
+            else: top_keys = [key for key, count in word_counts.most_common(self.num_keywords)]
+            most_common_keywords = [surfaces[key].most_common(1)[0][0] for key in top_keys]
+            logger.info(f"Keywords extracted successfully with NLTK ({lang_to_use}): {most_common_keywords}")
+            return most_common_keywords
+
+        except Exception as e:
+            logger.error(f"NLTK processing failed: {e}. Falling back to basic extraction.")
+            # إذا حدث أي خطأ هنا (مثل عدم وجود بيانات punkt)، ننتقل للطريقة البديلة
+            return self._basic_fallback_extraction(text_content)
+
+    @instrumentation.timed('keywords')
     def extract_keywords(self, text_content, language=None):
         if not text_content or not isinstance(text_content, str): return []
-        
+
         lang_to_use = language or self.default_lang
         logger.info(f"Attempting to extract keywords (lang: {lang_to_use}). Snippet: '{text_content[:80].replace(chr(10),' ')}...'")
 
-        # ✅ --- هذا هو التعديل الرئيسي ---
-        # نحاول استخدام الطريقة الدقيقة، وإذا فشلت لأي سبب، نستخدم الطريقة البديلة
-        if NLTK_AVAILABLE:
-            try:
-                text_alpha_space = re.sub(r'[^\w\s]', '', text_content, flags=re.UNICODE)
-                text_alpha_space = re.sub(r'\d+', ' ', text_alpha_space)
-                normalized_text = text_alpha_space.lower() if lang_to_use != 'ar' else text_alpha_space
-                
-                nltk_lang_for_tokenize = {'ar': 'arabic', 'en': 'english'}.get(lang_to_use, 'english')
-                tokens = word_tokenize(normalized_text, language=nltk_lang_for_tokenize)
-                
-                current_stopwords = self._get_stopwords(lang_to_use)
-                min_word_len = 3 if lang_to_use == 'ar' else 2
-                filtered_tokens = [word for word in tokens if word.isalpha() and len(word) >= min_word_len and word not in current_stopwords]
-                
-                if not filtered_tokens: 
-                    logger.warning("No valid tokens after NLTK filtering. Trying fallback.")
-                    return self._basic_fallback_extraction(text_content)
-                
-                word_counts = Counter(filtered_tokens)
-                most_common_keywords = [word for word, count in word_counts.most_common(self.num_keywords)]
-                logger.info(f"Keywords extracted successfully with NLTK ({lang_to_use}): {most_common_keywords}")
-                return most_common_keywords
-            
-            except Exception as e:
-                logger.error(f"NLTK processing failed: {e}. Falling back to basic extraction.")
-                # إذا حدث أي خطأ هنا (مثل عدم وجود بيانات punkt)، ننتقل للطريقة البديلة
-                return self._basic_fallback_extraction(text_content)
-        else:
-            # إذا لم تكن NLTK مثبتة من الأساس
-            return self._basic_fallback_extraction(text_content)
+        if self.tokenizer_mode == 'nltk':
+            return self._extract_with_nltk(text_content, lang_to_use)
+        keywords = self._extract_fast(text_content, lang_to_use)
+        logger.info(f"Keywords extracted ({lang_to_use}): {keywords}")
+        return keywords
+
+    def extract_keywords_many(self, texts, language=None):
+        """
+        استخراج الكلمات المفتاحية لمجموعة نصوص دفعة واحدة (نفس ترتيب المدخلات).
+        """
+        lang_to_use = language or self.default_lang
+        if self.tokenizer_mode == 'nltk':
+            return [self.extract_keywords(text, lang_to_use) for text in texts]
+        results = [self._extract_fast(text, lang_to_use) if text and isinstance(text, str) else [] for text in texts]
+        logger.info(f"Extracted keywords for {len(results)} texts ({lang_to_use}).")
+        return results
@@ -1,28 +1,35 @@
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
 from collections import Counter
 from utils.logger_config import setup_logger
 import re
 
 logger = setup_logger(__name__)
 
-# تأكد من تحميل الموارد اللازمة لـ NLTK مرة واحدة
-try:
-    nltk.data.find('corpora/stopwords')
-except nltk.downloader.DownloadError:
-    logger.info("NLTK 'stopwords' not found. Downloading...")
-    nltk.download('stopwords')
+_nltk_ready = False
+_STOPWORDS = {}
 
-try:
-    nltk.data.find('tokenizers/punkt')
-except nltk.downloader.DownloadError:
-    logger.info("NLTK 'punkt' not found. Downloading...")
-    nltk.download('punkt')
+def _ensure_nltk_resources():
+    """
+    يتأكد من وجود موارد NLTK (ويحملها إن لزم) عند أول استخدام فقط، وليس عند استيراد الوحدة.
+    """
+    global _nltk_ready
+    if _nltk_ready: return
+    import nltk
+    for resource_path, package in (('corpora/stopwords', 'stopwords'), ('tokenizers/punkt', 'punkt')):
+        try:
+            nltk.data.find(resource_path)
+        except LookupError:
+            logger.info(f"NLTK '{package}' not found. Downloading...")
+            nltk.download(package)
+    _nltk_ready = True
 
-# يمكنك إضافة لغات أخرى إذا لزم الأمر
-STOPWORDS_AR = set(stopwords.words('arabic'))
-STOPWORDS_EN = set(stopwords.words('english'))
+def _get_stopwords(language):
+    # يمكنك إضافة لغات أخرى إذا لزم الأمر
+    nltk_lang = {'ar': 'arabic', 'en': 'english'}.get(language)
+    if not nltk_lang: return set()
+    if language not in _STOPWORDS:
+        from nltk.corpus import stopwords
+        _STOPWORDS[language] = set(stopwords.words(nltk_lang))
+    return _STOPWORDS[language]
 
 def extract_keywords_from_text(text, language='ar', num_keywords=5):
     """
@@ -36,14 +43,11 @@ def extract_keywords_from_text(text, language='ar', num_keywords=5):
     text = re.sub(r'[^\w\s]', '', text) # إزالة علامات الترقيم (قد ترغب في الاحتفاظ ببعضها)
     text = text.lower() # توحيد حالة الأحرف
 
+    _ensure_nltk_resources()
+    from nltk.tokenize import word_tokenize
     tokens = word_tokenize(text)
     
-    current_stopwords = []
-    if language == 'ar':
-        current_stopwords = STOPWORDS_AR
-    elif language == 'en':
-        current_stopwords = STOPWORDS_EN
-    # يمكنك إضافة المزيد من اللغات
+    current_stopwords = _get_stopwords(language)
     
     filtered_tokens = [word for word in tokens if word.isalnum() and word not in current_stopwords and len(word) > 2]
     
@@ -1,39 +1,70 @@
 # core/permalink_generator.py
 import re
-import time 
+import time
 from unidecode import unidecode
-from deep_translator import GoogleTranslator
 from utils.logger_config import setup_logger
+from core.translation_backends import create_translator_backend
+from core.translation_cache import TranslationCache, normalize_translation_text
+from core import instrumentation
 
 logger = setup_logger(__name__)
 
 class PermalinkGenerator:
-    def __init__(self, config):
+    def __init__(self, config, translator_backend=None, translation_cache=None):
         self.config = config
         self.translate_slugs = self.config.getboolean('Translation', 'TranslateSlugs', fallback=True)
-        self.translator_instance = None
-        if self.translate_slugs:
+        # google (افتراضي) | transliterate: نقل حرفي دون اتصال | stub: مترجم محلي للاختبارات
+        self.backend_name = self.config.get('Translation', 'Backend', fallback='google').strip().lower() if self.translate_slugs else 'transliterate'
+        self.cache_file = self.config.get('Translation', 'CacheFile', fallback='translation_cache.sqlite')
+        self.cache_max_entries = self.config.getint('Translation', 'CacheMaxEntries', fallback=5000)
+        # المترجم وذاكرة الترجمة يُهيآن عند أول عنوان يحتاج ترجمة (deep_translator بطيء الاستيراد)
+        self.translator_backend = translator_backend
+        self.translation_cache = translation_cache
+
+    def _ensure_translator(self):
+        if self.translator_backend is None and self.translate_slugs:
             try:
-                self.translator_instance = GoogleTranslator(source='auto', target='en')
-                logger.info("DeepL Translator (Google engine) initialized for permalink/title suggestion.")
+                self.translator_backend = create_translator_backend(self.backend_name, self.config)
+                logger.info("Translator backend '%s' initialized for permalink/title suggestion.", self.translator_backend.name)
             except Exception as e:
-                logger.error(f"Failed to initialize Translator: {e}. Translation will be skipped.")
+                logger.error("Failed to initialize Translator: %s. Translation will be skipped.", e)
                 self.translate_slugs = False
+        return self.translator_backend
 
-    def generate_english_title_suggestion(self, original_title, source_lang_hint=None):
-        if not original_title: return {'suggested_title': "Untitled Post", 'slug_base': "untitled-post"}
-        english_suggested_title = original_title
-        if self.translate_slugs and self.translator_instance:
+    def _ensure_cache(self):
+        if self.translation_cache is None and self.cache_file and self.translator_backend and self.translator_backend.cacheable:
+            try: self.translation_cache = TranslationCache(self.cache_file, max_entries=self.cache_max_entries)
+            except Exception as e:
+                logger.warning("Could not open translation cache '%s': %s. Continuing without cache.", self.cache_file, e)
+                self.cache_file = None
+        return self.translation_cache
+
+    def translate_titles(self, titles, source_lang_hint=None):
+        """
+        يترجم مجموعة عناوين: ما هو موجود في ذاكرة الترجمة لا يُرسل، والباقي يُترجم في طلب دفعي واحد.
+        يعيد قائمة بنفس الترتيب، وNone لكل عنوان لم تتوفر له ترجمة.
+        """
+        if not self.translate_slugs or not self._ensure_translator(): return [None] * len(titles)
+        source_lang = source_lang_hint or 'auto'
+        keys = [normalize_translation_text(title) for title in titles]
+        unique_keys = [key for key in dict.fromkeys(keys) if key]
+        cache = self._ensure_cache()
+        translations = cache.get_many(source_lang, 'en', unique_keys) if cache is not None else {}
+        missing = [key for key in unique_keys if key not in translations]
+        instrumentation.count('translation_cache_hits', len(unique_keys) - len(missing))
+        if missing:
+            logger.debug("Translating %s titles in one batch (%s served from cache, hint: %s)", len(missing), len(translations), source_lang_hint)
             try:
-                current_translator = GoogleTranslator(source=source_lang_hint if source_lang_hint else 'auto', target='en')
-                logger.debug(f"Translating for title suggestion: '{original_title[:50]}...' (Hint: {source_lang_hint})")
-                translated_text = current_translator.translate(text=original_title)
-                if translated_text and isinstance(translated_text, str): english_suggested_title = translated_text
-                else: logger.warning(f"Translation empty for '{original_title[:30]}...'. Using transliteration."); english_suggested_title = unidecode(original_title)
-            except Exception as e: logger.warning(f"Translation for title '{original_title[:30]}...' failed: {e}. Using transliteration."); english_suggested_title = unidecode(original_title)
-        elif not self.translate_slugs: logger.debug(f"Translation disabled. Using transliteration for title: '{original_title[:30]}...'"); english_suggested_title = unidecode(original_title)
-        else: logger.debug(f"Translator not available. Using transliteration for title: '{original_title[:30]}...'"); english_suggested_title = unidecode(original_title)
-        
+                with instrumentation.stage('translate'): translated = self.translator_backend.translate_batch(missing, source_lang, 'en')
+            except Exception as e:
+                logger.warning("Batch translation of %s titles failed: %s. Using transliteration.", len(missing), e)
+                translated = [None] * len(missing)
+            fresh = {key: text for key, text in zip(missing, translated) if isinstance(text, str) and text.strip()}
+            translations.update(fresh)
+            if cache is not None and fresh: cache.put_many(source_lang, 'en', fresh)
+        return [translations.get(key) for key in keys]
+
+    def _build_suggestion(self, original_title, english_suggested_title):
         slug_base = english_suggested_title.lower(); slug_base = unidecode(slug_base)
         slug_base = re.sub(r'\s+', '-', slug_base); slug_base = re.sub(r'[^a-z0-9-]', '', slug_base)
         slug_base = re.sub(r'-+', '-', slug_base).strip('-')
@@ -44,5 +75,23 @@ class PermalinkGenerator:
             fallback_base = re.sub(r'[^a-z0-9-]', '', fallback_base)[:30].strip('-')
             if fallback_base: slug_base = fallback_base
             else: slug_base = "post-" + str(int(time.time()))
-        logger.info(f"Original: '{original_title[:30]}...' -> Suggested Title: '{english_suggested_title[:50]}...', Slug base: '{slug_base}'")
-        return {'suggested_title': english_suggested_title, 'slug_base': slug_base}
\ No newline at end of file
+        logger.info("Original: '%s...' -> Suggested Title: '%s...', Slug base: '%s'", original_title[:30], english_suggested_title[:50], slug_base)
+        return {'suggested_title': english_suggested_title, 'slug_base': slug_base}
+
+    def generate_english_title_suggestions(self, original_titles, source_lang_hint=None):
+        """نسخة دفعية من generate_english_title_suggestion (نفس ترتيب المدخلات، وترجمة واحدة لكل الدفعة)."""
+        titles = [title for title in original_titles if title]
+        translations = dict(zip(titles, self.translate_titles(titles, source_lang_hint))) if titles else {}
+        suggestions = []
+        for original_title in original_titles:
+            if not original_title: suggestions.append({'suggested_title': "Untitled Post", 'slug_base': "untitled-post"}); continue
+            english_suggested_title = translations.get(original_title)
+            if not english_suggested_title:
+                if self.translate_slugs: logger.warning("Translation empty for '%s...'. Using transliteration.", original_title[:30])
+                else: logger.debug("Translation disabled. Using transliteration for title: '%s...'", original_title[:30])
+                english_suggested_title = unidecode(original_title)
+            suggestions.append(self._build_suggestion(original_title, english_suggested_title))
+        return suggestions
+
+    def generate_english_title_suggestion(self, original_title, source_lang_hint=None):
+        return self.generate_english_title_suggestions([original_title], source_lang_hint)[0]
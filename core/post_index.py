@@ -0,0 +1,120 @@
+# core/post_index.py
+import os
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime
+
+def post_timestamp(value):
+    """يحول تاريخ RFC 3339 من Blogger (مع فرق التوقيت) إلى ثوانٍ، حتى يصح الترتيب عبر تغيّر التوقيت الصيفي."""
+    if not value: return 0.0
+    try: return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError: return 0.0
+
+class PostIndexStore:
+    """
+    فهرس محلي لبيانات المقالات الوصفية لكل مدونة: (id, url, labels, published, updated).
+    يُحدَّث بالفروقات فقط (آخر updated تمت مزامنته لكل مدونة)، وتُجاب استعلامات
+    التصنيفات وأحدث N وروابط كل التصنيفات منه دون أي طلب لـ API.
+    """
+    def __init__(self, db_path=None):
+        self.db_path = db_path or ':memory:'
+        self._lock = threading.Lock()
+        if self.db_path != ':memory:':
+            db_dir = os.path.dirname(self.db_path)
+            if db_dir: os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS posts (
+                blog_id TEXT NOT NULL, post_id TEXT NOT NULL, url TEXT, labels TEXT NOT NULL, published TEXT,
+                published_ts REAL NOT NULL, updated TEXT, updated_ts REAL NOT NULL, PRIMARY KEY (blog_id, post_id))""")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS post_labels (
+                blog_id TEXT NOT NULL, post_id TEXT NOT NULL, label TEXT NOT NULL, PRIMARY KEY (blog_id, label, post_id))""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS posts_by_published ON posts (blog_id, published_ts DESC)")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS sync_state (
+                blog_id TEXT PRIMARY KEY, last_updated_ts REAL NOT NULL, last_sync_at REAL NOT NULL, last_full_sync_at REAL)""")
+
+    def _rows(self, blog_id, posts):
+        rows, label_rows, post_ids = [], [], []
+        for post in posts:
+            post_id = str(post.get('id') or '')
+            if not post_id: continue
+            labels = post.get('labels', [])
+            post_ids.append(post_id)
+            rows.append((blog_id, post_id, post.get('url', ''), json.dumps(labels, ensure_ascii=False), post.get('published'),
+                         post_timestamp(post.get('published')), post.get('updated'), post_timestamp(post.get('updated'))))
+            label_rows.extend((blog_id, post_id, label) for label in labels)
+        return rows, label_rows, post_ids
+
+    def _write_locked(self, blog_id, rows, label_rows, post_ids):
+        self._conn.executemany("DELETE FROM post_labels WHERE blog_id = ? AND post_id = ?", [(blog_id, pid) for pid in post_ids])
+        self._conn.executemany("INSERT OR REPLACE INTO posts (blog_id, post_id, url, labels, published, published_ts, updated, updated_ts) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self._conn.executemany("INSERT OR IGNORE INTO post_labels (blog_id, post_id, label) VALUES (?, ?, ?)", label_rows)
+
+    def upsert_posts(self, blog_id, posts):
+        """posts: مقالات Blogger (قواميس فيها id وurl وlabels وpublished وupdated). يعيد عدد المقالات المكتوبة."""
+        blog_id = str(blog_id); rows, label_rows, post_ids = self._rows(blog_id, posts)
+        if not rows: return 0
+        with self._lock:
+            with self._conn: self._write_locked(blog_id, rows, label_rows, post_ids)
+        return len(rows)
+
+    def replace_posts(self, blog_id, posts):
+        """إعادة بناء كاملة لفهرس مدونة في معاملة واحدة (تحذف المقالات التي لم تعد موجودة على الخادم)."""
+        blog_id = str(blog_id); rows, label_rows, post_ids = self._rows(blog_id, posts)
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM post_labels WHERE blog_id = ?", (blog_id,))
+                self._conn.execute("DELETE FROM posts WHERE blog_id = ?", (blog_id,))
+                self._write_locked(blog_id, rows, label_rows, post_ids)
+        return len(rows)
+
+    def get_sync_state(self, blog_id):
+        with self._lock:
+            row = self._conn.execute("SELECT last_updated_ts, last_sync_at, last_full_sync_at FROM sync_state WHERE blog_id = ?", (str(blog_id),)).fetchone()
+        return {'last_updated_ts': row[0], 'last_sync_at': row[1], 'last_full_sync_at': row[2]} if row else None
+
+    def save_sync_state(self, blog_id, last_updated_ts, full=False):
+        now = time.time(); previous = self.get_sync_state(blog_id)
+        last_full = now if full else (previous or {}).get('last_full_sync_at')
+        with self._lock:
+            with self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO sync_state (blog_id, last_updated_ts, last_sync_at, last_full_sync_at) VALUES (?, ?, ?, ?)",
+                                   (str(blog_id), last_updated_ts, now, last_full))
+
+    def count(self, blog_id):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM posts WHERE blog_id = ?", (str(blog_id),)).fetchone()[0]
+
+    def get_categories(self, blog_id):
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT label FROM post_labels WHERE blog_id = ? ORDER BY label", (str(blog_id),)).fetchall()
+        return [row[0] for row in rows]
+
+    def get_links(self, blog_id, category=None, limit=None):
+        """روابط المقالات الأحدث أولاً، لكل المدونة أو لتصنيف واحد."""
+        if category:
+            sql = ("SELECT p.url FROM posts p JOIN post_labels l ON l.blog_id = p.blog_id AND l.post_id = p.post_id "
+                   "WHERE p.blog_id = ? AND l.label = ? ORDER BY p.published_ts DESC")
+            params = [str(blog_id), category]
+        else:
+            sql = "SELECT url FROM posts WHERE blog_id = ? ORDER BY published_ts DESC"
+            params = [str(blog_id)]
+        if limit and limit > 0: sql += " LIMIT ?"; params.append(int(limit))
+        with self._lock:
+            return [row[0] for row in self._conn.execute(sql, params).fetchall() if row[0]]
+
+    def get_links_by_label(self, blog_id, limit_per_label=None):
+        links_by_label = {}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT l.label, p.url FROM posts p JOIN post_labels l ON l.blog_id = p.blog_id AND l.post_id = p.post_id "
+                "WHERE p.blog_id = ? ORDER BY l.label, p.published_ts DESC", (str(blog_id),)).fetchall()
+        for label, url in rows:
+            links = links_by_label.setdefault(label, [])
+            if url and not (limit_per_label and limit_per_label > 0 and len(links) >= limit_per_label): links.append(url)
+        return links_by_label
+
+    def close(self):
+        with self._lock: self._conn.close()
@@ -0,0 +1,73 @@
+# core/rule_engine.py
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+# عدد مجموعات القواعد المترجمة المحفوظة في الذاكرة
+_CACHE_MAX_ENTRIES = 64
+_compiled_cache = OrderedDict()
+
+class CompiledRuleSet:
+    """
+    مجموعة قواعد بحث/استبدال مترجمة إلى تعبير منتظم واحد (alternation) مع جدول بحث.
+    يتم الاستبدال في مسح واحد لكل نص، بدلالة "الأطول من أقصى اليسار" (leftmost-longest):
+    عند تطابق أكثر من قاعدة في نفس الموضع تفوز العبارة الأطول.
+    """
+    def __init__(self, lookup):
+        self.lookup = lookup
+        if lookup:
+            # ترتيب البدائل تنازليًا حسب الطول يجعل محرك re يختار الأطول عند نفس الموضع
+            alternatives = sorted(lookup, key=len, reverse=True)
+            self.pattern = re.compile("|".join(re.escape(find) for find in alternatives))
+        else:
+            self.pattern = None
+
+    def __bool__(self):
+        return self.pattern is not None
+
+    def __len__(self):
+        return len(self.lookup)
+
+    def apply(self, text):
+        if not self.pattern or not text: return text
+        lookup = self.lookup
+        return self.pattern.sub(lambda m: lookup[m.group(0)], text)
+
+def _rules_hash(replacements, remove_symbols):
+    payload = json.dumps([replacements, remove_symbols], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def compile_rules(replacements=None, remove_symbols=None):
+    """
+    يترجم قواعد الاستبدال ({'find', 'replace_with'}) والرموز المراد حذفها إلى CompiledRuleSet.
+    عند تكرار عبارة البحث تفوز القاعدة الأولى، وقواعد الاستبدال تسبق قائمة الحذف.
+    النتائج تُخزن مؤقتًا حسب بصمة محتوى القواعد.
+    """
+    replacements = replacements or []; remove_symbols = remove_symbols or []
+    key = _rules_hash(replacements, remove_symbols)
+    cached = _compiled_cache.get(key)
+    if cached is not None:
+        _compiled_cache.move_to_end(key)
+        return cached
+
+    lookup = {}
+    for rule in replacements:
+        find_str = rule.get('find')
+        if find_str: lookup.setdefault(find_str, rule.get('replace_with', '') or '')
+    for symbol in remove_symbols:
+        if symbol: lookup.setdefault(symbol, '')
+    rule_set = CompiledRuleSet(lookup)
+    logger.debug(f"Compiled {len(lookup)} replacement rules into a single matcher (key {key[:10]}).")
+
+    _compiled_cache[key] = rule_set
+    if len(_compiled_cache) > _CACHE_MAX_ENTRIES: _compiled_cache.popitem(last=False)
+    return rule_set
+
+def compile_rules_from_dict(rules):
+    """اختصار لقواعد بصيغة {'replacements': [...], 'remove_symbols': [...]} كما تُحفظ في الإعدادات."""
+    rules = rules or {}
+    return compile_rules(rules.get('replacements', []), rules.get('remove_symbols', []))
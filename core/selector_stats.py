@@ -0,0 +1,106 @@
+# core/selector_stats.py
+import json
+import os
+import threading
+from urllib.parse import urlparse
+from utils.logger_config import setup_logger
+from utils.file_lock import FileLock
+
+logger = setup_logger(__name__)
+
+class SelectorStatsStore:
+    """
+    مخزن إحصائيات المحددات لكل نطاق (domain).
+    يحفظ عدد مرات النجاح والمحاولة لكل محدد، ويعيد ترتيب قائمة المحددات
+    بحيث يُجرَّب المحدد الأكثر نجاحًا تاريخيًا أولاً.
+    الحفظ يدمج الزيادات منذ آخر حفظ مع أحدث نسخة على القرص تحت قفل ملف (عدة عمال ومنسّق يكتبون نفس الملف).
+    """
+    def __init__(self, stats_file=None):
+        self.stats_file = stats_file
+        self._lock = threading.Lock()
+        self._dirty = False
+        # البنية: {domain: {purpose: {selector: {"hits": int, "attempts": int}}}}
+        self._stats = {}
+        self._pending = {} # نفس البنية: الزيادات منذ آخر حفظ
+        if stats_file: self._load()
+
+    @staticmethod
+    def domain_of(url):
+        try: netloc = urlparse(url).netloc.lower()
+        except Exception: return ""
+        return netloc[4:] if netloc.startswith("www.") else netloc
+
+    def _read_file(self):
+        if not os.path.exists(self.stats_file): return {}
+        with open(self.stats_file, 'r', encoding='utf-8') as f: data = json.load(f)
+        return data if isinstance(data, dict) else {}
+
+    def _load(self):
+        try:
+            self._stats = self._read_file()
+            if self._stats: logger.debug(f"Loaded selector stats for {len(self._stats)} domains from {self.stats_file}")
+        except Exception as e:
+            logger.warning(f"Could not load selector stats from {self.stats_file}: {e}. Starting fresh.")
+            self._stats = {}
+
+    @staticmethod
+    def _add_counts(target, deltas):
+        for domain, purposes in deltas.items():
+            for purpose, per_selector in purposes.items():
+                merged = target.setdefault(domain, {}).setdefault(purpose, {})
+                for selector, delta in per_selector.items():
+                    entry = merged.setdefault(selector, {"hits": 0, "attempts": 0})
+                    entry["hits"] += delta["hits"]; entry["attempts"] += delta["attempts"]
+
+    def save(self):
+        if not self.stats_file or not self._dirty: return
+        tmp_path = f"{self.stats_file}.tmp.{os.getpid()}.{threading.get_ident()}"
+        with self._lock:
+            try:
+                stats_dir = os.path.dirname(self.stats_file)
+                if stats_dir: os.makedirs(stats_dir, exist_ok=True)
+                with FileLock(f"{self.stats_file}.lock"):
+                    try: merged = self._read_file()
+                    except Exception as e:
+                        logger.warning(f"Selector stats file {self.stats_file} is unreadable ({e}); rewriting it from this process."); merged = {}
+                    self._add_counts(merged, self._pending)
+                    with open(tmp_path, 'w', encoding='utf-8') as f: json.dump(merged, f, ensure_ascii=False, indent=1)
+                    os.replace(tmp_path, self.stats_file)
+                self._stats = merged; self._pending = {}; self._dirty = False
+            except Exception as e:
+                # الزيادات المعلقة تبقى لمحاولة الحفظ التالية
+                logger.error(f"Failed to save selector stats to {self.stats_file}: {e}")
+                try: os.remove(tmp_path)
+                except OSError: pass
+
+    def ordered(self, domain, purpose, selectors):
+        """يعيد المحددات مرتبة حسب عدد مرات النجاح (الترتيب الأصلي يُحفظ عند التساوي)."""
+        per_selector = self._stats.get(domain, {}).get(purpose)
+        if not per_selector: return list(selectors)
+        return sorted(selectors, key=lambda s: -per_selector.get(s, {}).get("hits", 0))
+
+    def record(self, domain, purpose, tried_selectors, winner=None):
+        """يسجل المحددات التي جُرّبت والمحدد الذي نجح (إن وجد)."""
+        if not domain: return
+        with self._lock:
+            for stats in (self._stats, self._pending):
+                per_selector = stats.setdefault(domain, {}).setdefault(purpose, {})
+                for selector in tried_selectors:
+                    entry = per_selector.setdefault(selector, {"hits": 0, "attempts": 0})
+                    entry["attempts"] += 1
+                    if selector == winner: entry["hits"] += 1
+            self._dirty = True
+
+    def hit_rates(self, domain=None):
+        """
+        يعيد نسب النجاح لكل محدد: {domain: {purpose: {selector: {"hits", "attempts", "hit_rate"}}}}.
+        """
+        domains = [domain] if domain else list(self._stats)
+        report = {}
+        for d in domains:
+            for purpose, per_selector in self._stats.get(d, {}).items():
+                report.setdefault(d, {})[purpose] = {
+                    sel: {**entry, "hit_rate": (entry["hits"] / entry["attempts"]) if entry["attempts"] else 0.0}
+                    for sel, entry in per_selector.items()
+                }
+        return report
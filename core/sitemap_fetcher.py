@@ -4,9 +4,9 @@ import xml.etree.ElementTree as ET
 from urllib.parse import urlparse, unquote
 import re
 import time
-import cloudscraper
 from datetime import datetime, timezone
 from utils.logger_config import setup_logger
+from core import instrumentation
 
 logger = setup_logger(__name__)
 
@@ -34,14 +34,15 @@ def is_potential_article_url(url_string, base_domain):
                 if excluded_contain in param_name: return False
         if (not path or path == '/') and not query: return False
         return True
-    except Exception as e: logger.error(f"Error filtering URL {url_string}: {e}", exc_info=True); return False
+    except Exception as e: logger.error("Error filtering URL %s: %s", url_string, e, exc_info=True); return False
 
 def fetch_urls_from_sitemap(sitemap_url, user_agent="SitemapFetcherBot/1.0 (Default)", sitemap_fetch_delay_sec=1):
     urls_with_dates = []; sitemaps_to_process = [sitemap_url]; processed_sitemap_urls = set()
     try: base_domain = urlparse(sitemap_url).netloc
-    except Exception: logger.error(f"Invalid sitemap URL: {sitemap_url}"); return []
-    if not base_domain: logger.error(f"Could not get base domain from: {sitemap_url}"); return []
+    except Exception: logger.error("Invalid sitemap URL: %s", sitemap_url); return []
+    if not base_domain: logger.error("Could not get base domain from: %s", sitemap_url); return []
     
+    import cloudscraper # استيراد كسول: مكلف ولا نحتاجه إلا عند جلب الخريطة فعلاً
     scraper = cloudscraper.create_scraper(browser={'custom': user_agent}, delay=5)
     request_timeout = 45 
     headers_for_scraper = {'Accept': 'application/xml,text/xml;q=0.9', 'Accept-Language': 'en-US,en;q=0.8,ar;q=0.7', 'Accept-Encoding': 'gzip, deflate, br'}
@@ -49,15 +50,17 @@ def fetch_urls_from_sitemap(sitemap_url, user_agent="SitemapFetcherBot/1.0 (Defa
     while sitemaps_to_process:
         current_sitemap_file_url = sitemaps_to_process.pop(0)
         if current_sitemap_file_url in processed_sitemap_urls: continue
-        logger.info(f"Fetching sitemap (cloudscraper): {current_sitemap_file_url}")
+        logger.info("Fetching sitemap (cloudscraper): %s", current_sitemap_file_url)
         try:
-            response = scraper.get(current_sitemap_file_url, headers=headers_for_scraper, timeout=request_timeout, allow_redirects=True)
-            if response.status_code == 403: logger.error(f"403 Forbidden for {current_sitemap_file_url} with cloudscraper."); processed_sitemap_urls.add(current_sitemap_file_url); continue 
+            with instrumentation.stage('sitemap'):
+                response = scraper.get(current_sitemap_file_url, headers=headers_for_scraper, timeout=request_timeout, allow_redirects=True)
+            instrumentation.count('sitemap_files')
+            if response.status_code == 403: logger.error("403 Forbidden for %s with cloudscraper.", current_sitemap_file_url); processed_sitemap_urls.add(current_sitemap_file_url); continue 
             response.raise_for_status()
             xml_content = response.text
-            if not xml_content: logger.warning(f"Empty content for {current_sitemap_file_url}"); processed_sitemap_urls.add(current_sitemap_file_url); continue
+            if not xml_content: logger.warning("Empty content for %s", current_sitemap_file_url); processed_sitemap_urls.add(current_sitemap_file_url); continue
             try: root = ET.fromstring(xml_content)
-            except ET.ParseError as e: logger.error(f"XML ParseError for {current_sitemap_file_url}: {e}. Content: {xml_content[:200]}"); processed_sitemap_urls.add(current_sitemap_file_url); continue
+            except ET.ParseError as e: logger.error("XML ParseError for %s: %s. Content: %s", current_sitemap_file_url, e, xml_content[:200]); processed_sitemap_urls.add(current_sitemap_file_url); continue
             namespace_match = re.match(r'({[^}]+})', root.tag); namespace = namespace_match.group(1) if namespace_match else ''
             sitemap_nodes = root.findall(f'{namespace}sitemap'); url_nodes = root.findall(f'{namespace}url')
             if sitemap_nodes:
@@ -82,12 +85,12 @@ def fetch_urls_from_sitemap(sitemap_url, user_agent="SitemapFetcherBot/1.0 (Defa
                                 if lm_dt.tzinfo is None: lm_dt = lm_dt.replace(tzinfo=timezone.utc)
                             except: pass # Keep default lm_dt
                         urls_with_dates.append((lm_dt, url_s))
-            else: logger.warning(f"Sitemap {current_sitemap_file_url} has no <sitemap> or <url> tags.")
-        except Exception as e: logger.error(f"Error processing {current_sitemap_file_url}: {e}", exc_info=True)
+            else: logger.warning("Sitemap %s has no <sitemap> or <url> tags.", current_sitemap_file_url)
+        except Exception as e: logger.error("Error processing %s: %s", current_sitemap_file_url, e, exc_info=True)
         processed_sitemap_urls.add(current_sitemap_file_url)
         if sitemaps_to_process: time.sleep(sitemap_fetch_delay_sec)
     if not urls_with_dates: return []
     urls_with_dates.sort(key=lambda item: item[0], reverse=True)
     sorted_urls = [url for date, url in urls_with_dates]
-    logger.info(f"Fetched {len(sorted_urls)} URLs, sorted by lastmod.")
+    logger.info("Fetched %s URLs, sorted by lastmod.", len(sorted_urls))
     return sorted_urls
\ No newline at end of file
@@ -0,0 +1,40 @@
+# core/stopwords.py
+# قوائم كلمات التوقف مضمنة مع الكود حتى لا نحتاج إلى تنزيل بيانات NLTK على الخوادم السحابية.
+# كل عنصر كلمة واحدة كما يخرجها المقسّم (العبارات مثل "ما زال" تُغطى بكلماتها: ما + زال).
+
+STOPWORDS_AR = frozenset("""
+في من على إلى الى عن مع أن ان إن لا ما لم لن هل قد كان كانت يكون تكون كانوا ليس ليست لكن ولكن
+هذا هذه ذلك تلك هؤلاء أولئك هنا هناك الذي التي الذين اللذين اللتين اللاتي اللواتي ماذا متى أين اين كيف لماذا
+هو هي هم هن هما أنا انا نحن أنت انت أنتم انتم أنتن له لها لهم لهن به بها بهم منه منها منهم عنه عنها عليه عليها عليهم
+إليه اليه إليها اليها فيه فيها فيهم كل بعض أي اي غير بين بعد قبل حتى حين حيث عند عندما منذ خلال ضد نحو دون فوق تحت
+أو او ثم بل إذا اذا إذ اذ لو لولا كما كذلك أيضا ايضا أيضاً ايضاً فقط جدا جداً مثل أمام امام وراء لدى لدي
+و ف ب ل ك يا أما اما إلا الا سوى كلا كلتا ذات ذو ذا تم يتم وقد وقال قال قالت يقول تقول وأن وان وفي ومن وعلى وإلى والى وهو وهي
+التى الذى فى علي الي أمس اليوم غدا الآن الان عام العام سنة خلالها أكثر اكثر أقل اقل أول اول آخر اخر أخرى اخرى
+حول عبر وفق وفقا وفقاً إطار اطار ضمن وذلك وهذا وهذه بأن بان لأن لان كأن وكان وكانت يمكن أصبح اصبح أصبحت اصبحت
+مازال لازال زال يزال تزال صار باتت بات ظل عاد إنه انه إنها انها أنه أنها وأنه وأنها فإن فان لقد ولم ولا وما مما عما بما فيما
+""".split())
+
+STOPWORDS_EN = frozenset("""
+i me my myself we our ours ourselves you your yours yourself yourselves he him his himself she her hers herself
+it its itself they them their theirs themselves what which who whom this that these those am is are was were be been
+being have has had having do does did doing a an the and but if or because as until while of at by for with about
+against between into through during before after above below to from up down in out on off over under again further
+then once here there when where why how all any both each few more most other some such no nor not only own same so
+than too very s t can will just don should now d ll m o re ve y ain aren couldn didn doesn hadn hasn haven isn ma
+mightn mustn needn shan shouldn wasn weren won wouldn said says also would could may might new one two
+""".split())
+
+STOPWORDS_FR = frozenset("""
+au aux avec ce ces dans de des du elle en et eux il ils je la le les leur lui ma mais me même mes moi mon ne nos notre
+nous on ou par pas pour qu que qui sa se ses son sur ta te tes toi ton tu un une vos votre vous c d j l à m n s t y été
+est sont était être avoir a ont plus comme cette aussi
+""".split())
+
+STOPWORDS_ES = frozenset("""
+de la que el en y a los del se las por un para con no una su al lo como más pero sus le ya o este sí porque esta entre
+cuando muy sin sobre también me hasta hay donde quien desde todo nos durante todos uno les ni contra otros ese eso ante
+ellos e esto mí antes algunos qué unos yo otro otras otra él tanto esa estos mucho quienes nada muchos cual poco ella
+estar estas algunas algo nosotros es son fue ha han
+""".split())
+
+STOPWORDS_BY_LANGUAGE = {'ar': STOPWORDS_AR, 'en': STOPWORDS_EN, 'fr': STOPWORDS_FR, 'es': STOPWORDS_ES}
@@ -0,0 +1,109 @@
+# core/translation_backends.py
+from unidecode import unidecode
+from utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+class TranslatorBackend:
+    """
+    واجهة مترجم قابلة للاستبدال. translate_batch يعيد قائمة بنفس طول المدخلات وترتيبها،
+    وقيمة None لكل نص فشلت ترجمته (فيستخدم المستدعي النقل الحرفي بدلاً منه).
+    cacheable: هل تستحق النتائج التخزين في ذاكرة الترجمة الدائمة (False للمترجمات المحلية الرخيصة).
+    """
+    name = "base"
+    cacheable = False
+
+    def translate_batch(self, texts, source_lang='auto', target_lang='en'):
+        raise NotImplementedError
+
+class GoogleTranslatorBackend(TranslatorBackend):
+    """
+    Google عبر deep_translator. تُجمع النصوص في طلب واحد مفصولة بأسطر جديدة (حتى max_chars لكل طلب)،
+    وإذا لم يطابق عدد الأسطر المترجمة عدد النصوص نعود لترجمة نصوص ذلك الطلب واحدًا واحدًا.
+    """
+    name = "google"
+    cacheable = True
+
+    def __init__(self, max_chars=4500):
+        from deep_translator import GoogleTranslator # استيراد كسول (بطيء)
+        self._translator_class = GoogleTranslator
+        self._translators = {}
+        self.max_chars = max_chars
+
+    def _translator(self, source_lang, target_lang):
+        key = (source_lang, target_lang)
+        if key not in self._translators: self._translators[key] = self._translator_class(source=source_lang, target=target_lang)
+        return self._translators[key]
+
+    def _chunks(self, texts):
+        chunk, size = [], 0
+        for text in texts:
+            if chunk and size + len(text) + 1 > self.max_chars: yield chunk; chunk, size = [], 0
+            chunk.append(text); size += len(text) + 1
+        if chunk: yield chunk
+
+    def _translate_one(self, translator, text):
+        try:
+            translated = translator.translate(text=text)
+            return translated if isinstance(translated, str) and translated.strip() else None
+        except Exception as e:
+            logger.warning(f"Translation failed for '{text[:30]}...': {e}")
+            return None
+
+    def translate_batch(self, texts, source_lang='auto', target_lang='en'):
+        translator = self._translator(source_lang or 'auto', target_lang)
+        results = []
+        for chunk in self._chunks([' '.join(text.split()) for text in texts]):
+            if len(chunk) == 1: results.append(self._translate_one(translator, chunk[0])); continue
+            lines = None
+            try:
+                translated = translator.translate(text='\n'.join(chunk))
+                if isinstance(translated, str): lines = [line.strip() for line in translated.split('\n') if line.strip()]
+            except Exception as e: logger.warning(f"Batch translation of {len(chunk)} texts failed: {e}. Translating one by one.")
+            if lines is not None and len(lines) == len(chunk): results.extend(lines)
+            else:
+                if lines is not None: logger.warning(f"Batch translation returned {len(lines)} lines for {len(chunk)} texts. Translating one by one.")
+                results.extend(self._translate_one(translator, text) for text in chunk)
+        return results
+
+class TransliterationBackend(TranslatorBackend):
+    """وضع دون اتصال: نقل حرفي فقط عبر unidecode (بدون أي طلب شبكي)."""
+    name = "transliterate"
+
+    def translate_batch(self, texts, source_lang='auto', target_lang='en'):
+        return [unidecode(text) for text in texts]
+
+class StubTranslatorBackend(TranslatorBackend):
+    """
+    مترجم محلي للاختبارات: يعيد الترجمة من القاموس mapping إن وجدت، وإلا النص نفسه مسبوقًا بلغة الهدف.
+    يسجل كل دفعة في calls لمعرفة عدد الطلبات التي وصلت إليه فعلاً.
+    """
+    name = "stub"
+    cacheable = True
+
+    def __init__(self, mapping=None):
+        self.mapping = dict(mapping or {})
+        self.calls = []
+
+    def translate_batch(self, texts, source_lang='auto', target_lang='en'):
+        self.calls.append(list(texts))
+        return [self.mapping.get(text, f"[{target_lang}] {text}") for text in texts]
+
+_TRANSLATOR_BACKENDS = {}
+
+def register_translator_backend(name, factory):
+    """factory(config) -> TranslatorBackend. التسجيل بنفس الاسم يستبدل المترجم السابق."""
+    _TRANSLATOR_BACKENDS[name.lower()] = factory
+
+def get_translator_backend_names():
+    return sorted(_TRANSLATOR_BACKENDS)
+
+def create_translator_backend(name, config=None):
+    factory = _TRANSLATOR_BACKENDS.get((name or '').strip().lower())
+    if factory is None: raise ValueError(f"Unknown translator backend '{name}'. Available: {', '.join(get_translator_backend_names())}")
+    return factory(config)
+
+register_translator_backend("google", lambda config: GoogleTranslatorBackend(
+    max_chars=config.getint('Translation', 'BatchMaxChars', fallback=4500) if config is not None else 4500))
+register_translator_backend("transliterate", lambda config: TransliterationBackend())
+register_translator_backend("stub", lambda config: StubTranslatorBackend())
@@ -0,0 +1,89 @@
+# core/translation_cache.py
+import os
+import re
+import time
+import sqlite3
+import threading
+import unicodedata
+from utils.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+def normalize_translation_text(text):
+    """مفتاح التخزين: NFC + طي المسافات + حذف الأطراف (نفس العنوان بمسافات مختلفة = نفس الترجمة)."""
+    if not text: return ''
+    return _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+class TranslationCache:
+    """
+    ذاكرة ترجمة دائمة (SQLite) مفتاحها (لغة المصدر، لغة الهدف، النص الموحد).
+    عند تجاوز max_entries تُحذف الإدخالات الأقدم استخدامًا (LRU عبر عمود last_used).
+    """
+    def __init__(self, db_path=None, max_entries=5000):
+        self.db_path = db_path or ':memory:'
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        if self.db_path != ':memory:':
+            db_dir = os.path.dirname(self.db_path)
+            if db_dir: os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS translations (
+                source_lang TEXT NOT NULL, target_lang TEXT NOT NULL, text_key TEXT NOT NULL,
+                translated TEXT NOT NULL, last_used REAL NOT NULL,
+                PRIMARY KEY (source_lang, target_lang, text_key))""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations (last_used)")
+
+    def __len__(self):
+        with self._lock: return self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def get(self, source_lang, target_lang, text):
+        key = normalize_translation_text(text)
+        return self.get_many(source_lang, target_lang, [key]).get(key)
+
+    def get_many(self, source_lang, target_lang, texts):
+        """يعيد قاموس {النص الموحد: الترجمة} للنصوص الموجودة في الذاكرة فقط، ويحدّث last_used لها."""
+        keys = list(dict.fromkeys(normalize_translation_text(t) for t in texts if t))
+        found = {}
+        if not keys: return found
+        with self._lock:
+            # SQLite يحد عدد المتغيرات في الاستعلام الواحد، لذا نستعلم على دفعات
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_key, translated FROM translations WHERE source_lang = ? AND target_lang = ? AND text_key IN ({placeholders})",
+                    [source_lang, target_lang] + chunk).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                with self._conn:
+                    self._conn.executemany("UPDATE translations SET last_used = ? WHERE source_lang = ? AND target_lang = ? AND text_key = ?",
+                                           [(now, source_lang, target_lang, key) for key in found])
+        return found
+
+    def put(self, source_lang, target_lang, text, translated):
+        self.put_many(source_lang, target_lang, {text: translated})
+
+    def put_many(self, source_lang, target_lang, translations):
+        """translations: قاموس {النص الأصلي: الترجمة}. الترجمات الفارغة لا تُخزن."""
+        now = time.time()
+        rows = [(source_lang, target_lang, normalize_translation_text(text), translated, now)
+                for text, translated in translations.items() if text and translated and translated.strip()]
+        if not rows: return
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO translations (source_lang, target_lang, text_key, translated, last_used) VALUES (?, ?, ?, ?, ?)", rows)
+                self._evict_locked()
+
+    def _evict_locked(self):
+        if not self.max_entries or self.max_entries <= 0: return
+        overflow = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            self._conn.execute("DELETE FROM translations WHERE rowid IN (SELECT rowid FROM translations ORDER BY last_used ASC LIMIT ?)", (overflow,))
+            logger.debug(f"Evicted {overflow} least-recently-used translations from {self.db_path}")
+
+    def close(self):
+        with self._lock: self._conn.close()
@@ -0,0 +1,111 @@
+# utils/config_store.py
+import os
+import copy
+import json
+import threading
+from utils.file_lock import FileLock
+
+class ConfigStore:
+    """
+    طبقة إعدادات لوحة التحكم فوق secrets.toml (أو app_config.json كبديل):
+    - القراءة تُحلَّل مرة واحدة وتُخزَّن حسب (mtime, size) للملف، فإعادة تشغيل الصفحة لا تعيد تحليل TOML.
+    - user_view يعيد نسخة من بيانات مستخدم واحد فقط (رخيصة، ولا يمكن أن تعدّل الذاكرة المشتركة).
+    - كل كتابة: قفل ملف ← إعادة قراءة أحدث نسخة ← تطبيق التعديل ← كتابة ذرّية (tmp + os.replace)،
+      فلا تضيع تحديثات جلستين متزامنتين ولا يُقرأ ملف نصف مكتوب.
+    """
+    def __init__(self, path, fallback_json_path=None, section='app_config', lock_timeout=30):
+        self.path = path
+        self.fallback_json_path = fallback_json_path
+        self.section = section
+        self.lock_timeout = lock_timeout
+        self._lock = threading.Lock()
+        self._cache_key = None
+        self._cache = None
+        self.parse_count = 0
+
+    def source_path(self):
+        if os.path.exists(self.path): return self.path
+        if self.fallback_json_path and os.path.exists(self.fallback_json_path): return self.fallback_json_path
+        return None
+
+    def _is_json(self, path):
+        return path.lower().endswith('.json')
+
+    def _read_document(self, path):
+        """يعيد الملف كاملاً (كل الأقسام)؛ قسم الإعدادات في ملف JSON هو الملف نفسه."""
+        self.parse_count += 1
+        with open(path, 'r', encoding='utf-8') as f:
+            if self._is_json(path): return {self.section: json.load(f)}
+            import toml
+            return toml.load(f)
+
+    def _write_document(self, path, document):
+        if self._is_json(path): text = json.dumps(document.get(self.section, {}), ensure_ascii=False, indent=2)
+        else:
+            import toml
+            text = toml.dumps(document)
+        tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f: f.write(text)
+        os.replace(tmp_path, path)
+
+    def _stat_key(self, path):
+        st = os.stat(path)
+        return (path, st.st_mtime_ns, st.st_size)
+
+    def load(self):
+        """قسم الإعدادات كاملاً (نسخة مشتركة: للقراءة فقط). يرفع FileNotFoundError إذا لم يوجد أي ملف."""
+        path = self.source_path()
+        if path is None: raise FileNotFoundError(f"Config file '{self.path}' not found.")
+        key = self._stat_key(path)
+        with self._lock:
+            if key != self._cache_key:
+                self._cache = self._read_document(path).get(self.section, {}) or {}
+                self._cache_key = key
+            return self._cache
+
+    def snapshot(self):
+        """نسخة مستقلة قابلة للتعديل من الإعدادات كاملة."""
+        return copy.deepcopy(self.load())
+
+    def user_view(self, username):
+        return copy.deepcopy(self.load().get('users', {}).get(username, {}))
+
+    def update(self, mutator):
+        """
+        mutator(section_dict) يعدّل الإعدادات في مكانها، على أحدث نسخة من الملف وتحت القفل.
+        يعيد الإعدادات بعد التعديل.
+        """
+        path = self.source_path()
+        if path is None: raise FileNotFoundError(f"Config file '{self.path}' not found.")
+        with FileLock(f"{path}.lock", timeout=self.lock_timeout):
+            document = self._read_document(path)
+            section = document.setdefault(self.section, {})
+            mutator(section)
+            self._write_document(path, document)
+            with self._lock:
+                self._cache = section; self._cache_key = self._stat_key(path)
+        return section
+
+    def update_user(self, username, **fields):
+        def mutate(section):
+            section.setdefault('users', {}).setdefault(username, {}).update(fields)
+        return self.update(mutate)
+
+    def increment_user_counter(self, username, field, amount=1):
+        """زيادة عداد (مثل post_count) على القيمة المخزنة لحظة الكتابة، لا على نسخة قديمة في الجلسة."""
+        result = {}
+        def mutate(section):
+            user = section.setdefault('users', {}).setdefault(username, {})
+            user[field] = user.get(field, 0) + amount; result['value'] = user[field]
+        self.update(mutate)
+        return result['value']
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_config_store(path, fallback_json_path=None, section='app_config'):
+    """مخزن واحد لكل ملف في العملية (وحدات Python تبقى بين إعادات تشغيل Streamlit، بعكس متغيرات app.py)."""
+    key = (os.path.abspath(path), fallback_json_path and os.path.abspath(fallback_json_path), section)
+    with _stores_lock:
+        if key not in _stores: _stores[key] = ConfigStore(path, fallback_json_path, section)
+        return _stores[key]
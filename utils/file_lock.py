@@ -0,0 +1,71 @@
+# utils/file_lock.py
+import os
+import time
+
+try:
+    import fcntl
+
+    def _try_lock(fh):
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _unlock(fh):
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+except ImportError: # Windows
+    import msvcrt
+
+    def _try_lock(fh):
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+
+    def _unlock(fh):
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+class FileLock:
+    """
+    قفل حصري بين العمليات عبر ملف قفل (fcntl على Linux/macOS و msvcrt على Windows).
+    يُستخدم كـ context manager:
+
+        with FileLock(token_file + '.lock'):
+            ...
+
+    يرفع TimeoutError إذا لم يُحصل على القفل خلال timeout ثانية (None = انتظار بلا حد).
+    """
+    def __init__(self, lock_path, timeout=60.0, poll_interval=0.05):
+        self.lock_path = lock_path
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._fh = None
+
+    def acquire(self):
+        lock_dir = os.path.dirname(self.lock_path)
+        if lock_dir: os.makedirs(lock_dir, exist_ok=True)
+        fh = open(self.lock_path, 'a+')
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            try:
+                _try_lock(fh)
+                self._fh = fh
+                return self
+            except OSError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    fh.close()
+                    raise TimeoutError(f"Could not acquire lock on {self.lock_path} within {self.timeout}s")
+                time.sleep(self.poll_interval)
+
+    def release(self):
+        if self._fh is None: return
+        try: _unlock(self._fh)
+        finally:
+            self._fh.close()
+            self._fh = None
+
+    @property
+    def is_locked(self):
+        return self._fh is not None
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
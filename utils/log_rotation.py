@@ -0,0 +1,66 @@
+# utils/log_rotation.py
+# معالجات تدوير ملف السجل الآمنة عندما تكتب عدة عمليات نفس الملف (الكاشط، المنسّق، العامل الدائم...).
+# تُستورد من logger_config عند تفعيل التدوير فقط (تسحب logging.handlers).
+import os
+import time
+import logging
+import logging.handlers
+from utils.file_lock import FileLock
+
+class _InterProcessRotationMixin:
+    """
+    كل كتابة تتم تحت FileLock على <log>.lock، فلا تدوّر عملية الملف بينما تكتب فيه أخرى، ولا تدوّره عمليتان معًا.
+    قبل الكتابة يُعاد فتح الملف إذا دوّرته عملية أخرى (تغير الجهاز/inode، مثل WatchedFileHandler)،
+    وإلا ذهبت أسطر هذه العملية إلى النسخة المدوّرة (أو ضاعت إذا ضُغطت وحُذفت).
+    إذا تعذر أخذ القفل خلال lock_timeout يُكتب السطر دون تدوير بدل إسقاطه.
+    """
+    lock_timeout = 10.0
+
+    def _init_rotation_lock(self):
+        self.lock_path = f"{self.baseFilename}.lock"
+        self._file_key = self._stream_key()
+
+    def _stream_key(self):
+        if self.stream is None: return None
+        st = os.fstat(self.stream.fileno())
+        return (st.st_dev, st.st_ino)
+
+    def _rotated_elsewhere(self):
+        try: st = os.stat(self.baseFilename)
+        except FileNotFoundError: return True
+        return self._file_key != (st.st_dev, st.st_ino)
+
+    def _reopen(self):
+        if self.stream is not None: self.stream.close()
+        self.stream = self._open(); self._file_key = self._stream_key()
+
+    def emit(self, record):
+        try:
+            lock = FileLock(self.lock_path, timeout=self.lock_timeout)
+            try: lock.acquire()
+            except TimeoutError: lock = None
+            try:
+                if lock and self._rotated_elsewhere(): self._reopen(); self._after_reopen()
+                if lock and self.shouldRollover(record): self.doRollover(); self._file_key = self._stream_key()
+                logging.FileHandler.emit(self, record)
+            finally:
+                if lock: lock.release()
+        except Exception: self.handleError(record)
+
+    def _after_reopen(self):
+        pass
+
+class InterProcessRotatingFileHandler(_InterProcessRotationMixin, logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler (تدوير بالحجم) آمن بين العمليات؛ الحجم يُقرأ من الملف المشترك نفسه بعد أخذ القفل."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._init_rotation_lock()
+
+class InterProcessTimedRotatingFileHandler(_InterProcessRotationMixin, logging.handlers.TimedRotatingFileHandler):
+    """TimedRotatingFileHandler آمن بين العمليات: العملية التي تجد الملف مدوّرًا تؤجل موعد تدويرها بدل تدويره مرة ثانية."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._init_rotation_lock()
+
+    def _after_reopen(self):
+        self.rolloverAt = self.computeRollover(int(time.time()))
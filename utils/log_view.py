@@ -0,0 +1,57 @@
+# utils/log_view.py
+import time
+from collections import deque
+
+class LogView:
+    """
+    عرض سجل حي في Streamlit بكلفة ثابتة لكل سطر:
+    - يحتفظ بآخر max_lines سطرًا فقط (deque محدودة) بدل تجميع السجل كاملاً في نص يكبر مع كل سطر.
+    - لا يعيد رسم العنصر أكثر من مرة كل refresh_interval ثانية، مهما كان معدل وصول الأسطر.
+    السجل الكامل يبقى مسؤولية المستدعي (ملف في logs/)، وflush() في النهاية يضمن ظهور آخر الأسطر.
+    """
+    def __init__(self, placeholder, max_lines=300, refresh_interval=0.5, language='bash', full_log_path=None, clock=time.monotonic):
+        self.placeholder = placeholder
+        self.lines = deque(maxlen=max_lines)
+        self.refresh_interval = refresh_interval
+        self.language = language
+        self.full_log_path = full_log_path
+        self._clock = clock
+        self._partial = ''
+        self._total_lines = 0
+        self._last_render = None
+        self._dirty = False
+        self.render_count = 0
+
+    def write(self, text):
+        """يضيف نصًا (قد يحتوي عدة أسطر أو جزءًا من سطر) ويعيد الرسم إذا حان وقته."""
+        if not text: return
+        pieces = (self._partial + text).split('\n')
+        self._partial = pieces.pop()
+        for line in pieces: self.lines.append(line); self._total_lines += 1
+        self._dirty = True
+        self.refresh()
+
+    def append_line(self, line):
+        self.write(f"{line}\n")
+
+    @property
+    def hidden_lines(self):
+        return self._total_lines - len(self.lines)
+
+    def render_text(self):
+        visible = list(self.lines)
+        if self._partial: visible.append(self._partial)
+        if self.hidden_lines:
+            where = f" (السجل الكامل في {self.full_log_path})" if self.full_log_path else ""
+            visible.insert(0, f"... تم إخفاء {self.hidden_lines} سطر أقدم{where} ...")
+        return "\n".join(visible)
+
+    def refresh(self, force=False):
+        if not self._dirty and not force: return
+        now = self._clock()
+        if not force and self._last_render is not None and now - self._last_render < self.refresh_interval: return
+        self.placeholder.code(self.render_text(), language=self.language)
+        self._last_render = now; self._dirty = False; self.render_count += 1
+
+    def flush(self):
+        self.refresh(force=True)
@@ -2,39 +2,189 @@
 import logging
 import sys
 import os
+import atexit
+import threading
+# logging.handlers وqueue وgzip تُستورد عند تفعيل الطابور أو التدوير فقط (زمن بدء تشغيل السكربتات، انظر benchmarks/startup_budget.py)
 
-def setup_logger(logger_name, level=logging.INFO, log_file=None, console_output=True):
-    logger = logging.getLogger(logger_name)
-    
-    if logger.hasHandlers():
-        return logger
+LOG_FORMAT = '%(asctime)s - %(name)s - [%(levelname)s] - %(message)s (%(filename)s:%(lineno)d)'
 
-    logger.setLevel(level)
-    logger.propagate = False 
+# إعدادات عامة تضبطها configure_logging (من قسم [Logging] في config.ini) وتُطبق على كل مسجل أنشأته setup_logger.
+# القيم الافتراضية تطابق السلوك القديم: كتابة متزامنة وملف سجل بلا تدوير.
+_settings = {'async': False, 'max_bytes': 0, 'backup_count': 5, 'when': '', 'compress': True, 'sample_every': 1}
+_managed = {} # اسم المسجل -> (log_file, console_output)
+_file_handlers = {} # مسار الملف -> معالج واحد مشترك (التدوير لا يصح بمعالجين على نفس الملف)
+_lock = threading.RLock()
+_queue = None
+_router = None
+_listener = None
+
+class SamplingFilter(logging.Filter):
+    """
+    يمرر رسالة واحدة من كل every لكل قالب رسالة (record.msg قبل التنسيق) عند المستوى max_level فما دون،
+    للرسائل كثيرة التكرار مثل محاولات المحددات الفاشلة وتنظيف عقد النص. الرسائل الأعلى مستوى تمر دائمًا.
+    يعتمد على التنسيق الكسول بنمط %: رسالة f-string تختلف في كل مرة فلا تُعيَّن أبدًا.
+    """
+    MAX_KEYS = 10000
+
+    def __init__(self, every=10, max_level=logging.DEBUG):
+        super().__init__()
+        self.every = max(1, int(every)); self.max_level = max_level
+        self._seen = {}; self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.every <= 1 or record.levelno > self.max_level: return True
+        key = (record.name, str(record.msg))
+        with self._lock:
+            if len(self._seen) >= self.MAX_KEYS: self._seen.clear()
+            seen = self._seen.get(key, 0); self._seen[key] = seen + 1
+        return seen % self.every == 0
+
+class _FlushMarker:
+    def __init__(self):
+        self.done = threading.Event()
+
+class _LoggerRouter(logging.Handler):
+    """معالج وحيد في خيط المستمع: يوزع كل سجل على معالجات المسجل الذي أصدره (stdout و/أو ملف)."""
+    def __init__(self):
+        super().__init__()
+        self.routes = {}
+
+    def handle(self, record):
+        if isinstance(record, _FlushMarker): record.done.set(); return True
+        for handler in self.routes.get(record.name, ()):
+            if record.levelno >= handler.level: handler.handle(record)
+        return True
+
+class _DeferredQueueHandler(logging.Handler):
+    """
+    مثل logging.handlers.QueueHandler لطابور داخل نفس العملية، لكن دون تنسيق الرسالة في خيط المتصل:
+    يُمرر السجل كما هو فيتم التنسيق والكتابة في خيط المستمع. الوسائط غير الثابتة (قوائم، كائنات) تُنسق فورًا حتى لا تتغير قبل الكتابة.
+    """
+    _IMMUTABLE = (str, int, float, bool, type(None))
+
+    def __init__(self, log_queue):
+        super().__init__()
+        self.queue = log_queue
+
+    def emit(self, record):
+        try:
+            args = record.args
+            if args and not all(isinstance(arg, self._IMMUTABLE) for arg in (args if isinstance(args, tuple) else (args,))):
+                record.msg = record.getMessage(); record.args = None
+            self.queue.put_nowait(record)
+        except Exception: self.handleError(record)
+
+def _gzip_namer(name):
+    return name + ".gz"
+
+def _gzip_rotator(source, dest):
+    import gzip, shutil
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst: shutil.copyfileobj(src, dst)
+    os.remove(source)
 
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - [%(levelname)s] - %(message)s (%(filename)s:%(lineno)d)'
-    )
+def _get_file_handler(log_file, formatter):
+    path = os.path.abspath(log_file)
+    handler = _file_handlers.get(path)
+    if handler: return handler
+    log_dir = os.path.dirname(log_file)
+    if log_dir and not os.path.exists(log_dir):
+        os.makedirs(log_dir, exist_ok=True)
+    when = (_settings['when'] or '').strip()
+    if when or _settings['max_bytes'] > 0:
+        # عدة عمليات تكتب نفس الملف: التدوير والكتابة تحت قفل ملف، مع إعادة الفتح إذا دوّرته عملية أخرى
+        from utils.log_rotation import InterProcessRotatingFileHandler, InterProcessTimedRotatingFileHandler
+        if when: handler = InterProcessTimedRotatingFileHandler(log_file, when=when, backupCount=_settings['backup_count'], encoding='utf-8')
+        else: handler = InterProcessRotatingFileHandler(log_file, mode='a', maxBytes=_settings['max_bytes'], backupCount=_settings['backup_count'], encoding='utf-8')
+        if _settings['compress']: handler.namer = _gzip_namer; handler.rotator = _gzip_rotator
+    else: handler = logging.FileHandler(log_file, mode='a', encoding='utf-8')
+    handler.setFormatter(formatter)
+    _file_handlers[path] = handler
+    return handler
 
+def _build_handlers(log_file, console_output):
+    """يعيد (المعالجات، رسالة تحذير إن فشل ملف السجل)."""
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = []; warning = None
     if console_output:
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
-
+        handlers.append(console_handler)
     if log_file:
-        try:
-            log_dir = os.path.dirname(log_file)
-            if log_dir and not os.path.exists(log_dir):
-                os.makedirs(log_dir, exist_ok=True)
-            
-            file_handler = logging.FileHandler(log_file, mode='a', encoding='utf-8')
-            file_handler.setFormatter(formatter)
-            logger.addHandler(file_handler)
+        try: handlers.append(_get_file_handler(log_file, formatter))
         except Exception as e:
             print(f"Warning: Could not set up file logger for {log_file}: {e}")
-            if not logger.hasHandlers():
+            if not handlers:
                 emergency_handler = logging.StreamHandler(sys.stderr)
                 emergency_handler.setFormatter(formatter)
-                logger.addHandler(emergency_handler)
-                logger.warning(f"File logger for {log_file} failed. Logging to stderr as fallback.")
-    return logger
\ No newline at end of file
+                handlers.append(emergency_handler)
+                warning = f"File logger for {log_file} failed. Logging to stderr as fallback."
+    return handlers, warning
+
+def _ensure_listener():
+    global _queue, _router, _listener
+    if _listener is not None: return
+    import queue, logging.handlers
+    _queue = queue.SimpleQueue(); _router = _LoggerRouter()
+    _listener = logging.handlers.QueueListener(_queue, _router)
+    _listener.start()
+
+def _stop_listener():
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None: listener.stop()
+
+def _wire(logger, log_file, console_output):
+    for handler in list(logger.handlers): logger.removeHandler(handler)
+    for log_filter in [f for f in logger.filters if isinstance(f, SamplingFilter)]: logger.removeFilter(log_filter)
+    handlers, warning = _build_handlers(log_file, console_output)
+    if _settings['async']:
+        _ensure_listener()
+        _router.routes[logger.name] = handlers
+        logger.addHandler(_DeferredQueueHandler(_queue))
+    else:
+        if _router is not None: _router.routes.pop(logger.name, None)
+        for handler in handlers: logger.addHandler(handler)
+    if _settings['sample_every'] > 1: logger.addFilter(SamplingFilter(_settings['sample_every']))
+    return warning
+
+def setup_logger(logger_name, level=logging.INFO, log_file=None, console_output=True):
+    logger = logging.getLogger(logger_name)
+
+    if logger.hasHandlers():
+        return logger
+
+    logger.setLevel(level)
+    logger.propagate = False
+
+    with _lock:
+        _managed[logger_name] = (log_file, console_output)
+        warning = _wire(logger, log_file, console_output)
+    if warning: logger.warning(warning)
+    return logger
+
+def configure_logging(async_mode=None, max_bytes=None, backup_count=None, when=None, compress=None, sample_every=None):
+    """
+    يضبط طريقة الكتابة لكل المسجلات (الحالية والتي ستُنشأ لاحقًا)؛ None يعني إبقاء القيمة الحالية:
+    - async_mode: المسجلات تضع السجلات في طابور ويكتبها خيط مستمع واحد (لا انتظار لـ I/O في حلقات الكشط والتنسيق).
+    - max_bytes/backup_count: تدوير ملف السجل بالحجم، أو when (مثل 'midnight' أو 'H') للتدوير بالوقت.
+    - compress: ضغط النسخ المدوّرة بـ gzip.
+    - sample_every: تمرير رسالة DEBUG واحدة من كل N لكل قالب رسالة (1 = بلا تعيين).
+    """
+    updates = {key: value for key, value in (('async', async_mode), ('max_bytes', max_bytes), ('backup_count', backup_count),
+                                             ('when', when), ('compress', compress), ('sample_every', sample_every)) if value is not None}
+    with _lock:
+        if all(_settings[key] == value for key, value in updates.items()): return
+        flush_logging()
+        _settings.update(updates)
+        for handler in _file_handlers.values(): handler.close()
+        _file_handlers.clear()
+        for name, (log_file, console_output) in _managed.items(): _wire(logging.getLogger(name), log_file, console_output)
+        if not _settings['async']: _stop_listener()
+
+def flush_logging(timeout=5.0):
+    """ينتظر حتى يكتب المستمع كل ما في الطابور (قبل فصل مخرج مهمة في العامل الدائم مثلاً)."""
+    if _listener is not None:
+        marker = _FlushMarker(); _queue.put(marker); marker.done.wait(timeout)
+    for handler in list(_file_handlers.values()): handler.flush()
+
+atexit.register(_stop_listener) # stop() يكتب ما تبقى في الطابور قبل خروج العملية